@@ -0,0 +1,8 @@
+"""
+POPO Finder Benchmarks
+
+Usage:
+    python -m benchmarks seed --db-url sqlite+aiosqlite:///bench.db --rows 50000
+    python -m benchmarks fake-line --port 9100
+    python -m benchmarks run --db-url sqlite+aiosqlite:///bench.db --rows 50000 --concurrency 32
+"""
@@ -0,0 +1,142 @@
+"""
+Benchmark CLI
+
+Usage:
+    python -m benchmarks seed --db-url sqlite+aiosqlite:///bench.db --rows 50000
+    python -m benchmarks fake-line --port 9100
+    python -m benchmarks run --db-url sqlite+aiosqlite:///bench.db --rows 50000 --concurrency 32
+    python -m benchmarks run --target http://127.0.0.1:8000 --no-seed --compare benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import aiohttp
+from aiohttp import web
+from src.infra.logger import get_logger
+from .dataset import seed_dataset
+from .fake_line import FakeMessagingApi
+from .load import SCENARIOS, LoadGenerator, launch_server, wait_ready, save_results, format_report
+
+logger = get_logger("benchmark")
+
+DEFAULT_DB_URL = "sqlite+aiosqlite:///bench.db"
+DEFAULT_RESULTS_DIR = "benchmarks/results"
+
+
+async def run(args) -> list:
+    "Start the fake LINE API (and the service), then replay every scenario"
+    line_api = FakeMessagingApi(args.reply_delay)
+    runner = await line_api.start(args.line_host, args.line_port)
+    server = None
+    target = args.target
+    try:
+        if target is None:
+            server = launch_server(
+                args.port,
+                args.db_url,
+                f"http://{args.line_host}:{args.line_port}",
+                args.secret,
+                args.workers,
+            )
+            target = f"http://127.0.0.1:{args.port}"
+        await wait_ready(target, server)
+
+        generator = LoadGenerator(
+            target,
+            args.secret,
+            line_api,
+            concurrency=args.concurrency,
+            timeout=args.timeout,
+            users=args.users,
+            seed=args.seed,
+        )
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        results = []
+        async with aiohttp.ClientSession(connector=connector) as session:
+            for scenario in args.scenarios:
+                logger.info("[Benchmark] Running %s x %d", scenario, args.events)
+                results.append(await generator.run(session, scenario, args.events, args.warmup))
+        return results
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        await runner.cleanup()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Seed a synthetic dataset and measure webhook throughput and latency",
+    )
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="Load a synthetic medical_personnel dataset")
+    fake_parser = commands.add_parser("fake-line", help="Serve the fake Messaging API")
+    run_parser = commands.add_parser("run", help="Replay signed webhooks and report latency")
+
+    for parser in (seed_parser, run_parser):
+        parser.add_argument(
+            "--db-url", default=DEFAULT_DB_URL, help="SQLAlchemy async URL (SQLite or PostgreSQL)"
+        )
+        parser.add_argument("--rows", type=int, default=50000, help="Synthetic dataset size")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed of the dataset")
+    for parser in (fake_parser, run_parser):
+        parser.add_argument("--line-host", default="127.0.0.1", help="Fake Messaging API host")
+        parser.add_argument("--line-port", type=int, default=9100, help="Fake Messaging API port")
+        parser.add_argument(
+            "--reply-delay", type=float, default=0.0, help="Seconds the fake API waits before replying"
+        )
+
+    run_parser.add_argument("--no-seed", action="store_true", help="Use the existing dataset")
+    run_parser.add_argument(
+        "--target", help="Benchmark a running service instead of starting one (its LINE_API_ENDPOINT must point to the fake API)"
+    )
+    run_parser.add_argument("--port", type=int, default=8100, help="Port of the started service")
+    run_parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the started service")
+    run_parser.add_argument(
+        "--secret",
+        default=os.environ.get("LINE_MESSAGE_CHANNEL_SECRET") or "benchmark",
+        help="Channel secret used to sign webhooks",
+    )
+    run_parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), help="Query types to run"
+    )
+    run_parser.add_argument("--events", type=int, default=1000, help="Measured events per query type")
+    run_parser.add_argument("--warmup", type=int, default=50, help="Unmeasured events per query type")
+    run_parser.add_argument("--concurrency", type=int, default=16, help="Concurrent webhook requests")
+    run_parser.add_argument("--users", type=int, default=1000, help="Distinct LINE user ids")
+    run_parser.add_argument("--timeout", type=float, default=10.0, help="Seconds to wait for each reply")
+    run_parser.add_argument("--output", default=DEFAULT_RESULTS_DIR, help="Directory for result files")
+    run_parser.add_argument("--compare", help="Previous result file to compare against")
+    args = arg_parser.parse_args()
+
+    if args.command == "seed":
+        seed_dataset(args.db_url, args.rows, args.seed)
+    elif args.command == "fake-line":
+        web.run_app(
+            FakeMessagingApi(args.reply_delay).app(), host=args.line_host, port=args.line_port
+        )
+    else:
+        if not args.no_seed and args.target is None:
+            seed_dataset(args.db_url, args.rows, args.seed)
+        results = asyncio.run(run(args))
+
+        baseline = None
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as f:
+                baseline = json.load(f)
+        print(format_report(results, baseline))
+
+        meta = {
+            key: getattr(args, key)
+            for key in ("db_url", "rows", "seed", "workers", "events", "warmup", "concurrency", "users", "reply_delay")
+        }
+        meta["target"] = args.target
+        path = save_results(results, meta, args.output)
+        logger.info("[Benchmark] Saved results to %s", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Synthetic Dataset
+"""
+import random
+from typing import Iterator
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.engine import Engine
+from src.database.models.base import Base
+from src.database.models.medical_personnel import GraduationStatus
+from src.infra.logger import get_logger
+from src.ingest.loader import load_records
+
+logger = get_logger("benchmark")
+
+CITIES = (
+    "南投", "台中", "台北", "台南", "台東", "嘉義", "基隆",
+    "宜蘭", "屏東", "彰化", "新北", "新竹", "桃園", "花蓮",
+    "苗栗", "雲林", "高雄",
+)
+
+HOSPITALS = (
+    "台大醫院", "三軍總醫院", "台北榮民總醫院", "林口長庚紀念醫院", "高雄長庚紀念醫院",
+    "馬偕紀念醫院", "成功大學醫學院附設醫院", "中國醫藥大學附設醫院", "彰化基督教醫院",
+    "亞東紀念醫院", "新光吳火獅紀念醫院", "花蓮慈濟醫院", "奇美醫院", "台中榮民總醫院",
+)
+
+# 各縣市另外產生的地區醫院名稱
+LOCAL_HOSPITALS = ("市立醫院", "基督教醫院", "仁愛醫院", "博愛醫院", "聯合醫院", "綜合醫院")
+
+DEPARTMENTS = (
+    "內科", "外科", "小兒科", "婦產科", "骨科", "眼科", "耳鼻喉科", "皮膚科", "精神科",
+    "家醫科", "急診醫學科", "麻醉科", "放射科", "神經科", "泌尿科", "復健科", "牙科", None,
+)
+
+UNIVERSITIES = (
+    "台灣大學", "陽明交通大學", "成功大學", "台北醫學大學", "高雄醫學大學",
+    "中國醫藥大學", "中山醫學大學", "長庚大學", "輔仁大學", "馬偕醫學院",
+)
+
+SURNAMES = "陳林黃張李王吳劉蔡楊許鄭謝洪郭邱曾廖賴徐周葉蘇莊呂江何蕭羅高"
+GIVEN = "志明俊宏家豪怡君雅婷淑芬美玲建宏冠宇承恩宗翰佳穎欣怡柏翰郁婷育誠文彥"
+
+
+def generate_records(rows: int, seed: int = 0) -> Iterator[dict]:
+    """
+    產生 rows 筆合成的醫事人員資料
+
+    同一個 seed 產生的資料順序固定，壓力測試可重新產生前幾筆作為查詢條件。
+    """
+    rng = random.Random(seed)
+    hospitals = HOSPITALS + tuple(
+        f"{city}{suffix}" for city in CITIES for suffix in LOCAL_HOSPITALS
+    )
+    for _ in range(rows):
+        university = rng.choice(UNIVERSITIES)
+        yield {
+            "city": rng.choice(CITIES),
+            "hospital": rng.choice(hospitals),
+            "department": rng.choice(DEPARTMENTS),
+            "name": rng.choice(SURNAMES) + "".join(rng.sample(GIVEN, 2)),
+            "education": f"{university}醫學系",
+            "university": university,
+            "graduation_status": (
+                GraduationStatus.STUDYING if rng.random() < 0.1 else GraduationStatus.GRADUATED
+            ),
+        }
+
+
+def sync_engine(db_url: str) -> Engine:
+    "Create a synchronous engine for the same database as an async URL"
+    url = make_url(db_url)
+    return create_engine(url.set(drivername=url.get_backend_name()))
+
+
+def seed_dataset(db_url: str, rows: int, seed: int = 0, batch_size: int = 5000) -> int:
+    """
+    建立資料表並以 ingest 的批次載入寫入合成資料，回傳載入筆數
+
+    Args:
+        db_url: SQLAlchemy async URL (sqlite+aiosqlite 或 postgresql+asyncpg)
+        rows: 資料筆數
+        seed: 亂數種子
+        batch_size: 每批寫入筆數
+    """
+    engine = sync_engine(db_url)
+    try:
+        Base.metadata.create_all(engine)
+        total = load_records(generate_records(rows, seed), engine, batch_size)
+    finally:
+        engine.dispose()
+    logger.info("[Benchmark] Seeded %d rows into %s", total, make_url(db_url).render_as_string())
+    return total
@@ -0,0 +1,70 @@
+"""
+Fake LINE Messaging API
+"""
+import asyncio
+import time
+from aiohttp import web
+from src.infra.logger import get_logger
+
+logger = get_logger("benchmark")
+
+REPLY_PATH = "/v2/bot/message/reply"
+
+
+class FakeMessagingApi:
+    """
+    記錄 reply_message 呼叫的 Messaging API 替身
+
+    壓力測試以 expect 登記 reply token，收到對應的回覆時喚醒等待者，
+    並記錄收到回覆的時間與內容。
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.replies = 0
+        self.unexpected = 0
+        self._waiters: dict[str, asyncio.Future] = {}
+
+    def expect(self, reply_token: str) -> asyncio.Future:
+        "Future resolved with (perf_counter, payload) when the reply arrives"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[reply_token] = waiter
+        return waiter
+
+    def forget(self, reply_token: str):
+        "Stop waiting for a reply token"
+        self._waiters.pop(reply_token, None)
+
+    async def _reply(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.replies += 1
+        waiter = self._waiters.pop(payload.get("replyToken"), None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result((time.perf_counter(), payload))
+        return web.json_response({"sentMessages": [{"id": str(self.replies)}]})
+
+    async def _other(self, request: web.Request) -> web.Response:
+        self.unexpected += 1
+        logger.warning("[FakeLine] Unexpected request: %s %s", request.method, request.path)
+        return web.json_response({})
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"replies": self.replies, "unexpected": self.unexpected})
+
+    def app(self) -> web.Application:
+        "aiohttp application serving the fake API"
+        app = web.Application()
+        app.router.add_post(REPLY_PATH, self._reply)
+        app.router.add_get("/stats", self._stats)
+        app.router.add_route("*", "/{path:.*}", self._other)
+        return app
+
+    async def start(self, host: str, port: int) -> web.AppRunner:
+        "Serve the fake API in the running event loop"
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info("[FakeLine] Listening on http://%s:%d", host, port)
+        return runner
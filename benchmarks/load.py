@@ -0,0 +1,330 @@
+"""
+Webhook Load Generator
+"""
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+import aiohttp
+from src.infra.logger import get_logger
+from .dataset import generate_records
+from .fake_line import FakeMessagingApi
+from .webhook import sign, message_event, postback_event, webhook_body
+
+logger = get_logger("benchmark")
+
+CALLBACK_PATH = "/api/linebot/callback"
+READY_PATH = "/metrics"
+
+SCENARIOS = ("name", "hospital", "department", "pagination")
+
+# 取樣查詢條件時重新產生的資料筆數
+QUERY_SAMPLE_SIZE = 1000
+
+PERCENTILES = (50, 95, 99)
+
+
+class ReplyTimeout(Exception):
+    """
+    等待 reply_message 逾時
+    """
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """
+    以 nearest-rank 計算 p50 / p95 / p99 (毫秒)
+    """
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    ordered = sorted(values)
+    return {
+        f"p{p}": round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1000, 2)
+        for p in PERCENTILES
+    }
+
+
+@dataclass
+class ScenarioResult:
+    """
+    單一查詢類型的結果
+
+    ack 為 callback 回應 200 的時間，reply 為送出 webhook 到替身收到 reply_message 的時間。
+    分頁情境中取得「下一頁」的搜尋記於 setup_events，不計入延遲但計入 events_per_second。
+    """
+    scenario: str
+    events: int = 0
+    setup_events: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    duration: float = 0.0
+    events_per_second: float = 0.0
+    ack_ms: dict = field(default_factory=dict)
+    reply_ms: dict = field(default_factory=dict)
+
+
+def _next_page_data(payload: dict) -> str | None:
+    "Find the next page postback data in a reply_message payload"
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            data = node.get("data")
+            if node.get("type") == "postback" and isinstance(data, str) and data.startswith("action=next_page"):
+                return data
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+class LoadGenerator:
+    """
+    以固定並行數送出簽章過的 webhook 並量測延遲
+    """
+
+    def __init__(
+        self,
+        target: str,
+        secret: str,
+        line_api: FakeMessagingApi,
+        concurrency: int = 16,
+        timeout: float = 10.0,
+        users: int = 1000,
+        seed: int = 0,
+    ):
+        self.url = target.rstrip("/") + CALLBACK_PATH
+        self.secret = secret
+        self.line_api = line_api
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.users = users
+        self.rng = random.Random(seed)
+        self._tokens = itertools.count()
+        self.records = list(generate_records(QUERY_SAMPLE_SIZE, seed))
+
+    def _user(self) -> str:
+        return f"Ubench{self.rng.randrange(self.users):06d}"
+
+    def _token(self) -> str:
+        return f"bench{next(self._tokens):012d}"
+
+    async def send(self, session: aiohttp.ClientSession, event: dict) -> tuple[float, float, dict]:
+        """
+        送出單一事件並等待回覆，回傳 (ack 秒數, reply 秒數, reply payload)
+        """
+        token = event["replyToken"]
+        waiter = self.line_api.expect(token)
+        body = webhook_body([event])
+        started = time.perf_counter()
+        try:
+            async with session.post(
+                self.url,
+                data=body,
+                headers={"Content-Type": "application/json", "X-Line-Signature": sign(body, self.secret)},
+            ) as response:
+                await response.read()
+                response.raise_for_status()
+            acked = time.perf_counter() - started
+            try:
+                replied_at, payload = await asyncio.wait_for(waiter, self.timeout)
+            except asyncio.TimeoutError as exc:
+                raise ReplyTimeout(token) from exc
+        finally:
+            self.line_api.forget(token)
+        return acked, replied_at - started, payload
+
+    def _text(self, text: str) -> Callable[[aiohttp.ClientSession], Awaitable[tuple[dict, int]]]:
+        async def make(session):
+            return message_event(text, self._user(), self._token()), 0
+        return make
+
+    def _pagination(self) -> Callable[[aiohttp.ClientSession], Awaitable[tuple[dict, int]]]:
+        # 先送出 (不計延遲的) 科別搜尋，由回覆中的「下一頁」按鈕取得 postback data
+        department = self.rng.choice([r["department"] for r in self.records if r["department"]])
+
+        async def make(session):
+            user = self._user()
+            _, _, payload = await self.send(
+                session, message_event(f"@科別 {department}", user, self._token())
+            )
+            data = _next_page_data(payload)
+            if data is None:
+                raise LookupError(f"No next page for {department}")
+            return postback_event(data, user, self._token()), 1
+        return make
+
+    def event_factory(self, scenario: str) -> Callable[[aiohttp.ClientSession], Awaitable[tuple[dict, int]]]:
+        "Random event builder for a query type, returning the event and the setup webhooks it sent"
+        record = self.rng.choice(self.records)
+        if scenario == "name":
+            return self._text(record["name"])
+        if scenario == "hospital":
+            return self._text(f"@醫院 {record['hospital']}")
+        if scenario == "department":
+            department = record["department"] or "內科"
+            return self._text(f"{record['city']}@科別 {department}")
+        if scenario == "pagination":
+            return self._pagination()
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+    async def run(
+        self, session: aiohttp.ClientSession, scenario: str, events: int, warmup: int = 0
+    ) -> ScenarioResult:
+        """
+        送出 warmup 筆不計入的事件後，以 concurrency 個並行的 worker 送出 events 筆事件
+        """
+        result = ScenarioResult(scenario)
+        acks: list[float] = []
+        replies: list[float] = []
+
+        async def worker(pending, measured: bool):
+            for _ in pending:
+                try:
+                    event, setup = await self.event_factory(scenario)(session)
+                    if measured:
+                        result.setup_events += setup
+                    acked, replied, _ = await self.send(session, event)
+                except ReplyTimeout:
+                    if measured:
+                        result.timeouts += 1
+                except (aiohttp.ClientError, LookupError) as e:
+                    if measured:
+                        result.errors += 1
+                    logger.warning("[Benchmark] %s event failed: %s", scenario, e)
+                else:
+                    if measured:
+                        acks.append(acked)
+                        replies.append(replied)
+
+        pending = iter(range(warmup))
+        await asyncio.gather(*(worker(pending, False) for _ in range(min(self.concurrency, warmup))))
+        pending = iter(range(events))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(pending, True) for _ in range(self.concurrency)))
+        result.duration = round(time.perf_counter() - started, 3)
+
+        result.events = len(replies)
+        # 分頁情境的搜尋也在計時區間內送出，一併計入每秒事件數
+        sent = result.events + result.setup_events
+        result.events_per_second = round(sent / result.duration, 1) if result.duration else 0.0
+        result.ack_ms = percentiles(acks)
+        result.reply_ms = percentiles(replies)
+        return result
+
+
+def launch_server(port: int, db_url: str, line_endpoint: str, secret: str, workers: int) -> subprocess.Popen:
+    """
+    以 uvicorn 子行程啟動服務，資料庫與 Messaging API 指向壓力測試環境
+    """
+    env = {
+        **os.environ,
+        "ENVIRONMENT": os.environ.get("ENVIRONMENT", "benchmark"),
+        "LINE_MESSAGE_CHANNEL_SECRET": secret,
+        "LINE_MESSAGE_CHANNEL_TOKEN": os.environ.get("LINE_MESSAGE_CHANNEL_TOKEN", "benchmark"),
+        "LINE_API_ENDPOINT": line_endpoint,
+        "DB_URL": db_url,
+    }
+    # DB_URL 取代個別的連線設定，但 Settings 仍要求這些欄位存在
+    for name in ("DB_HOST", "DB_PORT", "DB_USER", "DB_PASSWORD", "DB_NAME"):
+        env.setdefault(name, "")
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "src.main:app",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(workers),
+            "--log-level", "warning",
+        ],
+        env=env,
+    )
+
+
+async def wait_ready(target: str, server: subprocess.Popen | None, timeout: float = 60.0):
+    "Wait until the service answers, failing early if the server process exits"
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode}")
+            try:
+                async with session.get(target.rstrip("/") + READY_PATH) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server at {target} not ready after {timeout}s")
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results: list[ScenarioResult], meta: dict, directory: str) -> Path:
+    """
+    將結果與執行參數寫入 JSON，檔名包含時間與 commit 以便比較
+    """
+    created_at = datetime.now(timezone.utc)
+    commit = _git_commit()
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    path /= f"{created_at:%Y%m%dT%H%M%S}-{commit or 'unknown'}.json"
+    path.write_text(
+        json.dumps(
+            {
+                "created_at": created_at.isoformat(),
+                "commit": commit,
+                "meta": meta,
+                "results": [asdict(result) for result in results],
+            },
+            ensure_ascii=False,
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    return path
+
+
+def format_report(results: list[ScenarioResult], baseline: dict | None = None) -> str:
+    """
+    產生結果表格，指定 baseline 時附上 events/s 與 reply p95 的變化
+    """
+    previous = {
+        result["scenario"]: result for result in (baseline or {}).get("results", ())
+    }
+    lines = [
+        f"{'scenario':<12}{'events':>8}{'err':>6}{'t/o':>6}{'ev/s':>9}"
+        f"{'ack p50':>10}{'p95':>9}{'p99':>9}{'reply p50':>11}{'p95':>9}{'p99':>9}"
+    ]
+
+    def ms(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    for result in results:
+        line = (
+            f"{result.scenario:<12}{result.events:>8}{result.errors:>6}{result.timeouts:>6}"
+            f"{result.events_per_second:>9.1f}"
+            f"{ms(result.ack_ms['p50']):>10}{ms(result.ack_ms['p95']):>9}{ms(result.ack_ms['p99']):>9}"
+            f"{ms(result.reply_ms['p50']):>11}{ms(result.reply_ms['p95']):>9}{ms(result.reply_ms['p99']):>9}"
+        )
+        before = previous.get(result.scenario)
+        if before and before["events_per_second"] and before["reply_ms"]["p95"] and result.reply_ms["p95"]:
+            throughput = (result.events_per_second / before["events_per_second"] - 1) * 100
+            latency = (result.reply_ms["p95"] / before["reply_ms"]["p95"] - 1) * 100
+            line += f"  (ev/s {throughput:+.1f}%, reply p95 {latency:+.1f}%)"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,44 @@
+"""
+Signed Webhook Payloads
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+
+def sign(body: bytes, secret: str) -> str:
+    "X-Line-Signature of a webhook body"
+    return base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+
+
+def _event(event_type: str, user_id: str, reply_token: str) -> dict:
+    return {
+        "type": event_type,
+        "mode": "active",
+        "timestamp": int(time.time() * 1000),
+        "source": {"type": "user", "userId": user_id},
+        "webhookEventId": uuid.uuid4().hex.upper(),
+        "deliveryContext": {"isRedelivery": False},
+        "replyToken": reply_token,
+    }
+
+
+def message_event(text: str, user_id: str, reply_token: str) -> dict:
+    "Text message event"
+    return {
+        **_event("message", user_id, reply_token),
+        "message": {"id": uuid.uuid4().hex[:18], "type": "text", "text": text, "quoteToken": "q"},
+    }
+
+
+def postback_event(data: str, user_id: str, reply_token: str) -> dict:
+    "Postback event"
+    return {**_event("postback", user_id, reply_token), "postback": {"data": data}}
+
+
+def webhook_body(events: list[dict], destination: str = "Ubenchmark") -> bytes:
+    "Webhook request body for the given events"
+    return json.dumps({"destination": destination, "events": events}, ensure_ascii=False).encode()
@@ -22,12 +22,49 @@ class Settings(BaseSettings):
 
     LINE_MESSAGE_CHANNEL_SECRET: str
     LINE_MESSAGE_CHANNEL_TOKEN: str
+    # Messaging API 的位址，留空使用 LINE 官方位址 (壓力測試時指向本機的替身伺服器)
+    LINE_API_ENDPOINT: str = ""
+    # Messaging API 的連線池、逾時 (秒)、429/5xx 重試與斷路器設定
+    LINE_API_POOL_SIZE: int = 100
+    LINE_API_KEEPALIVE: float = 30
+    LINE_API_TIMEOUT: float = 5
+    LINE_API_CONNECT_TIMEOUT: float = 2
+    LINE_API_RETRIES: int = 2
+    LINE_API_RETRY_BACKOFF: float = 0.2
+    LINE_API_RETRY_MAX_DELAY: float = 2
+    LINE_API_BREAKER_THRESHOLD: int = 5
+    LINE_API_BREAKER_COOLDOWN: float = 30
 
     DB_HOST: str
     DB_PORT: str
     DB_USER: str
     DB_PASSWORD: str
     DB_NAME: str
+    # 完整的 SQLAlchemy async URL，設定時取代上面的連線設定 (例如 sqlite+aiosqlite:///bench.db)
+    DB_URL: str = ""
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+
+    SEARCH_INDEX_ENABLED: bool = True
+    DATASET_REFRESH_INTERVAL: float = 30
+    DATASET_SNAPSHOT_PATH: str = ""
+    SEARCH_CACHE_SIZE: int = 1024
+    SEARCH_CACHE_TTL: int = 300
+    SEARCH_COUNT_MODE: str = "exact"
+    SEARCH_COUNT_ESTIMATE_THRESHOLD: int = 1000
+    BUBBLE_CACHE_SIZE: int = 20000
+    BUBBLE_CACHE_TTL: int = 86400
+
+    SEARCH_STATE_BACKEND: str = "memory"
+    SEARCH_STATE_PATH: str = "search_state.db"
+    SEARCH_STATE_TTL: int = 1800
+    SEARCH_STATE_MAX_SIZE: int = 100000
+
+    WEBHOOK_WORKERS: int = 8
+    WEBHOOK_QUEUE_SIZE: int = 1000
+    WEBHOOK_DEDUP_SIZE: int = 100000
+    WEBHOOK_DEDUP_TTL: int = 3600
 
     model_config = SettingsConfigDict(env_file=f"{base_dir}/.env")
 
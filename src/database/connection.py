@@ -1,19 +1,60 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from ..config import settings
+from ..infra.metrics import registry
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+
+if settings.DB_URL:
+    # 同步連線使用同一個資料庫的預設 driver
+    ASYNC_SQLALCHEMY_DATABASE_URL = settings.DB_URL
+    _url = make_url(settings.DB_URL)
+    SQLALCHEMY_DATABASE_URL = _url.set(drivername=_url.get_backend_name()).render_as_string(
+        hide_password=False
+    )
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# SQLite 不使用連線池，不接受連線池的參數
+_pool_options = {} if engine.dialect.name == "sqlite" else {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+}
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    pool_pre_ping=True,
+    **_pool_options,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+def _pool_stat(name: str):
+    # 非 QueuePool (例如 SQLite 的 NullPool) 沒有這些統計，回傳 None 即不輸出
+    def read():
+        method = getattr(async_engine.pool, name, None)
+        return method() if method else None
+    return read
+
+
+for _name, _documentation in (
+    ("size", "Configured connection pool size"),
+    ("checkedout", "Connections currently checked out"),
+    ("checkedin", "Idle connections in the pool"),
+    ("overflow", "Overflow connections (negative until the pool is full)"),
+):
+    registry.callback(f"db_pool_{_name}", _documentation, _pool_stat(_name))
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,33 @@
+-- 醫事人員的生命週期欄位與異動紀錄 (PostgreSQL)
+--
+-- 既有資料庫執行一次即可，可重複執行；新資料庫由 Base.metadata.create_all 建立相同的結構。
+--     psql -h "$DB_HOST" -p "$DB_PORT" -U "$DB_USER" -d "$DB_NAME" -f src/database/migrations/0001_personnel_changes.sql
+
+BEGIN;
+
+ALTER TABLE medical_personnel
+    ADD COLUMN IF NOT EXISTS created_at timestamp without time zone,
+    ADD COLUMN IF NOT EXISTS updated_at timestamp without time zone,
+    ADD COLUMN IF NOT EXISTS is_active boolean NOT NULL DEFAULT true;
+
+-- SQLAlchemy 的 Enum 欄位儲存成員名稱
+DO $$
+BEGIN
+    CREATE TYPE changeoperation AS ENUM ('INSERT', 'UPDATE', 'DELETE', 'RELOAD');
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END
+$$;
+
+CREATE TABLE IF NOT EXISTS medical_personnel_changes (
+    id serial PRIMARY KEY,
+    personnel_id integer,
+    operation changeoperation NOT NULL,
+    changed_at timestamp without time zone NOT NULL
+);
+
+COMMENT ON COLUMN medical_personnel_changes.personnel_id IS '醫事人員 id，整批重新載入時為空';
+COMMENT ON COLUMN medical_personnel_changes.operation IS '異動類型';
+COMMENT ON COLUMN medical_personnel_changes.changed_at IS '異動時間';
+
+COMMIT;
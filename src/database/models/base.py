@@ -1,6 +1,6 @@
 import uuid
 import datetime
-from sqlalchemy import Column, DateTime, Boolean
+from sqlalchemy import Column, DateTime, Boolean, true
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -8,6 +8,10 @@ from sqlalchemy.ext.declarative import declarative_base
 Base = declarative_base()
 
 
+def utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
 class BaseModel(Base):
     """
     Database BaseModel
@@ -16,10 +20,6 @@ class BaseModel(Base):
     __abstract__ = True
 
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
-    created_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc))
-    updated_at = Column(
-        DateTime,
-        default=datetime.datetime.now(datetime.timezone.utc),
-        onupdate=datetime.datetime.now(datetime.timezone.utc),
-    )
-    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+    is_active = Column(Boolean, nullable=False, default=True, server_default=true())
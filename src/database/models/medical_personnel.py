@@ -1,12 +1,12 @@
 import enum
 from sqlalchemy import Column, Integer, String, Enum
-from .base import Base
+from .base import BaseModel
 
 class GraduationStatus(enum.Enum):
     STUDYING = "在學"
     GRADUATED = "畢業"
 
-class MedicalPersonnel(Base):
+class MedicalPersonnel(BaseModel):
     __tablename__ = 'medical_personnel'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -0,0 +1,25 @@
+import enum
+from sqlalchemy import Column, Integer, DateTime, Enum
+from .base import Base, utcnow
+
+class ChangeOperation(enum.Enum):
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+    RELOAD = "reload"
+
+class PersonnelChange(Base):
+    __tablename__ = 'medical_personnel_changes'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    personnel_id = Column(Integer, nullable=True, comment='醫事人員 id，整批重新載入時為空')
+    operation = Column(Enum(ChangeOperation), nullable=False, comment='異動類型')
+    changed_at = Column(
+        DateTime,
+        nullable=False,
+        default=utcnow,
+        comment='異動時間'
+    )
+
+    def __repr__(self):
+        return f"<PersonnelChange(id={self.id}, personnel_id={self.personnel_id}, operation={self.operation})>"
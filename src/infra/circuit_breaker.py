@@ -0,0 +1,73 @@
+"""
+Common Circuit Breaker
+用於整個專案的斷路器，外部服務持續失敗時暫停呼叫以快速失敗
+"""
+import time
+
+
+class CircuitOpenError(Exception):
+    """
+    斷路器開啟中，呼叫未送出
+    """
+
+
+class CircuitBreaker:
+    """
+    連續失敗 threshold 次後開啟，cooldown 秒內的呼叫直接失敗
+
+    冷卻後進入半開狀態，只放行一個試探呼叫：成功即關閉，失敗則重新開啟。
+
+    Args:
+        name: 服務名稱，用於錯誤訊息
+        threshold: 開啟前允許的連續失敗次數
+        cooldown: 開啟後的冷卻秒數
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, threshold: int, cooldown: float):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        "Current state: closed, open or half_open"
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._probing or time.monotonic() - self._opened_at >= self.cooldown:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self) -> bool:
+        "Raise CircuitOpenError unless a call may be made now; True when the call is the half-open probe"
+        if self._opened_at is None:
+            return False
+        if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        self._probing = True
+        return True
+
+    def record_success(self):
+        "Close the circuit after a successful call"
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        "Count a failed call, opening the circuit at the threshold"
+        self.failures += 1
+        self._probing = False
+        if self.failures >= self.threshold:
+            self._opened_at = time.monotonic()
+
+    def release(self):
+        "Give up a probe without a result (e.g. cancelled), letting another probe through"
+        self._probing = False
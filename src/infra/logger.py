@@ -1,26 +1,170 @@
 """
 Common Logger Configuration
 用於整個專案的通用日誌模組
+
+日誌先放入有上限的佇列，由背景執行緒寫入檔案與 stderr，事件迴圈不會因磁碟 I/O 而停頓。
+佇列已滿時捨棄新的紀錄並計數，之後再補記一筆捨棄的筆數。
 """
+import atexit
+import copy
+import json
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from pathlib import Path
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from .metrics import registry
+
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+
+
+class LogSettings(BaseSettings):
+    """
+    日誌設定 (LOG_ 開頭的環境變數)
+
+    與 Settings 分開，ingest 與 benchmarks 等不需要 LINE 設定的工具也能使用。
+    """
+
+    LEVEL: str = "INFO"
+    # 空字串不寫入檔案
+    FILE: str = "app.log"
+    # text 或 json
+    FORMAT: str = "text"
+    # 檔案超過此大小時輪替，0 不依大小輪替
+    MAX_BYTES: int = 10 * 1024 * 1024
+    # 依時間輪替的間隔 (例如 midnight、H)，設定時取代依大小輪替
+    ROTATE_WHEN: str = ""
+    BACKUP_COUNT: int = 7
+    # 佇列上限，超過時捨棄新的紀錄
+    QUEUE_SIZE: int = 10000
+
+    model_config = SettingsConfigDict(
+        env_prefix="LOG_",
+        env_file=f"{Path(__file__).resolve().parent.parent.parent}/.env",
+        extra="ignore",
+    )
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    每筆紀錄輸出為一行 JSON
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        if record.stack_info:
+            data["stack_info"] = record.stack_info
+        return json.dumps(data, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    不會阻塞的 QueueHandler，佇列已滿時捨棄紀錄並計數
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 在呼叫端合併訊息參數並將例外轉為文字，背景執行緒只負責格式化與寫入
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
-# 設定基本的 logging 配置
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler('app.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self._unreported:
+                self.queue.put_nowait(self._dropped_record())
+                self._unreported = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+
+    def _dropped_record(self) -> logging.LogRecord:
+        return logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            f"Dropped {self._unreported} log records while the log queue was full", None, None,
+        )
+
+
+def _file_handler(config: LogSettings) -> logging.Handler:
+    if config.ROTATE_WHEN:
+        return TimedRotatingFileHandler(
+            config.FILE, when=config.ROTATE_WHEN, backupCount=config.BACKUP_COUNT, encoding="utf-8"
+        )
+    if config.MAX_BYTES > 0:
+        return RotatingFileHandler(
+            config.FILE, maxBytes=config.MAX_BYTES, backupCount=config.BACKUP_COUNT, encoding="utf-8"
+        )
+    return logging.FileHandler(config.FILE, encoding="utf-8")
+
+
+def configure_logging(config: LogSettings | None = None) -> QueueListener:
+    """
+    以佇列與背景執行緒設定 root logger，回傳負責寫入的 QueueListener
+
+    Args:
+        config: 日誌設定，預設由環境變數讀取
+    """
+    config = config or LogSettings()
+    formatter = JsonFormatter() if config.FORMAT.lower() == "json" else logging.Formatter(TEXT_FORMAT)
+
+    handlers = [logging.StreamHandler()]
+    if config.FILE:
+        handlers.append(_file_handler(config))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(config.QUEUE_SIZE)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(config.LEVEL.upper())
+    root.addHandler(DroppingQueueHandler(log_queue))
+    return listener
+
+
+def _dropped() -> int:
+    return sum(
+        handler.dropped
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, DroppingQueueHandler)
+    )
+
+
+log_listener = configure_logging()
+
+registry.callback(
+    "log_records_dropped_total", "Log records dropped because the log queue was full",
+    _dropped, "counter",
 )
 
+
 def get_logger(name: str) -> logging.Logger:
     """
     獲取指定名稱的 logger 實例
-    
+
     Args:
         name: logger 名稱，通常使用模組名稱，如 'linebot', 'database' 等
-        
+
     Returns:
         logging.Logger: 配置好的 logger 實例
     """
@@ -0,0 +1,286 @@
+"""
+Common Metrics
+用於整個專案的行程內指標，以 Prometheus 文字格式輸出
+"""
+import math
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple[str, ...], labelvalues: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    """
+    指標的共同介面，子類別實作 samples
+    """
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    @abstractmethod
+    def samples(self):
+        "Yield (suffix, labels, value) tuples"
+
+    def render(self) -> list[str]:
+        "Render the metric in the Prometheus text format"
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """
+    只會遞增的計數器
+    """
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labelvalues, amount: float = 1):
+        "Increase the counter for the given label values"
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        for labelvalues, value in self._values.items():
+            yield "", _format_labels(self.labelnames, labelvalues), value
+
+
+class Gauge(_Metric):
+    """
+    可增減的數值
+    """
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, *labelvalues):
+        "Set the gauge for the given label values"
+        self._values[labelvalues] = value
+
+    def inc(self, *labelvalues, amount: float = 1):
+        "Increase the gauge for the given label values"
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1):
+        "Decrease the gauge for the given label values"
+        self.inc(*labelvalues, amount=-amount)
+
+    def samples(self):
+        for labelvalues, value in self._values.items():
+            yield "", _format_labels(self.labelnames, labelvalues), value
+
+
+class CallbackMetric(_Metric):
+    """
+    輸出時才呼叫 func 取得數值的指標，用於既有物件上已有的統計
+
+    func 回傳單一數值，或 {標籤值 tuple: 數值} 的 dict。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        func: Callable[[], float | dict[tuple, float]],
+        metric_type: str = "gauge",
+        labelnames: tuple[str, ...] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.metric_type = metric_type
+        self.func = func
+
+    def samples(self):
+        values = self.func()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labelvalues, value in values.items():
+            if value is not None:
+                yield "", _format_labels(self.labelnames, labelvalues), value
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labelvalues", "_start")
+
+    def __init__(self, histogram: "Histogram", labelvalues: tuple):
+        self._histogram = histogram
+        self._labelvalues = labelvalues
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start, *self._labelvalues)
+
+
+class Histogram(_Metric):
+    """
+    依區間累計觀測值的分布
+
+    每次 observe 只以二分搜尋找到區間並遞增一個計數，輸出時才轉為累計值。
+    """
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 標籤值: [各區間計數..., +Inf 計數, 總和]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *labelvalues):
+        "Record an observation for the given label values"
+        data = self._values.get(labelvalues)
+        if data is None:
+            data = self._values[labelvalues] = [0] * (len(self.buckets) + 2)
+        data[bisect_left(self.buckets, value)] += 1
+        data[-1] += value
+
+    def time(self, *labelvalues) -> _Timer:
+        "Context manager that observes the elapsed seconds"
+        return _Timer(self, labelvalues)
+
+    def samples(self):
+        for labelvalues, data in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), data):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, labelvalues, f'le="{_format_value(bound)}"'
+                )
+                yield "_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield "_sum", labels, data[-1]
+            yield "_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """
+    行程內的指標集合
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        "Register a metric, returning the existing one with the same name"
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        "Create and register a counter"
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        "Create and register a gauge"
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        "Create and register a histogram"
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        func: Callable[[], float | dict[tuple, float]],
+        metric_type: str = "gauge",
+        labelnames: tuple[str, ...] = (),
+    ) -> CallbackMetric:
+        "Register a metric whose value is read from func at scrape time"
+        return self.register(CallbackMetric(name, documentation, func, metric_type, labelnames))
+
+    def render(self) -> str:
+        "Render every metric in the Prometheus text format"
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# 熱路徑各階段耗時，stage 例如 callback、search_fetch、template、reply_message
+stage_seconds = registry.histogram(
+    "popo_stage_seconds", "Time spent in each hot-path stage", ("stage",)
+)
+
+
+# 以名稱登記的 TTLCache，輸出時才讀取其統計
+_caches: dict[str, Callable[[], dict]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], dict]):
+    """
+    登記 cache，輸出其命中、未命中、淘汰次數與筆數
+
+    Args:
+        name: cache 標籤值
+        stats: 回傳 TTLCache.stats() 格式的函式
+    """
+    _caches[name] = stats
+
+
+def _cache_stat(key: str) -> Callable[[], dict[tuple, float]]:
+    return lambda: {(name,): stats()[key] for name, stats in _caches.items()}
+
+
+for _key, _metric_type, _documentation in (
+    ("hits_total", "counter", "Cache hits"),
+    ("misses_total", "counter", "Cache misses"),
+    ("evictions_total", "counter", "Cache evictions"),
+    ("size", "gauge", "Cached entries"),
+):
+    registry.callback(
+        f"popo_cache_{_key}",
+        _documentation,
+        _cache_stat(_key.removesuffix("_total")),
+        _metric_type,
+        ("cache",),
+    )
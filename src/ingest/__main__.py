@@ -0,0 +1,66 @@
+"""
+Ingest CLI
+
+Usage:
+    python -m src.ingest data.csv
+    python -m src.ingest export.html --batch-size 10000
+    python -m src.ingest data.csv --mode diff
+    python -m src.ingest data.csv --snapshot dataset.snapshot
+"""
+import argparse
+import time
+from src.config import settings
+from src.database.connection import engine
+from src.infra.logger import get_logger
+from .loader import load_records
+from .parser import parse_file
+from .refresh import refresh_records
+from .snapshot import write_dataset_snapshot
+
+logger = get_logger("ingest")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        prog="python -m src.ingest",
+        description="Load the 波波一覽表 dataset into medical_personnel",
+    )
+    arg_parser.add_argument("path", help="CSV file or exported list page")
+    arg_parser.add_argument("--format", choices=("csv", "html"), help="Source format")
+    arg_parser.add_argument("--batch-size", type=int, default=5000, help="Rows per batch")
+    arg_parser.add_argument(
+        "--mode",
+        choices=("replace", "diff"),
+        default="replace",
+        help="replace swaps in a full reload; diff applies only inserts, updates and soft deletes",
+    )
+    arg_parser.add_argument(
+        "--snapshot",
+        default=settings.DATASET_SNAPSHOT_PATH,
+        help="Write a dataset snapshot file for the workers after loading",
+    )
+    arg_parser.add_argument(
+        "--dry-run", action="store_true", help="Parse the source without loading it"
+    )
+    args = arg_parser.parse_args()
+
+    started = time.perf_counter()
+    records = parse_file(args.path, args.format)
+    if args.dry_run:
+        total = sum(1 for _ in records)
+        logger.info("[Ingest] Parsed %d rows in %.2fs", total, time.perf_counter() - started)
+    elif args.mode == "diff":
+        counts = refresh_records(records, engine, args.batch_size)
+        logger.info(
+            "[Ingest] Refreshed %s in %.2fs", counts, time.perf_counter() - started
+        )
+    else:
+        total = load_records(records, engine, args.batch_size)
+        logger.info("[Ingest] Loaded %d rows in %.2fs", total, time.perf_counter() - started)
+
+    if args.snapshot and not args.dry_run:
+        write_dataset_snapshot(engine, args.snapshot)
+
+
+if __name__ == "__main__":
+    main()
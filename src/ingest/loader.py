@@ -0,0 +1,150 @@
+"""
+Medical Personnel Bulk Loader
+"""
+import csv
+import datetime
+import io
+from itertools import islice
+from typing import Iterable, Iterator
+from sqlalchemy import MetaData, insert, delete, select
+from sqlalchemy.engine import Engine
+from src.database.models.base import utcnow
+from src.database.models.medical_personnel import MedicalPersonnel
+from src.database.models.personnel_change import PersonnelChange, ChangeOperation
+from src.infra.logger import get_logger
+
+logger = get_logger("ingest")
+
+TABLE = MedicalPersonnel.__tablename__
+STAGING_TABLE = f"{TABLE}_staging"
+OLD_TABLE = f"{TABLE}_old"
+
+COLUMNS = (
+    "city",
+    "hospital",
+    "department",
+    "name",
+    "education",
+    "university",
+    "graduation_status",
+)
+
+LIFECYCLE_COLUMNS = ("is_active", "created_at", "updated_at")
+
+
+def batched(records: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    "Split records into lists of at most size items"
+    iterator = iter(records)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def load_records(records: Iterable[dict], engine: Engine, batch_size: int = 5000) -> int:
+    """
+    將資料載入暫存表後一次替換 medical_personnel，替換前讀取端仍看到舊資料
+
+    PostgreSQL 以 COPY 載入並以 rename 替換資料表，其他資料庫以 executemany 載入。
+    替換後在異動紀錄寫入一筆 reload，通知服務重新載入整份資料。
+
+    Returns:
+        載入筆數
+    """
+    if engine.dialect.name == "postgresql":
+        return _load_postgres(records, engine, batch_size)
+    return _load_generic(records, engine, batch_size)
+
+
+def _copy_buffer(batch: list[dict], now: datetime.datetime) -> io.StringIO:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in batch:
+        # SQLAlchemy 的 Enum 欄位儲存的是成員名稱
+        writer.writerow(
+            [
+                record[column].name if column == "graduation_status" else record[column]
+                for column in COLUMNS
+            ]
+            + [True, now.isoformat(), now.isoformat()]
+        )
+    buffer.seek(0)
+    return buffer
+
+
+def _load_postgres(records: Iterable[dict], engine: Engine, batch_size: int) -> int:
+    copy_sql = (
+        f"COPY {STAGING_TABLE} ({', '.join(COLUMNS + LIFECYCLE_COLUMNS)}) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    now = utcnow()
+    total = 0
+    raw_connection = engine.raw_connection()
+    try:
+        with raw_connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+            cursor.execute(f"CREATE TABLE {STAGING_TABLE} (LIKE {TABLE} INCLUDING ALL)")
+
+            for batch in batched(records, batch_size):
+                cursor.copy_expert(copy_sql, _copy_buffer(batch, now))
+                total += len(batch)
+                logger.info("[Ingest] Copied %d rows", total)
+
+            # 暫存表沿用原資料表的 id sequence，刪除舊表前先轉移擁有者
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (TABLE,))
+            (sequence,) = cursor.fetchone()
+            cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}")
+            cursor.execute(f"ALTER TABLE {STAGING_TABLE} RENAME TO {TABLE}")
+            if sequence:
+                cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id")
+            cursor.execute(f"DROP TABLE {OLD_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {PersonnelChange.__tablename__} (operation, changed_at) "
+                "VALUES (%s, %s)",
+                (ChangeOperation.RELOAD.name, now),
+            )
+        raw_connection.commit()
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
+
+    return total
+
+
+def _load_generic(records: Iterable[dict], engine: Engine, batch_size: int) -> int:
+    table = MedicalPersonnel.__table__
+    staging = table.to_metadata(MetaData(), name=STAGING_TABLE)
+    for index in list(staging.indexes):
+        staging.indexes.discard(index)
+
+    now = utcnow()
+    lifecycle = {"is_active": True, "created_at": now, "updated_at": now}
+    total = 0
+    with engine.begin() as connection:
+        staging.drop(connection, checkfirst=True)
+        staging.create(connection)
+
+        for batch in batched(records, batch_size):
+            connection.execute(
+                insert(staging),
+                [
+                    {**{column: record[column] for column in COLUMNS}, **lifecycle}
+                    for record in batch
+                ],
+            )
+            total += len(batch)
+            logger.info("[Ingest] Inserted %d rows", total)
+
+        connection.execute(delete(table))
+        connection.execute(
+            insert(table).from_select(
+                COLUMNS + LIFECYCLE_COLUMNS,
+                select(*(staging.c[column] for column in COLUMNS + LIFECYCLE_COLUMNS)),
+            )
+        )
+        staging.drop(connection)
+        connection.execute(
+            insert(PersonnelChange).values(operation=ChangeOperation.RELOAD, changed_at=now)
+        )
+
+    return total
@@ -0,0 +1,200 @@
+"""
+波波一覽表 Source Parser
+"""
+import csv
+import re
+import unicodedata
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterator
+from src.database.models.medical_personnel import GraduationStatus
+
+# 欄位名稱對照
+FIELD_ALIASES = {
+    "city": ("縣市", "城市", "地區", "city"),
+    "hospital": ("醫療院所", "醫院", "hospital"),
+    "department": ("科別", "department"),
+    "name": ("姓名", "醫師", "name"),
+    "education": ("學歷", "education"),
+    "graduation_status": ("在學狀態", "graduation_status"),
+}
+
+# 列表頁面沒有表頭時的欄位順序
+COLUMN_ORDER = ("city", "hospital", "department", "name", "education")
+
+REQUIRED_FIELDS = ("city", "hospital", "name")
+
+UNIVERSITY_PATTERN = re.compile(r".+?(?:大學|學院)")
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def normalize_text(value: str | None) -> str | None:
+    """
+    全形轉半形並去除空白，空字串回傳 None
+    """
+    if value is None:
+        return None
+    value = unicodedata.normalize("NFKC", value).strip()
+    return value or None
+
+
+def normalize_city(value: str | None) -> str | None:
+    """
+    統一縣市名稱，例如 "臺北市" -> "台北"
+    """
+    value = normalize_text(value)
+    if value is None:
+        return None
+    value = value.replace("臺", "台")
+    if len(value) > 2 and value[-1] in ("市", "縣"):
+        value = value[:-1]
+    return value
+
+
+def split_university(education: str | None) -> str | None:
+    """
+    由學歷取出大學名稱，例如 "中國醫藥大學醫學系" -> "中國醫藥大學"
+    """
+    if not education:
+        return None
+    match = UNIVERSITY_PATTERN.match(education)
+    if match:
+        return match.group(0)
+    return re.split(r"[,，(（]", education)[0].strip() or None
+
+
+def normalize_record(raw: dict) -> dict | None:
+    """
+    將原始資料整理成 MedicalPersonnel 欄位，缺少必要欄位時回傳 None
+    """
+    education = normalize_text(raw.get("education"))
+    status = normalize_text(raw.get("graduation_status")) or ""
+    record = {
+        "city": normalize_city(raw.get("city")),
+        "hospital": normalize_text(raw.get("hospital")),
+        "department": normalize_text(raw.get("department")),
+        "name": normalize_text(raw.get("name")),
+        "education": education,
+        "university": split_university(education),
+        "graduation_status": (
+            GraduationStatus.STUDYING
+            if GraduationStatus.STUDYING.value in status + (education or "")
+            else GraduationStatus.GRADUATED
+        ),
+    }
+    if any(not record[field] for field in REQUIRED_FIELDS):
+        return None
+    return record
+
+
+def _map_header(header: list[str]) -> list[str | None]:
+    lookup = {
+        alias.lower(): field
+        for field, aliases in FIELD_ALIASES.items()
+        for alias in aliases
+    }
+    return [lookup.get((normalize_text(column) or "").lower()) for column in header]
+
+
+def parse_csv(path: Path) -> Iterator[dict]:
+    """
+    逐列讀取 CSV，第一列須為表頭
+    """
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        reader = csv.reader(file)
+        header = _map_header(next(reader, []))
+        for values in reader:
+            yield {field: value for field, value in zip(header, values) if field}
+
+
+class _TableParser(HTMLParser):
+    """
+    收集 HTML 表格中的每一列，省略的 </td>、</tr> 視為在下一格、下一列或檔案結尾結束
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rows: list[tuple[bool, list[str]]] = []
+        self._cells: list[str] | None = None
+        self._cell: list[str] | None = None
+        self._is_header = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._end_row()
+            self._cells = []
+            self._is_header = False
+        elif tag in ("td", "th") and self._cells is not None:
+            self._end_cell()
+            self._cell = []
+            self._is_header = self._is_header or tag == "th"
+        elif tag == "br" and self._cell is not None:
+            self._cell.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th"):
+            self._end_cell()
+        elif tag in ("tr", "table"):
+            self._end_row()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def close(self):
+        super().close()
+        self._end_row()
+
+    def _end_cell(self):
+        if self._cell is not None and self._cells is not None:
+            self._cells.append("".join(self._cell))
+        self._cell = None
+
+    def _end_row(self):
+        self._end_cell()
+        if self._cells:
+            self.rows.append((self._is_header, self._cells))
+        self._cells = None
+
+
+def _read_html(path: Path) -> Iterator[list[tuple[bool, list[str]]]]:
+    parser = _TableParser()
+    with open(path, encoding="utf-8") as file:
+        while chunk := file.read(READ_CHUNK_SIZE):
+            parser.feed(chunk)
+            rows, parser.rows = parser.rows, []
+            yield rows
+    # close 會處理緩衝中尚未解析的內容與最後一列
+    parser.close()
+    yield parser.rows
+
+
+def parse_html(path: Path) -> Iterator[dict]:
+    """
+    逐列讀取匯出的列表頁面中的表格
+    """
+    header = list(COLUMN_ORDER)
+    for rows in _read_html(path):
+        for is_header, cells in rows:
+            if is_header:
+                header = _map_header(cells)
+                continue
+            yield {field: value for field, value in zip(header, cells) if field}
+
+
+def parse_file(path: str | Path, file_format: str | None = None) -> Iterator[dict]:
+    """
+    依副檔名或指定格式讀取來源檔案，回傳整理後的資料
+
+    Args:
+        path: 來源檔案路徑
+        file_format: "csv" 或 "html"，未指定時依副檔名判斷
+    """
+    path = Path(path)
+    file_format = file_format or ("csv" if path.suffix.lower() == ".csv" else "html")
+    raw_records = parse_csv(path) if file_format == "csv" else parse_html(path)
+    for raw in raw_records:
+        record = normalize_record(raw)
+        if record is not None:
+            yield record
@@ -0,0 +1,103 @@
+"""
+Medical Personnel Incremental Refresh
+"""
+from typing import Iterable
+from sqlalchemy import select, insert, update, bindparam
+from sqlalchemy.engine import Engine
+from src.database.models.base import utcnow
+from src.database.models.medical_personnel import MedicalPersonnel
+from src.database.models.personnel_change import PersonnelChange, ChangeOperation
+from src.infra.logger import get_logger
+from .loader import COLUMNS, batched
+
+logger = get_logger("ingest")
+
+# 用來辨識同一位醫事人員的欄位
+KEY_COLUMNS = ("name", "hospital", "department")
+VALUE_COLUMNS = tuple(column for column in COLUMNS if column not in KEY_COLUMNS)
+
+
+def _key(record) -> tuple:
+    if isinstance(record, dict):
+        return tuple(record[column] for column in KEY_COLUMNS)
+    return tuple(getattr(record, column) for column in KEY_COLUMNS)
+
+
+def refresh_records(records: Iterable[dict], engine: Engine, batch_size: int = 5000) -> dict:
+    """
+    與目前資料比對後只套用差異: 新增、更新與停用 (is_active = false)
+
+    每筆異動都會寫入 medical_personnel_changes，服務據此只更新受影響的索引與快取。
+
+    Returns:
+        各類異動筆數
+    """
+    table = MedicalPersonnel.__table__
+    incoming = {_key(record): record for record in records}
+    now = utcnow()
+
+    with engine.begin() as connection:
+        current = connection.execute(
+            select(table.c.id, table.c.is_active, *(table.c[column] for column in COLUMNS))
+        ).all()
+
+        updates, deletes = [], []
+        seen = set()
+        for row in current:
+            key = _key(row)
+            record = incoming.get(key)
+            if record is None or key in seen:
+                # 來源已移除或與其他資料重複
+                if row.is_active:
+                    deletes.append(row.id)
+                continue
+            seen.add(key)
+            if not row.is_active or any(
+                getattr(row, column) != record[column] for column in VALUE_COLUMNS
+            ):
+                updates.append({"_id": row.id, **{column: record[column] for column in VALUE_COLUMNS}})
+
+        inserts = [record for key, record in incoming.items() if key not in seen]
+
+        changes = []
+        for batch in batched(inserts, batch_size):
+            result = connection.execute(
+                insert(table).returning(table.c.id),
+                [{**record, "is_active": True, "created_at": now, "updated_at": now} for record in batch],
+            )
+            changes.extend((pk, ChangeOperation.INSERT) for pk in result.scalars())
+
+        if updates:
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("_id"))
+                .values(
+                    **{column: bindparam(column) for column in VALUE_COLUMNS},
+                    is_active=True,
+                    updated_at=now,
+                )
+            )
+            for batch in batched(updates, batch_size):
+                connection.execute(statement, batch)
+            changes.extend((update_["_id"], ChangeOperation.UPDATE) for update_ in updates)
+
+        if deletes:
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("_id"))
+                .values(is_active=False, updated_at=now)
+            )
+            for batch in batched(deletes, batch_size):
+                connection.execute(statement, [{"_id": pk} for pk in batch])
+            changes.extend((pk, ChangeOperation.DELETE) for pk in deletes)
+
+        for batch in batched(changes, batch_size):
+            connection.execute(
+                insert(PersonnelChange),
+                [
+                    {"personnel_id": pk, "operation": operation, "changed_at": now}
+                    for pk, operation in batch
+                ],
+            )
+
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes)}
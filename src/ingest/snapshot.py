@@ -0,0 +1,32 @@
+"""
+Dataset Snapshot Writer
+"""
+from sqlalchemy import select, func
+from sqlalchemy.engine import Engine
+from src.database.models.medical_personnel import MedicalPersonnel
+from src.database.models.personnel_change import PersonnelChange
+from src.infra.logger import get_logger
+from src.popo.index import SearchIndex
+from src.popo.snapshot import PersonnelSnapshot
+
+logger = get_logger("ingest")
+
+
+def write_dataset_snapshot(engine: Engine, path: str) -> int:
+    """
+    由資料庫建立搜尋索引並寫入快照檔案，回傳快照的資料版本 (最新的異動 id)
+
+    版本在讀取資料前取得，讀取期間的異動會由 worker 依異動紀錄重新套用。
+    """
+    columns = [getattr(MedicalPersonnel, column) for column in PersonnelSnapshot.COLUMNS]
+    with engine.connect() as conn:
+        version = conn.execute(select(func.coalesce(func.max(PersonnelChange.id), 0))).scalar()
+        rows = conn.execute(
+            select(MedicalPersonnel.id, *columns).where(MedicalPersonnel.is_active.is_(True))
+        )
+        index = SearchIndex()
+        index.build(rows)
+
+    index.dump(path, version)
+    logger.info("[Ingest] Wrote snapshot version %d with %d rows to %s", version, len(index.rows), path)
+    return version
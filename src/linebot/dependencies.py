@@ -2,18 +2,115 @@
 LINEBOT Dependencies
 """
 
+import asyncio
+import itertools
+import random
+import ssl
 import sys
-from collections import defaultdict
-from datetime import datetime, timedelta
+import aiohttp
 from linebot.v3 import WebhookParser
 from linebot.v3.messaging import (
     Configuration,
     AsyncApiClient,
     AsyncMessagingApi,
 )
+from linebot.v3.messaging.exceptions import ApiException
 from src.config import settings
+from src.infra.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.infra.logger import get_logger
+from src.infra.metrics import registry, stage_seconds
+from .state import create_search_state_store
+
+logger = get_logger("linebot")
+
+search_state_store = create_search_state_store()
+
+# 呼叫 Messaging API 可能拋出的錯誤，代表 LINE 端或網路異常而非程式錯誤
+LINE_API_ERRORS = (ApiException, aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError)
+
+api_retries = registry.counter(
+    "linebot_api_retries_total", "Messaging API calls retried", ("method",)
+)
+api_failures = registry.counter(
+    "linebot_api_failures_total", "Messaging API calls that failed after retries", ("method", "reason")
+)
+
+
+def _retryable(error: Exception) -> bool:
+    # 429 與 5xx 可能是暫時性的，其他 4xx 重送也不會成功
+    if isinstance(error, ApiException):
+        return error.status == 429 or (error.status or 0) >= 500
+    return True
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    "Full jitter backoff, honouring Retry-After on 429 responses"
+    cap = settings.LINE_API_RETRY_MAX_DELAY
+    delay = random.uniform(0, min(cap, settings.LINE_API_RETRY_BACKOFF * 2 ** attempt))
+    headers = getattr(error, "headers", None) or {}
+    try:
+        retry_after = float(headers.get("Retry-After", 0))
+    except ValueError:
+        retry_after = 0
+    return max(delay, min(retry_after, cap))
+
+
+class ResilientMessagingApi(AsyncMessagingApi):
+    """
+    加上逾時、重試與斷路器的 AsyncMessagingApi
+
+    429 與 5xx 以 full jitter 退避重試，重試次數有上限；連續失敗時斷路器開啟，
+    之後的呼叫直接拋出 CircuitOpenError，不會在 LINE 緩慢時累積等待中的 coroutine。
+    """
+
+    def __init__(self, api_client: AsyncApiClient, breaker: CircuitBreaker):
+        super().__init__(api_client)
+        self.breaker = breaker
+        self.timeout = aiohttp.ClientTimeout(
+            total=settings.LINE_API_TIMEOUT, connect=settings.LINE_API_CONNECT_TIMEOUT
+        )
+
+    async def _call(self, method_name: str, method, *args, **kwargs):
+        kwargs.setdefault("_request_timeout", self.timeout)
+        try:
+            probe = self.breaker.before_call()
+        except CircuitOpenError:
+            api_failures.inc(method_name, "circuit_open")
+            raise
+        try:
+            for attempt in itertools.count():
+                try:
+                    result = await method(*args, **kwargs)
+                except LINE_API_ERRORS as e:
+                    if not _retryable(e):
+                        # LINE 有回應，只是請求本身有誤
+                        self.breaker.record_success()
+                        api_failures.inc(method_name, str(e.status))
+                        raise
+                    if attempt >= settings.LINE_API_RETRIES:
+                        # 重試用盡才算一次失敗
+                        self.breaker.record_failure()
+                        api_failures.inc(method_name, str(getattr(e, "status", None) or type(e).__name__))
+                        raise
+                    api_retries.inc(method_name)
+                    delay = _retry_delay(attempt, e)
+                    logger.warning(
+                        "[LineApi] %s failed (%s), retrying in %.2fs",
+                        method_name, getattr(e, "status", None) or type(e).__name__, delay,
+                    )
+                    await asyncio.sleep(delay)
+                else:
+                    self.breaker.record_success()
+                    return result
+        finally:
+            if probe:
+                # 試探呼叫被取消時沒有結果，讓下一個呼叫可以試探
+                self.breaker.release()
+
+    async def reply_message(self, *args, **kwargs):
+        with stage_seconds.time("reply_message"):
+            return await self._call("reply_message", super().reply_message, *args, **kwargs)
 
-search_states = defaultdict(dict)
 
 class LineBotApiWrapper:
     "Linebot Api Wrapper"
@@ -27,16 +124,46 @@ class LineBotApiWrapper:
             sys.exit(1)
 
         self.configuration = Configuration(
-            access_token=settings.LINE_MESSAGE_CHANNEL_TOKEN
+            host=settings.LINE_API_ENDPOINT or None,
+            access_token=settings.LINE_MESSAGE_CHANNEL_TOKEN,
+        )
+        self.breaker = CircuitBreaker(
+            "LINE Messaging API",
+            settings.LINE_API_BREAKER_THRESHOLD,
+            settings.LINE_API_BREAKER_COOLDOWN,
         )
         self.async_api_client = None
         self.async_messaging_api = None
 
+    def _ssl_context(self) -> ssl.SSLContext:
+        # 與 SDK 的 RESTClientObject 相同：CA、用戶端憑證與 verify_ssl 設定
+        context = ssl.create_default_context(cafile=self.configuration.ssl_ca_cert)
+        if self.configuration.cert_file:
+            context.load_cert_chain(self.configuration.cert_file, keyfile=self.configuration.key_file)
+        if not self.configuration.verify_ssl:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def _session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.configuration.connection_pool_maxsize,
+            keepalive_timeout=settings.LINE_API_KEEPALIVE,
+            ssl=self._ssl_context(),
+        )
+        return aiohttp.ClientSession(connector=connector, trust_env=True)
+
     async def get_api(self):
         "Get line message api client"
         if self.async_api_client is None:
+            self.configuration.connection_pool_maxsize = settings.LINE_API_POOL_SIZE
             self.async_api_client = AsyncApiClient(self.configuration)
-            self.async_messaging_api = AsyncMessagingApi(self.async_api_client)
+            # SDK 的 session 無法設定 keep-alive，改用相同 SSL 設定的連線池；
+            # proxy 與 proxy_headers 由 rest_client 在每次請求時帶入，不受影響
+            rest_client = self.async_api_client.rest_client
+            await rest_client.pool_manager.close()
+            rest_client.pool_manager = self._session()
+            self.async_messaging_api = ResilientMessagingApi(self.async_api_client, self.breaker)
         return self.async_messaging_api
 
     async def close(self):
@@ -48,6 +175,14 @@ class LineBotApiWrapper:
 
 
 line_bot_api_wrapper = LineBotApiWrapper()
+
+_BREAKER_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+registry.callback(
+    "linebot_api_circuit_state", "Messaging API circuit breaker state (0 closed, 1 half open, 2 open)",
+    lambda: _BREAKER_STATES[line_bot_api_wrapper.breaker.state],
+)
+
 parser = WebhookParser(settings.LINE_MESSAGE_CHANNEL_SECRET)
 
 
@@ -55,26 +190,17 @@ async def get_line_bot_api():
     "Get linebot api"
     return await line_bot_api_wrapper.get_api()
 
-def get_search_state(user_id: str) -> dict:
+async def get_search_state(user_id: str) -> dict:
     """
     獲取使用者搜尋狀態
     """
 
-    current_time = datetime.now()
-    expired_users = [
-        uid for uid, state in search_states.items()
-        if state.get('timestamp', current_time) < current_time - timedelta(minutes=30)
-    ]
+    return await search_state_store.get(user_id)
 
-    for uid in expired_users:
-        del search_states[uid]
-
-    return search_states[user_id]
-
-def update_search_state(user_id: str, state: dict):
+async def update_search_state(user_id: str, state: dict):
     """
     更新使用者搜尋狀態
     """
 
-    state['timestamp'] = datetime.now()
-    search_states[user_id] = state
+    await search_state_store.set(user_id, state)
+
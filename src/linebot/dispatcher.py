@@ -0,0 +1,215 @@
+"""
+LINEBOT Event Dispatcher
+"""
+import asyncio
+import time
+import zlib
+from linebot.v3.webhooks import Event
+from src.config import settings
+from src.database.connection import AsyncSessionLocal
+from src.infra.cache import TTLCache
+from src.infra.logger import get_logger
+from src.infra.metrics import registry
+from .dependencies import LINE_API_ERRORS, get_line_bot_api
+from .event_handler import get_handler
+
+logger = get_logger("linebot")
+
+handler_seconds = registry.histogram(
+    "linebot_handler_seconds", "Time spent in each event handler", ("handler",)
+)
+
+
+def _ordering_key(event: Event) -> str | None:
+    "Events from the same user / group / room share a key"
+    source = getattr(event, "source", None)
+    for attr in ("user_id", "group_id", "room_id"):
+        value = getattr(source, attr, None)
+        if value:
+            return value
+    return None
+
+
+class EventDispatcher:
+    """
+    Webhook 事件背景處理
+
+    每個 worker 擁有自己的有界佇列，同一使用者的事件固定分派到同一個 worker，
+    因此不同使用者的事件可以並行處理，而同一使用者的事件仍依序處理。
+
+    LINE 重送的事件 (deliveryContext.isRedelivery) 若其 webhookEventId 已處理過，
+    會在分派前直接丟棄。
+
+    enqueue 不會等待：worker 的佇列已滿時捨棄事件並計數，由 callback 回應 503 讓 LINE 重送，
+    重送時已排入佇列的事件視為重複而丟棄，被捨棄的事件則再次分派。
+
+    Args:
+        workers: worker 數量
+        queue_size: 所有佇列的總容量，佇列已滿時捨棄新的事件
+        dedup_size: 記錄 webhookEventId 的最大筆數
+        dedup_ttl: webhookEventId 的保存秒數
+    """
+
+    def __init__(self, workers: int, queue_size: int, dedup_size: int, dedup_ttl: float):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.processed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.in_flight = 0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self._lag_total = 0.0
+        self._round_robin = 0
+        self._queues: list[asyncio.Queue] = []
+        self._tasks: list[asyncio.Task] = []
+        self._seen_events = TTLCache(dedup_size, dedup_ttl)
+
+    @property
+    def running(self) -> bool:
+        "Whether the workers have been started"
+        return bool(self._tasks)
+
+    def start(self):
+        "Start the worker tasks"
+        if self.running:
+            return
+        maxsize = max(1, self.queue_size // self.workers)
+        self._queues = [asyncio.Queue(maxsize=maxsize) for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._work(queue), name=f"linebot-worker-{i}")
+            for i, queue in enumerate(self._queues)
+        ]
+
+    async def stop(self, timeout: float = 10):
+        "Drain the queues, then stop the workers"
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("[Dispatcher] %d events dropped on shutdown", self.depth)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues = []
+
+    def _is_duplicate(self, event: Event) -> bool:
+        event_id = getattr(event, "webhook_event_id", None)
+        if not event_id:
+            return False
+        delivery_context = getattr(event, "delivery_context", None)
+        if getattr(delivery_context, "is_redelivery", False) and self._seen_events.get(event_id):
+            return True
+        self._seen_events.set(event_id, True)
+        return False
+
+    def enqueue(self, event: Event) -> bool:
+        "Queue an event for background processing without waiting; False when the queue was full"
+        if self._is_duplicate(event):
+            self.duplicates += 1
+            logger.info("[Dispatcher] Drop redelivered event: %s", event.webhook_event_id)
+            return True
+
+        key = _ordering_key(event)
+        if key is None:
+            index = self._round_robin % self.workers
+            self._round_robin += 1
+        else:
+            index = zlib.crc32(key.encode()) % self.workers
+        try:
+            self._queues[index].put_nowait((time.monotonic(), event))
+        except asyncio.QueueFull:
+            # 不記為已處理，LINE 重送時可以再次分派
+            event_id = getattr(event, "webhook_event_id", None)
+            if event_id:
+                self._seen_events.pop(event_id)
+            self.dropped += 1
+            logger.warning("[Dispatcher] Queue %d is full, drop event: %s", index, event_id)
+            return False
+        return True
+
+    async def _work(self, queue: asyncio.Queue):
+        line_bot_api = await get_line_bot_api()
+        while True:
+            enqueued_at, event = await queue.get()
+            lag = time.monotonic() - enqueued_at
+            self.lag_last = lag
+            self.lag_max = max(self.lag_max, lag)
+            self._lag_total += lag
+            self.in_flight += 1
+            try:
+                handler = get_handler(event)
+                if handler:
+                    with handler_seconds.time(type(handler).__name__):
+                        async with AsyncSessionLocal() as db:
+                            await handler.handle(event, line_bot_api, db)
+            except LINE_API_ERRORS as e:
+                # LINE 端異常已由 client 重試與計數，不需要記錄 traceback
+                self.failed += 1
+                logger.warning("[Dispatcher] LINE API unavailable: %s", str(e).strip())
+            except Exception as e:
+                self.failed += 1
+                logger.error("[Dispatcher] Error handling event: %s", str(e), exc_info=True)
+            finally:
+                self.in_flight -= 1
+                self.processed += 1
+                queue.task_done()
+
+    @property
+    def depth(self) -> int:
+        "Number of queued events"
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> dict:
+        "Queue depth and lag metrics"
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "depth": self.depth,
+            "processed": self.processed,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "in_flight": self.in_flight,
+            "lag_last": self.lag_last,
+            "lag_max": self.lag_max,
+            "lag_avg": self._lag_total / self.processed if self.processed else 0.0,
+        }
+
+
+event_dispatcher = EventDispatcher(
+    settings.WEBHOOK_WORKERS,
+    settings.WEBHOOK_QUEUE_SIZE,
+    settings.WEBHOOK_DEDUP_SIZE,
+    settings.WEBHOOK_DEDUP_TTL,
+)
+
+registry.callback(
+    "linebot_events_in_flight", "Webhook events being handled", lambda: event_dispatcher.in_flight
+)
+registry.callback("linebot_queue_depth", "Queued webhook events", lambda: event_dispatcher.depth)
+registry.callback(
+    "linebot_events_processed_total", "Handled webhook events",
+    lambda: event_dispatcher.processed, "counter",
+)
+registry.callback(
+    "linebot_events_failed_total", "Webhook events whose handler raised",
+    lambda: event_dispatcher.failed, "counter",
+)
+registry.callback(
+    "linebot_events_duplicate_total", "Redelivered webhook events dropped",
+    lambda: event_dispatcher.duplicates, "counter",
+)
+registry.callback(
+    "linebot_events_dropped_total", "Webhook events dropped because the worker queue was full",
+    lambda: event_dispatcher.dropped, "counter",
+)
+registry.callback(
+    "linebot_queue_lag_max_seconds", "Longest time an event waited in the queue",
+    lambda: event_dispatcher.lag_max,
+)
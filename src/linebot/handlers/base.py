@@ -2,7 +2,7 @@
 Linebot Base Handler
 """
 from abc import ABC, abstractmethod
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from linebot.v3.webhooks import Event
 from linebot.v3.messaging import MessagingApi
 
@@ -11,5 +11,5 @@ class BaseHandler(ABC):
     Base Handler
     """
     @abstractmethod
-    async def handle(self, event: Event, line_bot_api: MessagingApi, db: Session = None) -> None:
+    async def handle(self, event: Event, line_bot_api: MessagingApi, db: AsyncSession = None) -> None:
         pass
\ No newline at end of file
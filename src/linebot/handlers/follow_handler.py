@@ -1,7 +1,7 @@
 """
 Follow Event Handler
 """
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from linebot.v3.webhooks import FollowEvent
 from linebot.v3.messaging import ReplyMessageRequest
 from src.linebot.message_templates.help_template import create_help_message
@@ -11,7 +11,7 @@ from .base import BaseHandler
 logger = get_logger("linebot")
 
 class FollowEventHandler(BaseHandler):
-    async def handle(self, event: FollowEvent, line_bot_api, db: Session = None) -> None:
+    async def handle(self, event: FollowEvent, line_bot_api, db: AsyncSession = None) -> None:
         user_id = event.source.user_id
         logger.info("[Follow] UserId: %s", user_id)
 
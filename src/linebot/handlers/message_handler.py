@@ -1,7 +1,7 @@
 """
 Message Event Handler
 """
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from linebot.v3.webhooks import MessageEvent, TextMessageContent
 from linebot.v3.messaging import ReplyMessageRequest
 from src.popo.services import search_doctor
@@ -10,6 +10,7 @@ from src.linebot.message_templates.help_template import create_help_message
 from src.linebot.services import create_search_response
 from src.linebot.dependencies import update_search_state
 from src.infra.logger import get_logger
+from src.infra.metrics import stage_seconds
 from .base import BaseHandler
 
 logger = get_logger("linebot")
@@ -18,7 +19,7 @@ class MessageEventHandler(BaseHandler):
     """
     Message Event Handler
     """
-    async def handle(self, event: MessageEvent, line_bot_api, db: Session) -> None:
+    async def handle(self, event: MessageEvent, line_bot_api, db: AsyncSession) -> None:
         if not isinstance(event.message, TextMessageContent):
             return
 
@@ -38,15 +39,17 @@ class MessageEventHandler(BaseHandler):
             )
             return
 
-        search_criteria = parse_search_criteria(message)
-        update_search_state(user_id, {
+        with stage_seconds.time("parse_criteria"):
+            search_criteria = parse_search_criteria(message)
+        await update_search_state(user_id, {
             'search_term': search_criteria.search_term,
             'city': search_criteria.city,
             'search_type': search_criteria.search_type.value
         })
 
-        doctors, stats = search_doctor(search_criteria, db)
-        messages = create_search_response(doctors, stats, search_criteria)
+        doctors, stats = await search_doctor(search_criteria, db)
+        with stage_seconds.time("template"):
+            messages = create_search_response(doctors, stats, search_criteria)
 
         await line_bot_api.reply_message(
             ReplyMessageRequest(reply_token=event.reply_token, messages=messages)
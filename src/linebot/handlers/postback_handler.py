@@ -2,20 +2,22 @@
 Postback Event Handler
 """
 from urllib.parse import parse_qsl
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from linebot.v3.webhooks import PostbackEvent
 from linebot.v3.messaging import ReplyMessageRequest, TextMessage
 from src.popo.schemas import SearchCriteria, SearchType
 from src.popo.services import search_doctor
-from src.linebot.dependencies import get_search_state
+from src.popo.pagination import decode_cursor
+from src.linebot.dependencies import LINE_API_ERRORS, get_search_state
 from src.linebot.services import create_search_response
 from src.infra.logger import get_logger
+from src.infra.metrics import stage_seconds
 from .base import BaseHandler
 
 logger = get_logger("linebot")
 
 class PostbackEventHandler(BaseHandler):
-    async def handle(self, event: PostbackEvent, line_bot_api, db: Session) -> None:
+    async def handle(self, event: PostbackEvent, line_bot_api, db: AsyncSession) -> None:
         user_id = event.source.user_id
         logger.info("[Postback] UserId: %s | Data: %s", user_id, event.postback.data)
         data = dict(parse_qsl(event.postback.data))
@@ -24,8 +26,15 @@ class PostbackEventHandler(BaseHandler):
             await self._handle_next_page(event, line_bot_api, db, user_id, data)
 
     async def _handle_next_page(self, event, line_bot_api, db, user_id, data):
-        state = get_search_state(user_id)
-        if not state:
+        if 'cursor' in data:
+            cursor = decode_cursor(data['cursor'])
+            state = None
+        else:
+            # 舊版按鈕只帶 offset，需由使用者搜尋狀態還原搜尋條件
+            cursor = None
+            state = await get_search_state(user_id)
+
+        if not cursor and not state:
             await line_bot_api.reply_message(
                 ReplyMessageRequest(
                     reply_token=event.reply_token,
@@ -35,14 +44,19 @@ class PostbackEventHandler(BaseHandler):
             return
 
         try:
-            offset = int(data.get('offset', 0))
-            search_criteria = SearchCriteria(
-                search_type=SearchType(state.get('search_type', 'name')),
-                search_term=state.get('search_term', ''),
-                city=state.get('city')
-            )
-            doctors, stats = search_doctor(search_criteria, db, offset=offset)
-            messages = create_search_response(doctors, stats, search_criteria)
+            if cursor:
+                search_criteria = cursor.criteria
+                doctors, stats = await search_doctor(search_criteria, db, cursor=cursor)
+            else:
+                offset = int(data.get('offset', 0))
+                search_criteria = SearchCriteria(
+                    search_type=SearchType(state.get('search_type', 'name')),
+                    search_term=state.get('search_term', ''),
+                    city=state.get('city')
+                )
+                doctors, stats = await search_doctor(search_criteria, db, offset=offset)
+            with stage_seconds.time("template"):
+                messages = create_search_response(doctors, stats, search_criteria)
 
             await line_bot_api.reply_message(
                 ReplyMessageRequest(
@@ -50,6 +64,9 @@ class PostbackEventHandler(BaseHandler):
                     messages=messages
                 )
             )
+        except LINE_API_ERRORS:
+            # 無法回覆時不再嘗試送出錯誤訊息
+            raise
         except Exception as e:
             logger.error("Error processing next page requests: %s", str(e), exc_info=True)
             await line_bot_api.reply_message(
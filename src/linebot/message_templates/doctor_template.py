@@ -1,8 +1,45 @@
 """
 Doctor Message Template
 """
-from linebot.v3.messaging import FlexMessage, FlexContainer
+from linebot.v3.messaging import FlexMessage, FlexContainer, FlexBubble, FlexCarousel
+from src.config import settings
 from src.database.models.medical_personnel import MedicalPersonnel
+from src.infra.cache import TTLCache
+from src.infra.metrics import register_cache
+from src.popo.dataset import dataset_version
+
+# 已驗證的 FlexBubble，依 id 快取，資料異動時只移除受影響的項目
+bubble_cache = TTLCache(settings.BUBBLE_CACHE_SIZE, settings.BUBBLE_CACHE_TTL)
+register_cache("bubble", bubble_cache.stats)
+
+
+def _invalidate_bubbles(changed_ids: set[int] | None):
+    if changed_ids is None:
+        bubble_cache.clear()
+        return
+    for pk in changed_ids:
+        bubble_cache.pop(pk)
+
+
+dataset_version.subscribe(_invalidate_bubbles)
+
+NOT_FOUND_CONTAINER = FlexContainer.from_dict({
+    "type": "bubble",
+    "body": {
+        "type": "box",
+        "layout": "vertical",
+        "contents": [
+            {
+                "type": "text",
+                "text": "找不到相關資料",
+                "size": "lg",
+                "weight": "bold",
+                "align": "center",
+                "color": "#666666"
+            }
+        ]
+    }
+})
 
 def create_doctor_bubble(doctor: MedicalPersonnel) -> dict:
     """
@@ -122,37 +159,32 @@ def create_doctor_bubble(doctor: MedicalPersonnel) -> dict:
         }
     }
 
+def get_doctor_bubble(doctor: MedicalPersonnel) -> FlexBubble:
+    """
+    取得已驗證的醫生 bubble，每筆資料在異動前只建立與驗證一次
+    """
+    bubble = bubble_cache.get(doctor.id)
+    if bubble is None:
+        bubble = FlexBubble.from_dict(create_doctor_bubble(doctor))
+        bubble_cache.set(doctor.id, bubble)
+    return bubble
+
+
 def create_flex_message(doctors: list[MedicalPersonnel]) -> FlexMessage:
     """
     創建 Flex Message
     """
     if not doctors:
         # 當沒有搜尋結果時的訊息
-        contents = {
-            "type": "bubble",
-            "body": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": "找不到相關資料",
-                        "size": "lg",
-                        "weight": "bold",
-                        "align": "center",
-                        "color": "#666666"
-                    }
-                ]
-            }
-        }
+        contents = NOT_FOUND_CONTAINER
     else:
-        # 當有搜尋結果時，創建 carousel 容器
-        contents = {
-            "type": "carousel",
-            "contents": [create_doctor_bubble(doctor) for doctor in doctors]
-        }
+        # 當有搜尋結果時，以已驗證的 bubble 組成 carousel，不再重新驗證
+        contents = FlexCarousel.construct(
+            type="carousel",
+            contents=[get_doctor_bubble(doctor) for doctor in doctors]
+        )
 
     return FlexMessage(
         alt_text=f"找到 {len(doctors)} 筆相關資料" if doctors else "找不到相關資料",
-        contents=FlexContainer.from_dict(contents)
+        contents=contents
     )
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from linebot.v3.messaging import FlexMessage, FlexContainer
 
 HELP_MESSAGE_TEMPLATE = {
@@ -286,6 +287,7 @@ HELP_MESSAGE_TEMPLATE = {
   }
 }
 
+@lru_cache
 def create_help_message():
     return FlexMessage(
         alt_text='使用說明',
@@ -1,41 +1,56 @@
 """
 LINEBOT Router
 """
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi import APIRouter, Request, HTTPException
 from linebot.v3.exceptions import InvalidSignatureError
-from src.database.connection import get_db
 from src.infra.logger import get_logger
-from .dependencies import get_line_bot_api, parser
-from .event_handler import get_handler
+from src.infra.metrics import registry, stage_seconds
+from .dependencies import parser
+from .dispatcher import event_dispatcher
 
 
 logger = get_logger("linebot")
 router = APIRouter()
 
+webhooks_in_flight = registry.gauge(
+    "linebot_webhooks_in_flight", "Webhook callbacks currently being processed"
+)
+webhooks_in_flight.set(0)
+
 @router.post("/callback")
-async def handle_callback(
-    request: Request,
-    line_bot_api=Depends(get_line_bot_api),
-    db: Session = Depends(get_db),
-):
+async def handle_callback(request: Request):
     """
     Handle linebot callback
     """
-    signature = request.headers["X-Line-Signature"]
+    webhooks_in_flight.inc()
+    try:
+        with stage_seconds.time("callback"):
+            signature = request.headers["X-Line-Signature"]
 
-    body = await request.body()
-    body = body.decode()
+            body = await request.body()
+            body = body.decode()
 
-    try:
-        events = parser.parse(body, signature)
-    except InvalidSignatureError as exc:
-        logger.error("Invalid signature in request")
-        raise HTTPException(status_code=400, detail="Invalid signature") from exc
+            try:
+                with stage_seconds.time("parse_webhook"):
+                    events = parser.parse(body, signature)
+            except InvalidSignatureError as exc:
+                logger.error("Invalid signature in request")
+                raise HTTPException(status_code=400, detail="Invalid signature") from exc
+
+            # 事件交由背景 worker 處理，立即回應 LINE 以避免逾時重送
+            dropped = [event for event in events if not event_dispatcher.enqueue(event)]
+            if dropped:
+                # 佇列已滿，回應 503 讓 LINE 重送被捨棄的事件
+                raise HTTPException(status_code=503, detail="Event queue is full")
 
-    for event in events:
-        handler = get_handler(event)
-        if handler:
-            await handler.handle(event, line_bot_api, db)
+            return "OK"
+    finally:
+        webhooks_in_flight.dec()
 
-    return "OK"
+
+@router.get("/queue")
+async def get_queue_stats():
+    """
+    Webhook event queue metrics
+    """
+    return event_dispatcher.stats()
@@ -3,7 +3,26 @@ Medical Personnel Search Service
 """
 from linebot.v3.messaging import TextMessage, FlexContainer, FlexMessage
 from src.linebot.message_templates.doctor_template import create_flex_message
+from src.popo.normalize import fold
 from src.popo.schemas import SearchType, SearchCriteria
+from src.popo.pagination import encode_cursor
+
+# LINE postback data 長度上限
+POSTBACK_DATA_LIMIT = 300
+
+
+def _strip_folded_prefix(text: str, prefix: str) -> str | None:
+    """
+    text 逐字 fold 後以 prefix 開頭時，回傳其後未經 fold 的原始文字，否則回傳 None
+    """
+    folded = ""
+    for i, char in enumerate(text):
+        folded += fold(char)
+        if folded == prefix:
+            return text[i + 1:]
+        if not prefix.startswith(folded):
+            return None
+    return None
 
 
 def parse_search_criteria(message: str) -> SearchCriteria:
@@ -20,25 +39,30 @@ def parse_search_criteria(message: str) -> SearchCriteria:
         "苗栗", "雲林", "高雄"
     ]
 
+    # 城市與搜尋類型以 fold 後的文字比對 (例如: 臺北、＠醫院)，搜尋詞則保留原本的寫法，
+    # 資料庫查詢時才能找到以異體字儲存的資料；索引會再自行正規化
+    message = message.strip()
+
     # 預設值
     city = None
     search_type = SearchType.NAME
-    search_term = message.strip()
+    search_term = message
 
     # 檢查是否包含城市
     for possible_city in cities:
-        if message.startswith(possible_city):
+        rest = _strip_folded_prefix(message, possible_city)
+        if rest is not None:
             city = possible_city
-            search_term = message[len(city):].strip()
+            search_term = rest.strip()
             break
 
     # 檢查搜尋類型
-    if search_term.startswith("@醫院 "):
-        search_type = SearchType.HOSPITAL
-        search_term = search_term[4:].strip()
-    elif search_term.startswith("@科別 "):
-        search_type = SearchType.DEPARTMENT
-        search_term = search_term[4:].strip()
+    for prefix, prefix_type in (("@醫院 ", SearchType.HOSPITAL), ("@科別 ", SearchType.DEPARTMENT)):
+        rest = _strip_folded_prefix(search_term, prefix)
+        if rest is not None:
+            search_type = prefix_type
+            search_term = rest.strip()
+            break
 
     return SearchCriteria(search_type, search_term, city)
 
@@ -55,10 +79,12 @@ def format_search_summary(criteria: SearchCriteria, stats: dict) -> str:
     }[criteria.search_type]
 
     current_range = f"{stats['current_page']*10-9} - {min(stats['current_page']*10, stats['total_count'])}"
+    # 總筆數為估計值時顯示為約略筆數
+    count_text = f" 約 {stats['total_count']} " if stats.get("approximate") else f" {stats['total_count']} "
 
     return (
         f"查詢{location_text}{search_type_text}「{criteria.search_term}」\n"
-        f"共有 {stats['total_count']} 筆符合的結果\n"
+        f"共有{count_text}筆符合的結果\n"
         f"目前顯示第 {current_range} 筆"
     )
 
@@ -77,6 +103,11 @@ def create_search_response(doctors: list, stats: dict, criteria: SearchCriteria)
 
     # 如果還有更多結果，添加"顯示更多"按鈕
     if stats['has_more']:
+        postback_data = f"action=next_page&cursor={encode_cursor(stats['next_cursor'])}"
+        if len(postback_data) > POSTBACK_DATA_LIMIT:
+            # 搜尋字串過長時退回以 offset 分頁
+            postback_data = f"action=next_page&offset={stats['current_page']*10}"
+
         next_page_button = {
             "type": "bubble",
             "body": {
@@ -95,7 +126,7 @@ def create_search_response(doctors: list, stats: dict, criteria: SearchCriteria)
                         "action": {
                             "type": "postback",
                             "label": "顯示下一頁",
-                            "data": f"action=next_page&offset={stats['current_page']*10}"
+                            "data": postback_data
                         },
                         "style": "primary",
                         "margin": "md"
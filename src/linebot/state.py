@@ -0,0 +1,167 @@
+"""
+LINEBOT Search State Store
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from src.config import settings
+
+
+class SearchStateStore(ABC):
+    """
+    使用者搜尋狀態儲存介面
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+
+    @abstractmethod
+    async def get(self, user_id: str) -> dict:
+        "Get a user's live state, or an empty dict"
+
+    @abstractmethod
+    async def set(self, user_id: str, state: dict):
+        "Store a user's state and restart its TTL"
+
+
+class MemorySearchStateStore(SearchStateStore):
+    """
+    單一 process 的記憶體儲存
+
+    所有項目的 TTL 相同，每次寫入都移到尾端，因此 OrderedDict 的順序即為到期順序，
+    只需從頭端移除已過期的項目，每筆最多被移除一次 (攤銷 O(1))。
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        super().__init__(ttl, max_size)
+        self._states: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def _expire(self, now: float):
+        while self._states:
+            expires_at, _ = next(iter(self._states.values()))
+            if expires_at > now:
+                break
+            self._states.popitem(last=False)
+
+    async def get(self, user_id: str) -> dict:
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._states.get(user_id)
+        return dict(entry[1]) if entry else {}
+
+    async def set(self, user_id: str, state: dict):
+        now = time.monotonic()
+        self._expire(now)
+        self._states[user_id] = (now + self.ttl, dict(state))
+        self._states.move_to_end(user_id)
+        while len(self._states) > self.max_size:
+            self._states.popitem(last=False)
+
+
+class SQLiteSearchStateStore(SearchStateStore):
+    """
+    以本機 SQLite 檔案儲存，讓同一台機器上的所有 uvicorn worker 共用搜尋狀態
+
+    sqlite3 的呼叫會阻塞 (例如等待其他 worker 的寫入鎖)，因此在執行緒中執行，不佔用事件迴圈。
+    筆數記錄在 search_state_count 並隨寫入與刪除更新，清理時不需要計算整個資料表。
+    """
+
+    # 每寫入幾次才清理過期與超量的項目
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, ttl: float, max_size: int, path: str):
+        super().__init__(ttl, max_size)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_state ("
+            "user_id TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_search_state_expires_at "
+            "ON search_state (expires_at)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_state_count ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), count INTEGER NOT NULL)"
+        )
+        # 只有第一次建立時計算既有的筆數
+        self._conn.execute(
+            "INSERT OR IGNORE INTO search_state_count (id, count) "
+            "SELECT 0, count(1) FROM search_state"
+        )
+        self._conn.commit()
+
+    async def get(self, user_id: str) -> dict:
+        return await asyncio.to_thread(self._get, user_id)
+
+    async def set(self, user_id: str, state: dict):
+        await asyncio.to_thread(self._set, user_id, state)
+
+    def _get(self, user_id: str) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM search_state WHERE user_id = ? AND expires_at > ?",
+                (user_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def _set(self, user_id: str, state: dict):
+        now = time.time()
+        values = (json.dumps(state, ensure_ascii=False), now + self.ttl, user_id)
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE search_state SET state = ?, expires_at = ? WHERE user_id = ?", values
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT INTO search_state (state, expires_at, user_id) VALUES (?, ?, ?)", values
+                )
+                self._add_count(1)
+            self._writes += 1
+            if self._writes % self.PRUNE_INTERVAL == 0:
+                self._prune(now)
+
+    def _add_count(self, delta: int):
+        self._conn.execute("UPDATE search_state_count SET count = count + ? WHERE id = 0", (delta,))
+
+    def _prune(self, now: float):
+        # 過期的項目與超量時最舊的項目都由 expires_at 索引取得，成本只與刪除的筆數有關
+        expired = self._conn.execute(
+            "DELETE FROM search_state WHERE expires_at <= ?", (now,)
+        ).rowcount
+        self._add_count(-expired)
+        (count,) = self._conn.execute("SELECT count FROM search_state_count WHERE id = 0").fetchone()
+        if count > self.max_size:
+            evicted = self._conn.execute(
+                "DELETE FROM search_state WHERE rowid IN ("
+                "SELECT rowid FROM search_state ORDER BY expires_at LIMIT ?)",
+                (count - self.max_size,),
+            ).rowcount
+            self._add_count(-evicted)
+
+
+def create_search_state_store() -> SearchStateStore:
+    """
+    依設定建立搜尋狀態儲存
+    """
+    backend = settings.SEARCH_STATE_BACKEND.lower()
+    if backend == "memory":
+        return MemorySearchStateStore(
+            settings.SEARCH_STATE_TTL, settings.SEARCH_STATE_MAX_SIZE
+        )
+    if backend == "sqlite":
+        return SQLiteSearchStateStore(
+            settings.SEARCH_STATE_TTL,
+            settings.SEARCH_STATE_MAX_SIZE,
+            settings.SEARCH_STATE_PATH,
+        )
+    raise ValueError(f"Unknown SEARCH_STATE_BACKEND: {settings.SEARCH_STATE_BACKEND}")
@@ -4,21 +4,52 @@ Main
 
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, APIRouter
+from fastapi.responses import PlainTextResponse
 
 from src.linebot.router import router as linebot_router
 from src.popo.router import router as popo_router
+from src.popo.index import search_index
+from src.popo.services import reload_dataset
+from src.popo.refresh import change_feed_listener
 from src.linebot.dependencies import line_bot_api_wrapper
+from src.linebot.dispatcher import event_dispatcher
+from src.database.connection import AsyncSessionLocal, async_engine
+from src.infra.logger import get_logger
+from src.infra.metrics import registry, CONTENT_TYPE
 from .config import settings
 
+logger = get_logger("popo")
+
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     """
     Lifespan
     """
+    async with AsyncSessionLocal() as db:
+        try:
+            # 先記錄最新的異動再載入資料，載入期間的異動會在之後重新套用
+            await change_feed_listener.prime(db)
+        except Exception as e:
+            logger.error("[ChangeFeed] Failed to read changes: %s", str(e), exc_info=True)
+            await db.rollback()
+        if settings.SEARCH_INDEX_ENABLED:
+            try:
+                # 有快照檔案時直接 mmap 載入，否則由資料庫建立索引
+                if not await change_feed_listener.restore(db):
+                    await reload_dataset(db)
+                logger.info("[SearchIndex] Loaded %d rows", len(search_index.rows))
+            except Exception as e:
+                # 索引建立失敗時退回資料庫查詢
+                logger.error("[SearchIndex] Failed to load: %s", str(e), exc_info=True)
+    change_feed_listener.start()
     await line_bot_api_wrapper.get_api()
+    event_dispatcher.start()
     yield
+    await event_dispatcher.stop()
+    await change_feed_listener.stop()
     await line_bot_api_wrapper.close()
+    await async_engine.dispose()
 
 
 def create_app() -> FastAPI:
@@ -39,6 +70,11 @@ def create_app() -> FastAPI:
 
     _app.include_router(api_router)
 
+    @_app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        "Prometheus metrics of this worker"
+        return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
     return _app
 
 
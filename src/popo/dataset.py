@@ -0,0 +1,33 @@
+"""
+Medical Personnel Dataset Version
+"""
+from datetime import datetime, timezone
+from typing import Callable
+
+
+class DatasetVersion:
+    """
+    記錄 medical_personnel 資料版本，資料異動時遞增並通知訂閱者
+
+    訂閱者會收到異動的 id 集合，整批重新載入時為 None。
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.updated_at = datetime.now(timezone.utc)
+        self._subscribers: list[Callable[[set[int] | None], None]] = []
+
+    def subscribe(self, callback: Callable[[set[int] | None], None]):
+        "Register a callback invoked on every version bump"
+        self._subscribers.append(callback)
+
+    def bump(self, changed_ids: set[int] | None = None) -> int:
+        "Advance the version and notify subscribers"
+        self.version += 1
+        self.updated_at = datetime.now(timezone.utc)
+        for callback in self._subscribers:
+            callback(changed_ids)
+        return self.version
+
+
+dataset_version = DatasetVersion()
@@ -0,0 +1,120 @@
+"""
+Medical Personnel Export
+"""
+import csv
+import hashlib
+import io
+import json
+from typing import AsyncIterator
+from sqlalchemy import select, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database.connection import AsyncSessionLocal
+from src.database.models.medical_personnel import MedicalPersonnel, GraduationStatus
+from src.database.models.personnel_change import PersonnelChange
+from src.infra.logger import get_logger
+
+logger = get_logger("popo")
+
+# 每次由資料庫游標取出並寫出的筆數
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    "id",
+    "city",
+    "hospital",
+    "department",
+    "name",
+    "education",
+    "university",
+    "graduation_status",
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_query(
+    city: str | None = None,
+    hospital: str | None = None,
+    department: str | None = None,
+    university: str | None = None,
+    name: str | None = None,
+):
+    """
+    匯出的查詢，篩選條件與 GET /personnel 相同
+    """
+    query = (
+        select(*(getattr(MedicalPersonnel, column) for column in EXPORT_COLUMNS))
+        .where(MedicalPersonnel.is_active.is_(True))
+    )
+    if city:
+        query = query.where(MedicalPersonnel.city == city)
+    for column, term in (
+        (MedicalPersonnel.hospital, hospital),
+        (MedicalPersonnel.department, department),
+        (MedicalPersonnel.university, university),
+        (MedicalPersonnel.name, name),
+    ):
+        if term:
+            query = query.where(column.ilike(f"%{term}%"))
+    return query.order_by(MedicalPersonnel.id)
+
+
+async def export_etag(db: AsyncSession, export_format: str, filters: dict) -> str | None:
+    """
+    依資料版本 (最新的異動 id) 與匯出條件產生 ETag，各 worker 的結果一致
+
+    尚未建立異動紀錄資料表時無法判斷資料版本，回傳 None 且不使用 ETag。
+    """
+    try:
+        version = (
+            await db.execute(select(func.coalesce(func.max(PersonnelChange.id), 0)))
+        ).scalar()
+    except SQLAlchemyError as e:
+        logger.warning("[Export] Failed to read data version: %s", str(e))
+        await db.rollback()
+        return None
+    key = json.dumps([export_format, filters], ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def _values(row) -> list:
+    values = list(row)
+    status = values[-1]
+    if isinstance(status, GraduationStatus):
+        values[-1] = status.value
+    return values
+
+
+def _ndjson(rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, _values(row))), ensure_ascii=False) + "\n"
+        for row in rows
+    ).encode()
+
+
+def _csv(rows, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(_values(row) for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_export(query, export_format: str) -> AsyncIterator[bytes]:
+    """
+    以伺服器端游標逐批讀取並輸出 NDJSON 或 CSV，記憶體用量與資料筆數無關
+
+    回應送出期間才開啟自己的 session，不依賴請求結束時就關閉的 get_db。
+    """
+    if export_format == "csv":
+        yield _csv((), header=True)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield _ndjson(rows) if export_format == "ndjson" else _csv(rows)
@@ -0,0 +1,153 @@
+"""
+Medical Personnel Facets
+"""
+import hashlib
+import json
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database.models.medical_personnel import MedicalPersonnel
+from .dataset import dataset_version
+from .index import search_index
+
+
+@dataclass
+class Facet:
+    """
+    Facet
+    """
+    body: bytes
+    etag: str
+    last_modified: datetime
+
+
+class FacetCache:
+    """
+    各欄位的值與筆數
+
+    筆數在第一次使用時計算一次，之後資料異動只調整受影響的值，
+    並只讓值有變動的 facet 重新序列化。
+    """
+
+    # facet 名稱: (欄位, 是否排除空字串)
+    FACETS = {
+        "cities": ("city", False),
+        "departments": ("department", True),
+        "universities": ("university", True),
+    }
+
+    def __init__(self):
+        self._counts: dict[str, Counter] = {}
+        self._facets: dict[str, Facet] = {}
+
+    def clear(self):
+        "Drop every computed facet"
+        self._counts.clear()
+        self._facets.clear()
+
+    def apply(self, old: MedicalPersonnel | None, new: MedicalPersonnel | None):
+        "Adjust computed counts for a row that was inserted, updated or removed"
+        for name, counts in self._counts.items():
+            field, skip_empty = self.FACETS[name]
+            old_value = getattr(old, field) if old is not None else None
+            new_value = getattr(new, field) if new is not None else None
+            if old_value == new_value:
+                continue
+            if old_value is not None and not (skip_empty and old_value == ""):
+                counts[old_value] -= 1
+                if counts[old_value] <= 0:
+                    del counts[old_value]
+            if new_value is not None and not (skip_empty and new_value == ""):
+                counts[new_value] += 1
+            self._facets.pop(name, None)
+
+    async def get(self, name: str, db: AsyncSession) -> Facet:
+        "Get a facet, serializing it again only after its values changed"
+        facet = self._facets.get(name)
+        if facet is None:
+            counts = self._counts.get(name)
+            if counts is None:
+                counts = self._counts[name] = await self._count(name, db)
+            values = [
+                {"value": value, "count": count}
+                for value, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+            ]
+            body = json.dumps(values, ensure_ascii=False, separators=(",", ":")).encode()
+            facet = Facet(
+                body=body,
+                etag=f'"{hashlib.sha1(body).hexdigest()}"',
+                last_modified=dataset_version.updated_at,
+            )
+            self._facets[name] = facet
+        return facet
+
+    async def _count(self, name: str, db: AsyncSession) -> Counter:
+        field, skip_empty = self.FACETS[name]
+
+        if search_index.ready:
+            counts = search_index.rows.counts(field)
+            if skip_empty:
+                counts.pop("", None)
+            return counts
+
+        column = getattr(MedicalPersonnel, field)
+        query = (
+            select(column, func.count(1))
+            .where(MedicalPersonnel.is_active.is_(True))
+            .group_by(column)
+        )
+        if skip_empty:
+            query = query.where(column != "")
+        result = await db.execute(query)
+        return Counter({value: count for value, count in result if value is not None})
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    If-None-Match 是否包含指定的 ETag
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags or "*" in tags
+
+
+def facet_response(request: Request, facet: Facet) -> Response:
+    """
+    回傳 facet，若用戶端快取仍有效則回傳 304
+    """
+    headers = {
+        "ETag": facet.etag,
+        "Last-Modified": format_datetime(facet.last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+    if request.headers.get("if-none-match") is not None:
+        if etag_matches(request, facet.etag):
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since := request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            since = None
+        if since and facet.last_modified.replace(microsecond=0) <= since:
+            return Response(status_code=304, headers=headers)
+
+    return Response(content=facet.body, media_type="application/json", headers=headers)
+
+
+facet_cache = FacetCache()
+
+
+def _on_dataset_change(changed_ids: set[int] | None):
+    # 部分異動由 FacetCache.apply 調整，整批重新載入時才全部重算
+    if changed_ids is None:
+        facet_cache.clear()
+
+
+dataset_version.subscribe(_on_dataset_change)
@@ -0,0 +1,238 @@
+"""
+Hospital Aliases and Autocomplete
+"""
+import heapq
+from collections import Counter
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database.models.medical_personnel import MedicalPersonnel
+from .normalize import normalize
+
+# 常用簡稱: 醫院名稱關鍵字，資料中包含任一關鍵字的醫院即為該簡稱對應的醫院
+HOSPITAL_ALIASES = {
+    "三總": ("三軍總醫院",),
+    "北榮": ("台北榮民總醫院",),
+    "中榮": ("台中榮民總醫院",),
+    "高榮": ("高雄榮民總醫院",),
+    "台大": ("台大醫院", "台灣大學醫學院附設醫院"),
+    "長庚": ("長庚紀念醫院", "長庚醫院"),
+    "林口長庚": ("林口長庚",),
+    "高雄長庚": ("高雄長庚",),
+    "馬偕": ("馬偕紀念醫院", "馬偕醫院"),
+    "北醫": ("台北醫學大學附設醫院", "北醫附醫"),
+    "成大": ("成功大學醫學院附設醫院", "成大醫院"),
+    "中國附醫": ("中國醫藥大學附設醫院", "中國醫大附醫"),
+    "中山附醫": ("中山醫學大學附設醫院", "中山醫大附醫"),
+    "高醫": ("高雄醫學大學附設中和紀念醫院", "高醫附醫"),
+    "彰基": ("彰化基督教醫院",),
+    "亞東": ("亞東紀念醫院", "亞東醫院"),
+    "新光": ("新光吳火獅紀念醫院", "新光醫院"),
+    "慈濟": ("慈濟醫院",),
+    "奇美": ("奇美醫院",),
+    "北市聯醫": ("台北市立聯合醫院",),
+}
+
+# 每個 trie 節點預先保留的建議筆數
+SUGGEST_LIMIT = 10
+
+# 正規化後的簡稱與關鍵字
+_ALIAS_KEYWORDS = {
+    normalize(alias): tuple(normalize(keyword) for keyword in keywords)
+    for alias, keywords in HOSPITAL_ALIASES.items()
+}
+
+
+class _Node:
+    __slots__ = ("children", "hospitals", "top")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.hospitals: set[str] = set()
+        self.top: list[str] = []
+
+
+class HospitalDirectory:
+    """
+    醫院名稱與簡稱的前綴 trie
+
+    每個節點預先排好以此為前綴的前 SUGGEST_LIMIT 家醫院 (依人數)，
+    自動完成只需走訪與輸入等長的路徑。醫院人數異動時只調整該醫院名稱與簡稱路徑上的節點。
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._counts: Counter = Counter()
+        self._aliases: dict[str, list[str]] = {}
+        self._values: dict[str, list[str]] = {}
+        self._root: _Node | None = None
+
+    def build(self, rows):
+        "Build the directory from (hospital, count) tuples"
+        self._counts = Counter()
+        for hospital, count in rows:
+            if hospital:
+                self._counts[hospital] += count
+        self._root = None
+        self.ready = True
+
+    async def load(self, db: AsyncSession):
+        "Build the directory with a single GROUP BY over medical_personnel"
+        result = await db.execute(
+            select(MedicalPersonnel.hospital, func.count(1))
+            .where(MedicalPersonnel.is_active.is_(True))
+            .group_by(MedicalPersonnel.hospital)
+        )
+        self.build(result.all())
+
+    def clear(self):
+        "Drop the directory so it is loaded again on next use"
+        self._counts = Counter()
+        self._root = None
+        self.ready = False
+
+    def apply(self, old: MedicalPersonnel | None, new: MedicalPersonnel | None):
+        "Adjust hospital counts for a row that was inserted, updated or removed"
+        old_value = old.hospital if old is not None else None
+        new_value = new.hospital if new is not None else None
+        if old_value == new_value:
+            return
+        if old_value:
+            self._adjust(old_value, -1)
+        if new_value:
+            self._adjust(new_value, 1)
+
+    def _order(self, hospital: str) -> tuple:
+        return -self._counts[hospital], hospital
+
+    @staticmethod
+    def _keys(hospital: str) -> tuple[str, list[str]]:
+        "Normalized name of a hospital and the aliases that refer to it"
+        key = normalize(hospital)
+        aliases = [
+            alias
+            for alias, keywords in _ALIAS_KEYWORDS.items()
+            if any(keyword in key for keyword in keywords)
+        ]
+        return key, aliases
+
+    def _build_trie(self) -> _Node:
+        self._values = {}
+        self._aliases = {}
+        root = _Node()
+        for hospital in self._counts:
+            key, aliases = self._keys(hospital)
+            self._values.setdefault(key, []).append(hospital)
+            for alias in aliases:
+                self._aliases.setdefault(alias, []).append(hospital)
+            # 先收集每個前綴可能的醫院，最後每個節點只保留人數最多的幾家
+            for path in (key, *aliases):
+                node = root
+                for char in path:
+                    node = node.children.setdefault(char, _Node())
+                    node.hospitals.add(hospital)
+
+        pending = [root]
+        while pending:
+            node = pending.pop()
+            node.top = heapq.nsmallest(SUGGEST_LIMIT, node.hospitals, key=self._order)
+            pending.extend(node.children.values())
+        return root
+
+    def _adjust(self, hospital: str, delta: int):
+        count = self._counts[hospital] + delta
+        if count > 0:
+            self._counts[hospital] = count
+        else:
+            del self._counts[hospital]
+        if self._root is None:
+            return
+
+        added, removed = count == delta, count <= 0
+        key, aliases = self._keys(hospital)
+        if added or removed:
+            for lookup, values_key in [(self._values, key)] + [(self._aliases, alias) for alias in aliases]:
+                values = lookup.setdefault(values_key, [])
+                if added:
+                    values.append(hospital)
+                else:
+                    values.remove(hospital)
+                    if not values:
+                        del lookup[values_key]
+
+        for path in dict.fromkeys((key, *aliases)):
+            node, parents = self._root, []
+            for char in path:
+                child = node.children.get(char)
+                if child is None:
+                    if not added:
+                        # 與前一條路徑共用且已移除的節點
+                        break
+                    child = node.children[char] = _Node()
+                parents.append((node, char))
+                node = child
+                if added:
+                    node.hospitals.add(hospital)
+                elif removed:
+                    node.hospitals.discard(hospital)
+                self._rerank(node, hospital, delta)
+            if removed:
+                # 移除不再有任何醫院的節點
+                for parent, char in reversed(parents):
+                    if parent.children[char].hospitals:
+                        break
+                    del parent.children[char]
+
+    def _rerank(self, node: _Node, hospital: str, delta: int):
+        "Update the top hospitals of a node after the count of one hospital changed"
+        top = node.top
+        if hospital in top:
+            # 不在 top 中的候選醫院數
+            missing = len(node.hospitals) - len(top) + (hospital not in node.hospitals)
+            if delta > 0 or not missing:
+                if hospital not in node.hospitals:
+                    top.remove(hospital)
+                top.sort(key=self._order)
+            else:
+                # 排名下降時可能由其他醫院遞補
+                node.top = heapq.nsmallest(SUGGEST_LIMIT, node.hospitals, key=self._order)
+        elif hospital in node.hospitals and (
+            len(top) < SUGGEST_LIMIT or self._order(hospital) < self._order(top[-1])
+        ):
+            top.append(hospital)
+            top.sort(key=self._order)
+            del top[SUGGEST_LIMIT:]
+
+    def _trie(self) -> _Node:
+        if self._root is None:
+            self._root = self._build_trie()
+        return self._root
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_LIMIT) -> list[dict]:
+        """
+        以醫院名稱或簡稱的前綴取得建議的醫院與人數
+        """
+        node = self._trie()
+        key = normalize(prefix)
+        if not key:
+            return []
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [
+            {"hospital": hospital, "count": self._counts[hospital]}
+            for hospital in node.top[:limit]
+        ]
+
+    def resolve(self, term: str) -> list[str]:
+        """
+        將完整醫院名稱或簡稱轉為資料中的醫院名稱，無法對應時回傳空串列
+        """
+        self._trie()
+        key = normalize(term)
+        if key in self._aliases:
+            return list(self._aliases[key])
+        return list(self._values.get(key, ()))
+
+
+hospital_directory = HospitalDirectory()
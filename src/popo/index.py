@@ -0,0 +1,537 @@
+"""
+Medical Personnel Search Index
+"""
+import heapq
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database.models.medical_personnel import MedicalPersonnel
+from .normalize import normalize, deletes, within_one_edit
+from .schemas import SearchType, SearchCriteria, MatchRank
+from .snapshot import PersonnelSnapshot, PersonnelRow, StringTable
+from .snapshot_file import SnapshotFile, write_snapshot, open_snapshot
+
+SEARCH_FIELDS = {
+    SearchType.NAME: "name",
+    SearchType.HOSPITAL: "hospital",
+    SearchType.DEPARTMENT: "department",
+}
+
+# 模糊搜尋至少需要的字數，太短的詞編輯一個字就會對到大量資料
+FUZZY_MIN_LENGTH = 3
+
+
+def match_rank(text: str | None, term: str) -> MatchRank:
+    """
+    計算正規化後的相符程度: 完全相符 > 開頭相符 > 包含 > 模糊相符
+    """
+    return _rank(normalize(text), normalize(term))
+
+
+def _rank(text: str, term: str) -> MatchRank:
+    """
+    計算已正規化字串的相符程度
+    """
+    if text == term:
+        return MatchRank.EXACT
+    if text.startswith(term):
+        return MatchRank.PREFIX
+    if term in text:
+        return MatchRank.SUBSTRING
+    return MatchRank.FUZZY
+
+
+def sort_key(
+    criteria: SearchCriteria,
+    row: MedicalPersonnel | PersonnelRow,
+    values: list[str] | None = None,
+) -> tuple[int, str, int]:
+    """
+    搜尋結果的排序鍵 (相符程度, 姓名, id)，分頁游標依此往後搜尋
+
+    values 為搜尋詞對應到的完整欄位值 (例如醫院簡稱)，相符者視為完全相符。
+    """
+    field = SEARCH_FIELDS[criteria.search_type]
+    if values and getattr(row, field) in values:
+        return int(MatchRank.EXACT), row.name, row.id
+    return int(match_rank(getattr(row, field), criteria.search_term)), row.name, row.id
+
+
+def _grams(text: str) -> set[str]:
+    """
+    產生字元 unigram 與 bigram
+    """
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _hash(key: str) -> int:
+    # 跨 process 固定的雜湊，碰撞只會多出候選值，查詢時都會再比對
+    return zlib.crc32(key.encode())
+
+
+def _keys(values, variants) -> array:
+    """
+    將各值 (代碼, 字串) 的每個變化 (n-gram 或刪除變化) 轉為排序後的
+    (雜湊 << 32 | 代碼) 陣列，以二分搜尋查詢
+    """
+    return array("Q", sorted({
+        _hash(variant) << 32 | code for code, text in values for variant in variants(text)
+    }))
+
+
+def _lookup(index: array | memoryview, key: str) -> set[int]:
+    "Codes stored under a key of a sorted hash array"
+    start = _hash(key) << 32
+    return {
+        entry & 0xFFFFFFFF
+        for entry in index[bisect_left(index, start):bisect_left(index, start + (1 << 32))]
+    }
+
+
+def _contains(ids: array | memoryview, pk: int) -> bool:
+    i = bisect_left(ids, pk)
+    return i < len(ids) and ids[i] == pk
+
+
+class _FieldIndex:
+    """
+    一個欄位的索引
+
+    不重複的正規化值依序存成字串表 (代碼即為值的編號)，各值的資料位置、每個 unigram 與
+    bigram 所在的值、以及刪除一個字元後的變化所在的值都存成陣列。建立之後的異動另外以
+    dict 記錄，累積到一定數量時整份索引重新建立。
+
+    值以代碼 (建立時已有的值) 或字串 (之後新增的值) 表示。
+    """
+
+    ARRAYS = ("starts", "positions", "grams", "deletes")
+
+    def __init__(self, values: StringTable, starts, positions, grams, deletes):
+        self.values = values
+        self.starts = starts
+        self.positions = positions
+        self.grams = grams
+        self.deletes = deletes
+        self._extra: dict[int, set[int]] = {}
+        self._added: dict[str, set[int]] = {}
+        self._added_grams: defaultdict[str, set[str]] = defaultdict(set)
+        self._added_deletes: defaultdict[str, set[str]] = defaultdict(set)
+
+    @classmethod
+    def build(cls, texts, fuzzy: bool) -> "_FieldIndex":
+        """
+        由 (位置, 正規化值) 建立索引，位置須遞增
+        """
+        groups = defaultdict(list)
+        for position, text in texts:
+            groups[text].append(position)
+        ordered = sorted(groups)
+        starts = array("I", [0])
+        positions = array("I")
+        for text in ordered:
+            positions.extend(groups[text])
+            starts.append(len(positions))
+        entries = list(enumerate(ordered, 1))
+        return cls(
+            StringTable.of(ordered),
+            starts,
+            positions,
+            _keys(entries, _grams),
+            _keys(entries, deletes) if fuzzy else array("Q"),
+        )
+
+    @classmethod
+    def mapped(cls, name: str, sections: dict[str, memoryview]) -> "_FieldIndex":
+        "Use the arrays of a snapshot file in place"
+        return cls(
+            StringTable(sections[f"{name}.offsets"], sections[f"{name}.blob"]),
+            *(sections[f"{name}.{array_name}"] for array_name in cls.ARRAYS),
+        )
+
+    def sections(self, name: str) -> dict[str, array | bytes]:
+        "Arrays for a snapshot file, without the changes made after the build"
+        offsets, blob = self.values.dump()
+        return {
+            f"{name}.offsets": offsets,
+            f"{name}.blob": blob,
+            **{f"{name}.{array_name}": getattr(self, array_name) for array_name in self.ARRAYS},
+        }
+
+    def text(self, key: int | str) -> str:
+        return key if isinstance(key, str) else self.values[key]
+
+    def find(self, text: str) -> int | str | None:
+        "Key of a normalized value"
+        code = bisect_left(range(1, len(self.values)), text, key=self.values.__getitem__) + 1
+        if code < len(self.values) and self.values[code] == text:
+            return code
+        return text if text in self._added else None
+
+    def keys(self) -> list[int | str]:
+        return [*range(1, len(self.values)), *self._added]
+
+    def ids(self, key: int | str, dead: set[int]):
+        "Positions of the rows whose value is the given key"
+        if isinstance(key, str):
+            return self._added.get(key, ())
+        base = self.positions[self.starts[key - 1]:self.starts[key]]
+        if dead:
+            base = [position for position in base if position not in dead]
+        extra = self._extra.get(key)
+        return [*base, *extra] if extra else base
+
+    def add(self, text: str, position: int):
+        key = self.find(text)
+        if isinstance(key, int):
+            self._extra.setdefault(key, set()).add(position)
+            return
+        if key is None:
+            for gram in _grams(text):
+                self._added_grams[gram].add(text)
+            if self.deletes:
+                for variant in deletes(text):
+                    self._added_deletes[variant].add(text)
+        self._added.setdefault(text, set()).add(position)
+
+    def discard(self, text: str, position: int):
+        "Remove a position added after the index was built"
+        key = self.find(text)
+        if isinstance(key, int):
+            positions = self._extra.get(key, set())
+        else:
+            positions = self._added.get(text, set())
+        positions.discard(position)
+
+    def _grams(self, gram: str) -> set:
+        return _lookup(self.grams, gram) | self._added_grams.get(gram, set())
+
+    def match(self, term: str) -> list[int | str]:
+        """
+        回傳包含已正規化 term 的值
+        """
+        if not term:
+            return self.keys()
+        if len(term) == 1:
+            candidates = self._grams(term)
+        else:
+            # 從最短的 posting 開始取交集，成本只與候選值的數量有關
+            lists = sorted((self._grams(gram) for gram in _grams(term) if len(gram) == 2), key=len)
+            candidates = lists[0]
+            for posting in lists[1:]:
+                if not candidates:
+                    break
+                candidates &= posting
+        return [key for key in candidates if term in self.text(key)]
+
+    def fuzzy(self, term: str) -> list[int | str]:
+        """
+        回傳與已正規化 term 編輯距離為 1 的值 (SymSpell 刪除索引)
+
+        term 與索引值各自刪除至多一個字元後若有相同的變化即為候選，
+        再以編輯距離確認，不需要逐筆比對全部資料。
+        """
+        candidates = set()
+        for variant in deletes(term):
+            candidates |= _lookup(self.deletes, variant)
+            candidates |= self._added_deletes.get(variant, set())
+        return [
+            key for key in candidates
+            if (text := self.text(key)) != term and within_one_edit(text, term)
+        ]
+
+
+class SearchIndex:
+    """
+    In-process character n-gram inverted index over medical_personnel.
+
+    Rows live in a columnar PersonnelSnapshot; the index itself works on the
+    distinct normalized values of every field. Each value keeps the positions
+    of its rows, and each unigram and bigram keeps the values containing it,
+    so a substring lookup only touches the values that share the rarest grams
+    of the search term instead of scanning the table. Names and hospitals
+    also keep a single-deletion index of their values for typo-tolerant
+    lookups within edit distance one. All of it is stored in flat arrays;
+    changes go to small overlays until the index is rebuilt.
+    """
+
+    FIELDS = ("name", "hospital", "department", "university")
+    FUZZY_FIELDS = ("name", "hospital")
+
+    def __init__(self):
+        self.rows = PersonnelSnapshot()
+        self.loaded_at: datetime | None = None
+        self.source: SnapshotFile | None = None
+        self._fields: dict[str, _FieldIndex] = {}
+        self._all_ids: array | memoryview = array("I")
+        self._by_city: dict[str, array | memoryview] = {}
+
+    @property
+    def ready(self) -> bool:
+        "Whether the index has been built"
+        return self.loaded_at is not None
+
+    async def load(self, db: AsyncSession):
+        "Build the index from the medical_personnel table"
+        # 只取需要的欄位，不建立 ORM 物件
+        columns = [getattr(MedicalPersonnel, column) for column in PersonnelSnapshot.COLUMNS]
+        query = (
+            select(MedicalPersonnel.id, *columns)
+            .where(MedicalPersonnel.is_active.is_(True))
+            .order_by(MedicalPersonnel.id)
+        )
+        self.build(await db.execute(query))
+
+    def build(self, rows):
+        "Build the index from the given rows"
+        self._index(PersonnelSnapshot.from_rows(rows))
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def _index(self, rows: PersonnelSnapshot, source: SnapshotFile | None = None):
+        """
+        為依 id 排序且沒有異動的快照建立索引
+        """
+        self.rows = rows
+        self.source = source
+        # 正規化結果只在建立期間依字串表代碼快取
+        texts = {}
+        for field in self.FIELDS:
+            codes = rows._columns[field]
+            for code in set(codes):
+                if code not in texts:
+                    texts[code] = normalize(rows.strings[code])
+            self._fields[field] = _FieldIndex.build(
+                ((position, texts[code]) for position, code in enumerate(codes) if code),
+                field in self.FUZZY_FIELDS,
+            )
+
+        groups = defaultdict(lambda: array("I"))
+        for pk, code in zip(rows.ids, rows._columns["city"]):
+            groups[code].append(pk)
+        self._by_city = {rows.strings[code]: ids for code, ids in groups.items()}
+        self._all_ids = array("I", rows.ids)
+
+    def dump(self, path: str, version: int):
+        """
+        將資料與索引的陣列寫入快照檔案，有異動時先重新建立
+        """
+        index = self
+        if self.rows.changes:
+            index = SearchIndex()
+            index._index(self.rows.compacted())
+        rows = index.rows
+
+        offsets, blob = rows.strings.dump()
+        sections = {
+            "strings.offsets": offsets,
+            "strings.blob": blob,
+            **{name if name == "ids" else f"column.{name}": codes for name, codes in rows.columns().items()},
+        }
+        for field, field_index in index._fields.items():
+            sections.update(field_index.sections(f"index.{field}"))
+
+        cities = StringTable.of(index._by_city)
+        starts = array("I", [0])
+        city_ids = array("I")
+        for ids in index._by_city.values():
+            city_ids.extend(ids)
+            starts.append(len(city_ids))
+        offsets, blob = cities.dump()
+        sections.update({
+            "city.offsets": offsets,
+            "city.blob": blob,
+            "city.starts": starts,
+            "city.ids": city_ids,
+        })
+        write_snapshot(path, version, {"rows": len(rows)}, sections)
+
+    def load_file(self, path: str) -> int:
+        """
+        由快照檔案載入資料與索引，回傳快照的資料版本
+
+        欄位與索引的陣列直接使用 mmap，同一個檔案的分頁由所有 worker 共用；
+        之後的異動另外記錄，累積到需要重新建立時才成為各 worker 自己的陣列。
+        """
+        source = open_snapshot(path)
+        sections = source.sections
+        strings = StringTable(sections["strings.offsets"], sections["strings.blob"])
+        self.rows = PersonnelSnapshot(
+            strings,
+            sections["ids"],
+            {column: sections[f"column.{column}"] for column in PersonnelSnapshot.COLUMNS},
+        )
+        self.source = source
+        self._fields = {
+            field: _FieldIndex.mapped(f"index.{field}", sections) for field in self.FIELDS
+        }
+
+        cities = StringTable(sections["city.offsets"], sections["city.blob"])
+        starts, city_ids = sections["city.starts"], sections["city.ids"]
+        self._by_city = {
+            cities[code]: city_ids[starts[code - 1]:starts[code]] for code in range(1, len(cities))
+        }
+        self._all_ids = self.rows.ids
+        self.loaded_at = datetime.now(timezone.utc)
+        return source.version
+
+    def add(self, row):
+        "Index a row, replacing any previous version with the same id"
+        self.remove(row.id)
+        position = self.rows.append(row)
+        for field in self.FIELDS:
+            text = normalize(getattr(row, field))
+            if text:
+                self._fields[field].add(text, position)
+        for ids in self._sorted_ids(row.city):
+            ids.insert(bisect_left(ids, row.id), row.id)
+        self._compact()
+
+    def remove(self, pk: int):
+        "Remove a row from the index"
+        position = self.rows.position(pk)
+        if position is None:
+            return
+        row = PersonnelRow(self.rows, position)
+        for field in self.FIELDS:
+            text = normalize(getattr(row, field))
+            if text:
+                self._fields[field].discard(text, position)
+        self.rows.discard(pk)
+
+        for ids in self._sorted_ids(row.city):
+            del ids[bisect_left(ids, pk)]
+        if not self._by_city[row.city]:
+            del self._by_city[row.city]
+
+    def _sorted_ids(self, city: str) -> tuple[array, array]:
+        # 由快照檔案載入的陣列第一次異動時才複製
+        if not isinstance(self._all_ids, array):
+            self._all_ids = array("I", self._all_ids)
+        ids = self._by_city.get(city)
+        if not isinstance(ids, array):
+            ids = self._by_city[city] = array("I", ids or ())
+        return self._all_ids, ids
+
+    def _compact(self):
+        # 異動累積超過有效資料的四分之一時重新建立快照與索引
+        if self.rows.changes > max(len(self.rows) // 4, 16):
+            self._index(self.rows.compacted())
+
+    def _ids(self, field: str, keys) -> set[int]:
+        index = self._fields[field]
+        dead = self.rows.dead
+        id_at = self.rows.id_at
+        return {id_at(position) for key in keys for position in index.ids(key, dead)}
+
+    def _find(self, field: str, values) -> list[int | str]:
+        index = self._fields[field]
+        keys = (index.find(normalize(value)) for value in values)
+        return [key for key in keys if key is not None]
+
+    def match(self, field: str, term: str) -> set[int]:
+        """
+        回傳正規化後 field 包含 term 的 id (與 ILIKE '%term%' 相同語意)
+        """
+        return self._ids(field, self._fields[field].match(normalize(term)))
+
+    def match_values(self, field: str, values: list[str]) -> set[int]:
+        """
+        回傳 field 正規化後等於 values 其中之一的 id
+        """
+        return self._ids(field, self._find(field, set(values)))
+
+    def _fuzzy(self, field: str, term: str) -> list[int | str]:
+        if field not in self.FUZZY_FIELDS or len(term) < FUZZY_MIN_LENGTH:
+            return []
+        return self._fields[field].fuzzy(term)
+
+    def fuzzy_match(self, field: str, term: str) -> set[int]:
+        """
+        回傳 field 與 term 編輯距離為 1 的 id
+        """
+        return self._ids(field, self._fuzzy(field, normalize(term)))
+
+    def sorted_ids(self, city: str | None = None) -> array | memoryview:
+        """
+        依 id 排序的全部資料或某個城市的 id，可直接取出一段作為分頁
+        """
+        if city:
+            return self._by_city.get(city, array("I"))
+        return self._all_ids
+
+    def filter_city(self, ids: set[int], city: str | None) -> set[int]:
+        "Restrict ids to the given city"
+        if not city:
+            return ids
+        city_ids = self._by_city.get(city, ())
+        if len(city_ids) < len(ids):
+            return {pk for pk in city_ids if pk in ids}
+        return {pk for pk in ids if _contains(city_ids, pk)}
+
+    def _filter_city(self, positions, city: str | None):
+        if not city:
+            return positions
+        city_ids = self._by_city.get(city)
+        if not city_ids:
+            return []
+        # 城市的代碼與該城市任一筆資料的代碼相同
+        return self.rows.where(positions, "city", self.rows.code(city_ids[0], "city"))
+
+    def search(
+        self,
+        criteria: SearchCriteria,
+        limit: int,
+        offset: int = 0,
+        after: tuple[int, str, int] | None = None,
+        values: list[str] | None = None,
+    ) -> tuple[list[PersonnelRow], int]:
+        """
+        依照 SearchCriteria 搜尋，回傳依 sort_key 排序的一頁結果與總筆數
+
+        只以大小為 offset + limit 的 heap 取出前幾名，不排序全部候選資料。
+        沒有任何包含 term 的資料時，改以編輯距離 1 的模糊比對回應。
+        提供 values 時只回傳欄位值完全等於其中之一的資料。
+
+        Args:
+            criteria: 搜尋條件
+            limit: 回傳筆數
+            offset: 略過筆數
+            after: 只回傳排序鍵大於此值的資料
+            values: 搜尋詞對應到的完整欄位值
+        """
+        field = SEARCH_FIELDS[criteria.search_type]
+        term = normalize(criteria.search_term)
+        index = self._fields[field]
+        dead = self.rows.dead
+
+        # 相符程度只與欄位值有關，每個值只計算一次
+        if values:
+            ranked = [(int(MatchRank.EXACT), key) for key in self._find(field, set(values))]
+        else:
+            ranked = [(int(_rank(index.text(key), term)), key) for key in index.match(term)]
+        ranks = {position: rank for rank, key in ranked for position in index.ids(key, dead)}
+        positions = self._filter_city(ranks, criteria.city)
+
+        if not positions and not values:
+            fuzzy = int(MatchRank.FUZZY)
+            ranks = {position: fuzzy for key in self._fuzzy(field, term) for position in index.ids(key, dead)}
+            positions = self._filter_city(ranks, criteria.city)
+
+        names = self.rows.strings
+        code_at, id_at = self.rows.code_at, self.rows.id_at
+        keys = (
+            (ranks[position], names[code_at(position, "name")], id_at(position), position)
+            for position in positions
+        )
+        if after is not None:
+            keys = (key for key in keys if key[:3] > after)
+        top = heapq.nsmallest(offset + limit, keys)[offset:]
+        return [PersonnelRow(self.rows, position) for *_, position in top], len(positions)
+
+
+search_index = SearchIndex()
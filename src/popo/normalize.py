@@ -0,0 +1,76 @@
+"""
+Search Text Normalization
+"""
+import re
+import unicodedata
+
+# 異體字與常見簡體字對照，統一為正體常用字
+VARIANTS = str.maketrans({
+    "臺": "台",
+    "峯": "峰",
+    "羣": "群",
+    "裏": "裡",
+    "綫": "線",
+    "衞": "衛",
+    "啓": "啟",
+    "眞": "真",
+    "爲": "為",
+    "温": "溫",
+    "够": "夠",
+    "却": "卻",
+    "説": "說",
+    "医": "醫",
+    "总": "總",
+    "総": "總",
+    "荣": "榮",
+    "长": "長",
+    "纪": "紀",
+    "湾": "灣",
+    "児": "兒",
+    "儿": "兒",
+})
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def fold(text: str) -> str:
+    """
+    全形轉半形 (NFKC) 並統一異體字，保留空白與大小寫
+    """
+    return unicodedata.normalize("NFKC", text).translate(VARIANTS)
+
+
+def normalize(text: str | None) -> str:
+    """
+    搜尋用的正規化字串: fold 後轉小寫並移除所有空白
+    """
+    if not text:
+        return ""
+    return WHITESPACE_PATTERN.sub("", fold(text).lower())
+
+
+def deletes(text: str) -> set[str]:
+    """
+    刪除一個字元後的所有變化 (含原字串)，用於編輯距離 1 的查詢
+    """
+    variants = {text}
+    variants.update(text[:i] + text[i + 1:] for i in range(len(text)))
+    return variants
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """
+    兩字串的編輯距離是否不超過 1 (插入、刪除或替換一個字元)
+    """
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
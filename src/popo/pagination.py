@@ -0,0 +1,66 @@
+"""
+Search Pagination Cursor
+"""
+import base64
+import hashlib
+import hmac
+import json
+from src.config import settings
+from .schemas import SearchType, SearchCriteria, SearchCursor
+
+SIGNATURE_SIZE = 12
+
+
+def _sign(payload: bytes) -> bytes:
+    key = settings.LINE_MESSAGE_CHANNEL_SECRET.encode()
+    return hmac.new(key, payload, hashlib.sha256).digest()[:SIGNATURE_SIZE]
+
+
+def encode_cursor(cursor: SearchCursor) -> str:
+    """
+    將分頁游標編碼為帶簽章的字串
+    """
+    criteria = cursor.criteria
+    fields = [
+        criteria.search_type.value,
+        criteria.search_term,
+        criteria.city,
+        list(cursor.last_key),
+        cursor.last_id,
+        cursor.total_count,
+        cursor.page,
+    ]
+    # 只有估計的總筆數需要額外標記，精確計數的游標維持原本長度
+    if cursor.approximate:
+        fields.append(1)
+    payload = json.dumps(
+        fields,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+    token = base64.urlsafe_b64encode(_sign(payload) + payload)
+    return token.decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> SearchCursor | None:
+    """
+    解碼分頁游標，簽章或格式不符時回傳 None
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        signature, payload = raw[:SIGNATURE_SIZE], raw[SIGNATURE_SIZE:]
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        search_type, search_term, city, last_key, last_id, total_count, page, *flags = (
+            json.loads(payload)
+        )
+        return SearchCursor(
+            criteria=SearchCriteria(SearchType(search_type), search_term, city),
+            last_key=(int(last_key[0]), last_key[1]),
+            last_id=int(last_id),
+            total_count=int(total_count),
+            page=int(page),
+            approximate=bool(flags and flags[0]),
+        )
+    except (ValueError, TypeError):
+        return None
@@ -0,0 +1,157 @@
+"""
+Medical Personnel Change Feed Listener
+"""
+import asyncio
+import os
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
+from src.database.connection import AsyncSessionLocal
+from src.database.models.personnel_change import PersonnelChange, ChangeOperation
+from src.infra.logger import get_logger
+from .index import search_index
+from .services import reload_dataset, apply_changes, invalidate_dataset, load_dataset_snapshot
+from .snapshot_file import SnapshotFileError, read_version
+
+logger = get_logger("popo")
+
+
+class ChangeFeedListener:
+    """
+    定期讀取 medical_personnel_changes，將資料異動套用到記憶體中的索引與快取
+
+    設定快照檔案時，也會在檔案被新版本取代後改用新的快照，並由快照的版本繼續套用異動。
+    停用索引時不建立索引，重新匯入只清除統計與快取，改由資料庫查詢。
+
+    Args:
+        interval: 讀取間隔秒數，0 表示停用
+        batch_size: 每次最多讀取的異動筆數
+        snapshot_path: 快照檔案路徑，空字串表示不使用
+        use_index: 是否使用記憶體中的搜尋索引
+    """
+
+    def __init__(self, interval: float, batch_size: int = 5000, snapshot_path: str = "", use_index: bool = True):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.snapshot_path = snapshot_path if use_index else ""
+        self.use_index = use_index
+        self.last_change_id: int | None = None
+        self.snapshot_version: int | None = None
+        self._snapshot_stat: tuple | None = None
+        self._task: asyncio.Task | None = None
+
+    async def prime(self, db: AsyncSession):
+        "Remember the latest change; call before loading the dataset"
+        query = select(func.coalesce(func.max(PersonnelChange.id), 0))
+        self.last_change_id = (await db.execute(query)).scalar()
+
+    async def restore(self, db: AsyncSession) -> bool:
+        """
+        由快照檔案載入資料並套用快照之後的異動，沒有可用的快照時回傳 False
+        """
+        if not self.snapshot_path or self.last_change_id is None:
+            return False
+        version = read_version(self.snapshot_path)
+        # 快照比資料庫的異動還新時表示不是同一份資料
+        if version is None or version > self.last_change_id:
+            return False
+        if not self.load_snapshot():
+            return False
+        while await self.poll(db) == self.batch_size:
+            pass
+        return True
+
+    def load_snapshot(self) -> bool:
+        """
+        載入快照檔案，之後的異動由快照的版本開始套用
+        """
+        try:
+            version = load_dataset_snapshot(self.snapshot_path)
+        except SnapshotFileError as e:
+            logger.warning("[Snapshot] Failed to load %s: %s", self.snapshot_path, str(e))
+            return False
+        stat = search_index.source.stat
+        self._snapshot_stat = (stat.st_ino, stat.st_mtime_ns)
+        self.snapshot_version = version
+        self.last_change_id = version
+        logger.info("[Snapshot] Loaded version %d with %d rows", version, len(search_index.rows))
+        return True
+
+    def check_snapshot(self) -> bool:
+        """
+        快照檔案被較新的版本取代時改用新的快照
+        """
+        if not self.snapshot_path or not search_index.ready:
+            return False
+        try:
+            stat = os.stat(self.snapshot_path)
+        except OSError:
+            return False
+        if (stat.st_ino, stat.st_mtime_ns) == self._snapshot_stat:
+            return False
+        self._snapshot_stat = (stat.st_ino, stat.st_mtime_ns)
+        version = read_version(self.snapshot_path)
+        if version is None or version <= (self.snapshot_version or 0):
+            return False
+        return self.load_snapshot()
+
+    def start(self):
+        "Start polling in the background"
+        if self.interval <= 0 or self.last_change_id is None or self._task:
+            return
+        self._task = asyncio.create_task(self._run(), name="change-feed-listener")
+
+    async def stop(self):
+        "Stop polling"
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def poll(self, db: AsyncSession) -> int:
+        """
+        套用上次讀取後的異動，回傳處理的異動筆數
+        """
+        query = (
+            select(PersonnelChange)
+            .where(PersonnelChange.id > self.last_change_id)
+            .order_by(PersonnelChange.id)
+            .limit(self.batch_size)
+        )
+        changes = (await db.execute(query)).scalars().all()
+        if not changes:
+            return 0
+
+        reloads = [change.id for change in changes if change.operation == ChangeOperation.RELOAD]
+        if reloads and not self.use_index:
+            invalidate_dataset()
+        elif reloads:
+            # 已有包含這次重新匯入的快照時直接使用，否則由資料庫重新載入
+            version = read_version(self.snapshot_path) if self.snapshot_path else None
+            if version is not None and version >= reloads[-1] and self.load_snapshot():
+                return len(changes)
+            await reload_dataset(db)
+        else:
+            await apply_changes(db, {change.personnel_id for change in changes})
+
+        self.last_change_id = changes[-1].id
+        logger.info("[ChangeFeed] Applied %d changes up to %d", len(changes), self.last_change_id)
+        return len(changes)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.check_snapshot()
+                async with AsyncSessionLocal() as db:
+                    while await self.poll(db) == self.batch_size:
+                        pass
+            except Exception as e:
+                logger.error("[ChangeFeed] Failed to apply changes: %s", str(e), exc_info=True)
+
+
+change_feed_listener = ChangeFeedListener(
+    settings.DATASET_REFRESH_INTERVAL,
+    snapshot_path=settings.DATASET_SNAPSHOT_PATH,
+    use_index=settings.SEARCH_INDEX_ENABLED,
+)
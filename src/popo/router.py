@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import heapq
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from ..database.connection import get_db
 from ..database.models.medical_personnel import MedicalPersonnel
+from .export import MEDIA_TYPES, export_etag, export_query, stream_export
+from .facets import etag_matches, facet_cache, facet_response
+from .hospitals import hospital_directory, SUGGEST_LIMIT
+from .index import search_index
+from .services import batch_lookup, search_cache, search_flight
+from .stats import stats_cube
 
 router = APIRouter()
 
+# 批次查詢一次最多可查詢的姓名與 id 數量
+BATCH_LOOKUP_LIMIT = 5000
+
 
 # Pydantic models
 class PersonnelResponse(BaseModel):
@@ -24,6 +35,28 @@ class PersonnelResponse(BaseModel):
         from_attributes = True
 
 
+class BatchLookupRequest(BaseModel):
+    names: List[str] = Field(default_factory=list, max_length=BATCH_LOOKUP_LIMIT)
+    ids: List[int] = Field(default_factory=list, max_length=BATCH_LOOKUP_LIMIT)
+    hospital: Optional[str] = None
+    city: Optional[str] = None
+
+
+class NameLookupResult(BaseModel):
+    name: str
+    matches: List[PersonnelResponse]
+
+
+class IdLookupResult(BaseModel):
+    id: int
+    match: Optional[PersonnelResponse]
+
+
+class BatchLookupResponse(BaseModel):
+    names: List[NameLookupResult]
+    ids: List[IdLookupResult]
+
+
 class StatsResponse(BaseModel):
     total_count: int
     city_distribution: dict
@@ -33,7 +66,7 @@ class StatsResponse(BaseModel):
 
 @router.get("/personnel", response_model=List[PersonnelResponse])
 async def get_personnel(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     skip: int = Query(0, description="Skip first N records"),
     limit: int = Query(100, description="Limit the number of records returned"),
     city: Optional[str] = Query(None, description="Filter by city"),
@@ -42,7 +75,27 @@ async def get_personnel(
     university: Optional[str] = Query(None, description="Filter by university"),
     name: Optional[str] = Query(None, description="Search by name"),
 ):
-    query = select(MedicalPersonnel)
+    if search_index.ready:
+        filters = {
+            "hospital": hospital,
+            "department": department,
+            "university": university,
+            "name": name,
+        }
+        ids = None
+        for field, term in filters.items():
+            if term:
+                matched = search_index.match(field, term)
+                ids = matched if ids is None else ids & matched
+        if ids is None:
+            # 沒有其他條件時直接取出依 id 排序的陣列的一段
+            page = search_index.sorted_ids(city)[skip:skip + limit]
+        else:
+            # 只取出前 skip + limit 個 id，不需排序全部的結果
+            page = heapq.nsmallest(skip + limit, search_index.filter_city(ids, city))[skip:]
+        return [search_index.rows[pk] for pk in page]
+
+    query = select(MedicalPersonnel).where(MedicalPersonnel.is_active.is_(True))
 
     if city:
         query = query.where(MedicalPersonnel.city == city)
@@ -55,44 +108,113 @@ async def get_personnel(
     if name:
         query = query.where(MedicalPersonnel.name.ilike(f"%{name}%"))
 
-    query = query.offset(skip).limit(limit)
-    result = db.execute(query)
+    query = query.order_by(MedicalPersonnel.id).offset(skip).limit(limit)
+    result = await db.execute(query)
     return result.scalars().all()
 
 
+@router.post("/personnel/batch-lookup", response_model=BatchLookupResponse)
+async def batch_lookup_personnel(body: BatchLookupRequest, db: AsyncSession = Depends(get_db)):
+    if len(body.names) + len(body.ids) > BATCH_LOOKUP_LIMIT:
+        raise HTTPException(
+            status_code=422, detail=f"At most {BATCH_LOOKUP_LIMIT} names and ids per request"
+        )
+    name_matches, id_matches = await batch_lookup(
+        db, body.names, body.ids, hospital=body.hospital, city=body.city
+    )
+    return {
+        "names": [{"name": name, "matches": name_matches.get(name, [])} for name in body.names],
+        "ids": [{"id": pk, "match": id_matches.get(pk)} for pk in body.ids],
+    }
+
+
+@router.get("/personnel/export")
+async def export_personnel(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    city: Optional[str] = Query(None, description="Filter by city"),
+    hospital: Optional[str] = Query(None, description="Filter by hospital"),
+    department: Optional[str] = Query(None, description="Filter by department"),
+    university: Optional[str] = Query(None, description="Filter by university"),
+    name: Optional[str] = Query(None, description="Search by name"),
+):
+    filters = {
+        "city": city,
+        "hospital": hospital,
+        "department": department,
+        "university": university,
+        "name": name,
+    }
+    etag = await export_etag(db, format, filters)
+    headers = {"Cache-Control": "no-cache"}
+
+    if etag:
+        headers["ETag"] = etag
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="personnel.{format}"'
+    return StreamingResponse(
+        stream_export(export_query(**filters), format),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
 @router.get("/personnel/cities")
-async def get_cities(db: Session = Depends(get_db)):
-    query = select(MedicalPersonnel.city).distinct()
-    result = db.execute(query)
-    return [row[0] for row in result]
+async def get_cities(request: Request, db: AsyncSession = Depends(get_db)):
+    return facet_response(request, await facet_cache.get("cities", db))
 
 
 @router.get("/personnel/departments")
-async def get_departments(db: Session = Depends(get_db)):
-    query = (
-        select(MedicalPersonnel.department)
-        .where(MedicalPersonnel.department != "")
-        .distinct()
-    )
-    result = db.execute(query)
-    return [row[0] for row in result]
+async def get_departments(request: Request, db: AsyncSession = Depends(get_db)):
+    return facet_response(request, await facet_cache.get("departments", db))
 
 
 @router.get("/personnel/universities")
-async def get_universities(db: Session = Depends(get_db)):
-    query = (
-        select(MedicalPersonnel.university)
-        .where(MedicalPersonnel.university != "")
-        .distinct()
-    )
-    result = db.execute(query)
-    return [row[0] for row in result]
+async def get_universities(request: Request, db: AsyncSession = Depends(get_db)):
+    return facet_response(request, await facet_cache.get("universities", db))
+
+
+@router.get("/personnel/stats", response_model=StatsResponse)
+async def get_stats(
+    db: AsyncSession = Depends(get_db),
+    city: Optional[str] = Query(None, description="Filter by city"),
+    department: Optional[str] = Query(None, description="Filter by department"),
+):
+    if not stats_cube.ready:
+        await stats_cube.load(db)
+    return stats_cube.get(city, department)
+
+
+@router.get("/hospitals/suggest")
+async def suggest_hospitals(
+    db: AsyncSession = Depends(get_db),
+    q: str = Query(..., description="Hospital name or alias prefix"),
+    limit: int = Query(SUGGEST_LIMIT, ge=1, le=SUGGEST_LIMIT, description="Limit the number of suggestions"),
+):
+    if not hospital_directory.ready:
+        await hospital_directory.load(db)
+    return hospital_directory.suggest(q, limit)
+
+
+@router.get("/search/cache")
+async def get_search_cache_stats():
+    return search_cache.stats()
+
+
+@router.get("/search/coalescing")
+async def get_search_coalescing_stats():
+    return search_flight.stats()
 
 
 @router.get("/personnel/{personnel_id}", response_model=PersonnelResponse)
-async def get_personnel_by_id(personnel_id: int, db: Session = Depends(get_db)):
-    query = select(MedicalPersonnel).where(MedicalPersonnel.id == personnel_id)
-    result = db.execute(query)
+async def get_personnel_by_id(personnel_id: int, db: AsyncSession = Depends(get_db)):
+    query = select(MedicalPersonnel).where(
+        MedicalPersonnel.id == personnel_id, MedicalPersonnel.is_active.is_(True)
+    )
+    result = await db.execute(query)
     personnel = result.scalar_one_or_none()
 
     if not personnel:
@@ -1,7 +1,7 @@
 """
 PoPo Doctor Schema
 """
-from enum import Enum
+from enum import Enum, IntEnum
 from dataclasses import dataclass
 
 class SearchType(Enum):
@@ -13,6 +13,16 @@ class SearchType(Enum):
     DEPARTMENT = "department"
 
 
+class MatchRank(IntEnum):
+    """
+    Match Rank, lower ranks first
+    """
+    EXACT = 0
+    PREFIX = 1
+    SUBSTRING = 2
+    FUZZY = 3
+
+
 @dataclass
 class SearchCriteria:
     """
@@ -21,3 +31,16 @@ class SearchCriteria:
     search_type: SearchType
     search_term: str
     city: str | None
+
+
+@dataclass
+class SearchCursor:
+    """
+    SearchCursor
+    """
+    criteria: SearchCriteria
+    last_key: tuple[int, str]
+    last_id: int
+    total_count: int
+    page: int
+    approximate: bool = False
@@ -1,57 +1,446 @@
 """
 Medical Personnel Search Service
 """
-from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Hashable
+from sqlalchemy import select, func, tuple_, case, literal, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config import settings
 from src.database.models.medical_personnel import MedicalPersonnel
-from .schemas import SearchType, SearchCriteria
+from src.infra.cache import TTLCache
+from src.infra.metrics import registry, register_cache, stage_seconds
+from .dataset import dataset_version
+from .facets import facet_cache
+from .hospitals import hospital_directory
+from .index import search_index, sort_key, SEARCH_FIELDS
+from .normalize import normalize
+from .schemas import SearchType, SearchCriteria, SearchCursor, MatchRank
+from .stats import stats_cube
 
+PAGE_SIZE = 10
 
-def search_doctor(criteria: SearchCriteria, db: Session, offset: int = 0) -> tuple[list, dict]:
+# 每次以 IN 查詢的 id 數量上限
+CHANGE_BATCH_SIZE = 1000
+
+
+class SingleFlight:
+    """
+    合併相同 key 的並行呼叫，同時間只有一個呼叫實際執行，其餘等待並共用結果
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        "Run func once per key among concurrent callers"
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # 執行中的呼叫被取消時改由自己重新執行
+                return await self.do(key, func)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # 避免沒有等待者時出現 "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        "Call / coalesced counters"
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
+
+
+search_cache = TTLCache(settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL)
+search_flight = SingleFlight()
+# 總筆數保留到分頁游標失效為止
+count_cache = TTLCache(settings.SEARCH_CACHE_SIZE, settings.SEARCH_STATE_TTL)
+# 任何異動都可能影響任一查詢結果，因此整個快取失效
+dataset_version.subscribe(lambda changed_ids: search_cache.clear())
+dataset_version.subscribe(lambda changed_ids: count_cache.clear())
+
+register_cache("search", search_cache.stats)
+register_cache("count", count_cache.stats)
+registry.callback(
+    "popo_search_coalesced_total", "Searches that waited for an identical in-flight search",
+    lambda: search_flight.coalesced, "counter",
+)
+
+
+async def reload_dataset(db: AsyncSession):
+    """
+    重新載入搜尋索引與統計資料並遞增資料版本，使所有快取失效
+    """
+    await search_index.load(db)
+    _rebuild_aggregates()
+
+
+def load_dataset_snapshot(path: str) -> int:
+    """
+    由快照檔案載入搜尋索引與統計資料並遞增資料版本，回傳快照的資料版本
+    """
+    version = search_index.load_file(path)
+    _rebuild_aggregates()
+    return version
+
+
+def _rebuild_aggregates():
+    stats_cube.build(search_index.rows.group_counts("city", "department", "university"))
+    hospital_directory.build(search_index.rows.counts("hospital").items())
+    dataset_version.bump()
+
+
+async def apply_changes(db: AsyncSession, personnel_ids: set[int]):
+    """
+    只針對異動的資料更新索引、統計、facet 與快取，不重新載入整份資料
+    """
+    rows = {}
+    ids = list(personnel_ids)
+    for start in range(0, len(ids), CHANGE_BATCH_SIZE):
+        query = select(MedicalPersonnel).where(
+            MedicalPersonnel.id.in_(ids[start:start + CHANGE_BATCH_SIZE])
+        )
+        for row in (await db.execute(query)).scalars():
+            db.expunge(row)
+            rows[row.id] = row
+
+    if search_index.ready:
+        for pk in personnel_ids:
+            row = rows.get(pk)
+            new = row if row is not None and row.is_active else None
+            old = search_index.rows.get(pk)
+            if new is not None:
+                search_index.add(new)
+            else:
+                search_index.remove(pk)
+            if old is not None:
+                stats_cube.remove(old)
+            if new is not None:
+                stats_cube.add(new)
+            facet_cache.apply(old, new)
+            hospital_directory.apply(old, new)
+        dataset_version.bump(set(personnel_ids))
+    else:
+        # 沒有索引時無法得知異動前的資料，統計與 facet 改為下次使用時重新計算
+        invalidate_dataset(set(personnel_ids))
+
+
+def invalidate_dataset(changed_ids: set[int] | None = None):
+    """
+    清除統計、facet、醫院名稱與搜尋快取，下次使用時由資料庫重新計算 (不使用索引時)
+    """
+    stats_cube.clear()
+    facet_cache.clear()
+    hospital_directory.clear()
+    dataset_version.bump(changed_ids)
+
+
+def _term_key(term: str) -> str:
+    # 索引以正規化後的字串比對 (例如: 臺/台 視為相同)，資料庫查詢則以原始字串不分大小寫比對
+    return normalize(term) if search_index.ready else term.lower()
+
+
+def _cache_key(criteria: SearchCriteria, offset: int, cursor: SearchCursor | None) -> tuple:
+    position = (cursor.last_key, cursor.last_id) if cursor else offset
+    # 查詢進行中資料被更新時，結果以舊版本的 key 存入，不會被之後的查詢取得
+    return (
+        dataset_version.version,
+        criteria.search_type.value,
+        _term_key(criteria.search_term),
+        criteria.city or None,
+        position,
+    )
+
+
+async def batch_lookup(
+    db: AsyncSession,
+    names: list[str],
+    ids: list[int],
+    hospital: str | None = None,
+    city: str | None = None,
+) -> tuple[dict[str, list], dict[int, Any]]:
+    """
+    一次查詢多個姓名與 id，可限定醫院與城市
+
+    索引已建立時直接由記憶體查詢，姓名以正規化後完全相符比對 (例如: 臺/台 視為相同)；
+    否則以一次 IN 查詢取得全部資料，姓名需完全相符。
+
+    Returns:
+        (姓名 -> 相符資料列表, id -> 資料)，查無資料的輸入不在結果中
+    """
+    hospitals = None
+    if hospital:
+        if not hospital_directory.ready:
+            await hospital_directory.load(db)
+        hospitals = hospital_directory.resolve(hospital)
+
+    if search_index.ready:
+        hospital_ids = None
+        if hospital:
+            hospital_ids = (
+                search_index.match_values("hospital", hospitals) if hospitals
+                else search_index.match("hospital", hospital)
+            )
+
+        def in_scope(matched: set[int]) -> set[int]:
+            # 只檢查輸入對應到的資料，不展開整個城市
+            if hospital_ids is not None:
+                matched &= hospital_ids
+            return search_index.filter_city(matched, city)
+
+        name_matches = {}
+        for name in dict.fromkeys(names):
+            matched = in_scope(search_index.match_values("name", [name]))
+            if matched:
+                name_matches[name] = [search_index.rows[pk] for pk in sorted(matched)]
+        found = in_scope({pk for pk in ids if pk in search_index.rows})
+        id_matches = {pk: search_index.rows[pk] for pk in ids if pk in found}
+        return name_matches, id_matches
+
+    query = select(MedicalPersonnel).where(
+        MedicalPersonnel.is_active.is_(True),
+        or_(MedicalPersonnel.name.in_(set(names)), MedicalPersonnel.id.in_(set(ids))),
+    )
+    if hospitals:
+        query = query.where(MedicalPersonnel.hospital.in_(hospitals))
+    elif hospital:
+        query = query.where(MedicalPersonnel.hospital.ilike(f"%{hospital}%"))
+    if city:
+        query = query.where(MedicalPersonnel.city == city)
+    rows = (await db.execute(query.order_by(MedicalPersonnel.id))).scalars().all()
+
+    name_matches, id_matches = {}, {}
+    requested_names, requested_ids = set(names), set(ids)
+    for row in rows:
+        # 以 id 查到的資料不列入姓名結果
+        if row.name in requested_names:
+            name_matches.setdefault(row.name, []).append(row)
+        if row.id in requested_ids:
+            id_matches[row.id] = row
+    return name_matches, id_matches
+
+
+async def search_doctor(
+    criteria: SearchCriteria,
+    db: AsyncSession,
+    offset: int = 0,
+    cursor: SearchCursor | None = None,
+) -> tuple[list, dict]:
     """
     搜尋醫生資料
     Args:
         criteria: 搜尋條件
         db: 資料庫連線
         offset: 分頁偏移量
+        cursor: 上一頁的分頁游標，提供時以 keyset 方式取得下一頁且不重新計數
     Returns:
         (搜尋結果列表, 搜尋統計資訊)
     """
-    base_query = select(MedicalPersonnel)
+    key = _cache_key(criteria, offset, cursor)
+    cached = search_cache.get(key)
+    if cached is None:
+        # 相同的查詢同時進行時只會查詢一次資料庫
+        cached = await search_flight.do(
+            key, lambda: _search(criteria, db, offset, cursor)
+        )
+        if key[0] == dataset_version.version:
+            search_cache.set(key, cached)
+    return cached
+
+
+async def _search(
+    criteria: SearchCriteria,
+    db: AsyncSession,
+    offset: int,
+    cursor: SearchCursor | None,
+) -> tuple[list, dict]:
+    page = cursor.page + 1 if cursor else offset // PAGE_SIZE + 1
+
+    after = (*cursor.last_key, cursor.last_id) if cursor else None
+
+    # 醫院名稱或簡稱 (例如: 三總) 可對應到資料中的醫院時，只搜尋這些醫院
+    values = None
+    if criteria.search_type == SearchType.HOSPITAL:
+        if not hospital_directory.ready:
+            await hospital_directory.load(db)
+        values = hospital_directory.resolve(criteria.search_term) or None
+
+    # 索引已建立時直接由記憶體回應，不需查詢資料庫
+    if search_index.ready:
+        with stage_seconds.time("search_index"):
+            doctors, total_count = search_index.search(
+                criteria,
+                limit=PAGE_SIZE,
+                offset=0 if cursor else offset,
+                after=after,
+                values=values,
+            )
+        return doctors, _build_stats(criteria, doctors, total_count, page, values)
 
     # 根據搜尋類型加入不同的條件
-    if criteria.search_type == SearchType.NAME:
-        base_query = base_query.where(
-            MedicalPersonnel.name.ilike(f"%{criteria.search_term}%")
-        )
-    elif criteria.search_type == SearchType.HOSPITAL:
-        base_query = base_query.where(
-            MedicalPersonnel.hospital.ilike(f"%{criteria.search_term}%")
-        )
-    elif criteria.search_type == SearchType.DEPARTMENT:
-        base_query = base_query.where(
-            MedicalPersonnel.department.ilike(f"%{criteria.search_term}%")
+    column = getattr(MedicalPersonnel, SEARCH_FIELDS[criteria.search_type])
+    term = criteria.search_term.lower()
+    base_query = select(MedicalPersonnel).where(MedicalPersonnel.is_active.is_(True))
+    if values:
+        base_query = base_query.where(column.in_(values))
+        rank = literal(int(MatchRank.EXACT))
+    else:
+        base_query = base_query.where(column.ilike(f"%{criteria.search_term}%"))
+        rank = case(
+            (func.lower(column) == term, int(MatchRank.EXACT)),
+            (func.lower(column).startswith(term, autoescape=True), int(MatchRank.PREFIX)),
+            else_=int(MatchRank.SUBSTRING),
         )
 
     # 加入城市搜尋條件
     if criteria.city:
         base_query = base_query.where(MedicalPersonnel.city == criteria.city)
 
-    # 計算總筆數
-    count_query = select(func.count(1)).select_from(base_query.subquery())
-    total_count = db.execute(count_query).scalar()
+    if cursor:
+        # 游標已帶有總筆數，直接由上一頁最後一筆往後搜尋
+        total_count, approximate = cursor.total_count, cursor.approximate
+        query = base_query.where(
+            tuple_(rank, MedicalPersonnel.name, MedicalPersonnel.id) > tuple_(*after)
+        )
+    else:
+        with stage_seconds.time("search_count"):
+            total_count, approximate = await _count(criteria, base_query, db, values)
+        query = base_query.offset(offset)
+
+    # 多取一筆判斷是否還有下一頁，總筆數為估計值時也不會多出空白頁
+    # 相符程度一併取回作為游標，與資料庫的排序一致 (不使用正規化後的 sort_key)
+    query = (
+        query.add_columns(rank.label("match_rank"))
+        .order_by(rank, MedicalPersonnel.name, MedicalPersonnel.id)
+        .limit(PAGE_SIZE + 1)
+    )
+    with stage_seconds.time("search_fetch"):
+        result = await db.execute(query)
+        rows = result.all()
+    has_more = len(rows) > PAGE_SIZE
+    rows = rows[:PAGE_SIZE]
+    doctors = [doctor for doctor, _ in rows]
+    last_key = (rows[-1].match_rank, rows[-1][0].name, rows[-1][0].id) if rows else None
+
+    return doctors, _build_stats(
+        criteria, doctors, total_count, page, values,
+        has_more=has_more, approximate=approximate, last_key=last_key,
+    )
+
+
+async def _count(
+    criteria: SearchCriteria,
+    query,
+    db: AsyncSession,
+    values: list[str] | None,
+) -> tuple[int, bool]:
+    """
+    取得搜尋結果的總筆數與是否為估計值
+
+    相同條件只計算一次並保留到分頁游標失效；不指定關鍵字時由預先計算的統計取得，
+    SEARCH_COUNT_MODE 為 estimate 時結果較多的查詢改以查詢計畫估計筆數。
+    """
+    term = _term_key(criteria.search_term)
+    key = (dataset_version.version, criteria.search_type.value, term, criteria.city or None)
+    cached = count_cache.get(key)
+    if cached is not None:
+        return cached
+
+    if not term and not values and criteria.search_type in (SearchType.NAME, SearchType.HOSPITAL):
+        # 姓名與醫院不為空，沒有關鍵字時即為該城市的全部筆數
+        if not stats_cube.ready:
+            await stats_cube.load(db)
+        counted = stats_cube.count(criteria.city), False
+    else:
+        counted = None
+        if settings.SEARCH_COUNT_MODE == "estimate":
+            counted = await _estimate_count(query, db)
+        if counted is None:
+            count_query = select(func.count(1)).select_from(query.subquery())
+            counted = (await db.execute(count_query)).scalar(), False
 
-    # 限制回傳數量
-    query = base_query.offset(offset).limit(10)
-    result = db.execute(query)
+    if key[0] == dataset_version.version:
+        count_cache.set(key, counted)
+    return counted
 
-    doctors = result.scalars().all()
 
-    stats = {
+async def _estimate_count(query, db: AsyncSession) -> tuple[int, bool] | None:
+    """
+    以 PostgreSQL 的查詢計畫估計筆數，估計值低於門檻或無法估計時回傳 None
+    """
+    dialect = db.bind.dialect
+    if dialect.name != "postgresql":
+        return None
+
+    compiled = query.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    connection = await db.connection()
+    plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    rows = int(plan[0]["Plan"]["Plan Rows"])
+    if rows < settings.SEARCH_COUNT_ESTIMATE_THRESHOLD:
+        return None
+    return rows, True
+
+
+def _build_stats(
+    criteria: SearchCriteria,
+    doctors: list,
+    total_count: int,
+    page: int,
+    values: list[str] | None = None,
+    has_more: bool | None = None,
+    approximate: bool = False,
+    last_key: tuple[int, str, int] | None = None,
+) -> dict:
+    """
+    產生搜尋統計資訊與下一頁游標
+
+    last_key 為最後一筆的排序鍵，未提供時以 sort_key 計算。
+    """
+    if has_more is None:
+        has_more = page * PAGE_SIZE < total_count and bool(doctors)
+    next_cursor = None
+    if has_more:
+        last_rank, last_name, last_id = last_key or sort_key(criteria, doctors[-1], values)
+        next_cursor = SearchCursor(
+            criteria=criteria,
+            last_key=(last_rank, last_name),
+            last_id=last_id,
+            total_count=total_count,
+            page=page,
+            approximate=approximate,
+        )
+
+    return {
         "total_count": total_count,
-        "current_page": offset // 10 + 1,
-        "total_pages": (total_count + 9) // 10,
-        "has_more": (offset + 10) < total_count
+        "current_page": page,
+        "total_pages": (total_count + PAGE_SIZE - 1) // PAGE_SIZE,
+        "approximate": approximate,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
     }
-
-    return doctors, stats
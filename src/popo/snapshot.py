@@ -0,0 +1,363 @@
+"""
+Medical Personnel Columnar Snapshot
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Mapping
+from src.database.models.medical_personnel import GraduationStatus
+
+
+class StringTable:
+    """
+    字串表，相同的字串只保存一份並以整數代碼表示，代碼 0 代表 None
+
+    字串以 UTF-8 連續存放，讀取時才解碼；反查代碼使用以代碼為內容的開放定址雜湊表，
+    不為每個字串保留 Python 物件。由快照檔案載入時字串留在 mmap 中，之後新增的字串另外保存。
+    """
+
+    def __init__(self, offsets: memoryview | None = None, blob: memoryview | None = None):
+        self._mapped_offsets = offsets
+        self._mapped_blob = blob
+        self._mapped = len(offsets) - 1 if offsets is not None else 0
+        self._offsets = array("I", [0])
+        self._blob = bytearray()
+        self._slots: array | None = None
+
+    @classmethod
+    def of(cls, values) -> "StringTable":
+        "Build a table whose codes follow the order of the given distinct strings"
+        table = cls()
+        for value in values:
+            table._append(value)
+        return table
+
+    def intern(self, value: str | None) -> int:
+        "Get the code of a string, adding it to the table if needed"
+        if value is None:
+            return 0
+        code = self.find(value)
+        if not code:
+            code = self._append(value)
+            if self._slots is not None:
+                if len(self) * 2 > len(self._slots):
+                    self._rehash()
+                else:
+                    self._place(code, value)
+        return code
+
+    def find(self, value: str | None) -> int:
+        "Code of a string, or 0 when it is not in the table"
+        if value is None:
+            return 0
+        if self._slots is None:
+            # 第一次需要反查時才建立雜湊表
+            self._rehash()
+        mask = len(self._slots) - 1
+        slot = hash(value) & mask
+        while code := self._slots[slot]:
+            if self[code] == value:
+                return code
+            slot = (slot + 1) & mask
+        return 0
+
+    def _append(self, value: str) -> int:
+        self._blob += value.encode()
+        self._offsets.append(len(self._blob))
+        return len(self) - 1
+
+    def _rehash(self):
+        size = 8
+        while size < len(self) * 2:
+            size *= 2
+        self._slots = array("I", bytes(4 * size))
+        for code in range(1, len(self)):
+            self._place(code, self[code])
+
+    def _place(self, code: int, value: str):
+        mask = len(self._slots) - 1
+        slot = hash(value) & mask
+        while self._slots[slot]:
+            slot = (slot + 1) & mask
+        self._slots[slot] = code
+
+    def dump(self) -> tuple[array, bytes]:
+        "Encode the table as (offsets, utf-8 blob) for a snapshot file"
+        if not self._mapped:
+            return self._offsets, bytes(self._blob)
+        mapped_end = self._mapped_offsets[-1]
+        offsets = array("I", self._mapped_offsets)
+        offsets.extend(mapped_end + offset for offset in self._offsets[1:])
+        return offsets, bytes(self._mapped_blob) + self._blob
+
+    def __getitem__(self, code: int) -> str | None:
+        if code > self._mapped:
+            code -= self._mapped
+            return self._blob[self._offsets[code - 1]:self._offsets[code]].decode()
+        if code:
+            return str(self._mapped_blob[self._mapped_offsets[code - 1]:self._mapped_offsets[code]], "utf-8")
+        return None
+
+    def __len__(self) -> int:
+        return self._mapped + len(self._offsets)
+
+
+class _Column:
+    """
+    PersonnelRow 的唯讀欄位，讀取時才由字串表解碼
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, row, owner=None):
+        if row is None:
+            return self
+        return row._snapshot.value(row._position, self.name)
+
+
+class PersonnelRow:
+    """
+    Read-only view of one row in a PersonnelSnapshot.
+
+    Exposes the same attributes as MedicalPersonnel, so templates and
+    response models can use it in place of an ORM object.
+    """
+
+    __slots__ = ("_snapshot", "_position")
+
+    city = _Column()
+    hospital = _Column()
+    department = _Column()
+    name = _Column()
+    education = _Column()
+    university = _Column()
+    graduation_status = _Column()
+
+    def __init__(self, snapshot: "PersonnelSnapshot", position: int):
+        self._snapshot = snapshot
+        self._position = position
+
+    @property
+    def id(self) -> int:
+        return self._snapshot.id_at(self._position)
+
+    def __repr__(self):
+        return f"<PersonnelRow(id={self.id}, name={self.name}, hospital={self.hospital})>"
+
+
+class PersonnelSnapshot(Mapping):
+    """
+    medical_personnel 的唯讀欄式快照，以 id 對應 PersonnelRow
+
+    每個文字欄位都存成字串表代碼的 array，city、hospital 等重複值多的欄位只佔
+    一個整數。建立或載入的資料依 id 排序，以二分搜尋由 id 找到位置，不需要 id 對應表。
+    之後的異動只會附加：更新會附加新的一筆並讓舊位置失效，
+    已取得的 PersonnelRow 因此不會被之後的異動改變。
+    """
+
+    COLUMNS = (
+        "city",
+        "hospital",
+        "department",
+        "name",
+        "education",
+        "university",
+        "graduation_status",
+    )
+
+    def __init__(
+        self,
+        strings: StringTable | None = None,
+        ids: array | memoryview | None = None,
+        columns: dict[str, array | memoryview] | None = None,
+    ):
+        self.strings = strings if strings is not None else StringTable()
+        self.ids = ids if ids is not None else array("I")
+        self._columns = columns if columns is not None else {
+            column: array("I") for column in self.COLUMNS
+        }
+        self._base = len(self.ids)
+        # 建立後附加的資料，由 id 對應位置
+        self._tail_ids = array("I")
+        self._tail_columns = {column: array("I") for column in self.COLUMNS}
+        self._tail: dict[int, int] = {}
+        # 已失效的排序區位置
+        self.dead: set[int] = set()
+
+    @classmethod
+    def from_rows(cls, rows, strings: StringTable | None = None) -> "PersonnelSnapshot":
+        """
+        由 MedicalPersonnel 或具有相同欄位的物件建立快照，資料依 id 排序
+        """
+        strings = strings if strings is not None else StringTable()
+        ids = array("I")
+        columns = {column: array("I") for column in cls.COLUMNS}
+        for row in rows:
+            ids.append(row.id)
+            for column in cls.COLUMNS:
+                value = getattr(row, column)
+                if isinstance(value, GraduationStatus):
+                    value = value.value
+                columns[column].append(strings.intern(value))
+
+        if any(ids[i] >= ids[i + 1] for i in range(len(ids) - 1)):
+            order = sorted(range(len(ids)), key=ids.__getitem__)
+            ids = array("I", map(ids.__getitem__, order))
+            columns = {
+                column: array("I", map(codes.__getitem__, order))
+                for column, codes in columns.items()
+            }
+        return cls(strings, ids, columns)
+
+    @property
+    def changes(self) -> int:
+        "Number of positions added or retired since the snapshot was built"
+        return len(self._tail_ids) + len(self.dead)
+
+    @property
+    def garbage(self) -> int:
+        "Number of stale positions left behind by updates and deletes"
+        return self._base + len(self._tail_ids) - len(self)
+
+    def position(self, pk: int) -> int | None:
+        "Position of the current version of a row"
+        position = self._tail.get(pk)
+        if position is not None:
+            return position
+        position = bisect_left(self.ids, pk, 0, self._base)
+        if position < self._base and self.ids[position] == pk and position not in self.dead:
+            return position
+        return None
+
+    def positions(self):
+        "Positions of the current rows, ordered by id and then by the time they were added"
+        dead = self.dead
+        for position in range(self._base):
+            if position not in dead:
+                yield position
+        yield from self._tail.values()
+
+    def id_at(self, position: int) -> int:
+        "Id of the row at the given position"
+        if position < self._base:
+            return self.ids[position]
+        return self._tail_ids[position - self._base]
+
+    def code_at(self, position: int, column: str) -> int:
+        "String table code of a column at the given position"
+        if position < self._base:
+            return self._columns[column][position]
+        return self._tail_columns[column][position - self._base]
+
+    def where(self, positions, column: str, code: int) -> list[int]:
+        "Positions among the given ones whose column has the given code"
+        base, codes, tail = self._base, self._columns[column], self._tail_columns[column]
+        return [
+            position for position in positions
+            if (codes[position] if position < base else tail[position - base]) == code
+        ]
+
+    def code(self, pk: int, column: str) -> int:
+        "String table code of a column of the given row"
+        return self.code_at(self._position(pk), column)
+
+    def value(self, position: int, column: str):
+        "Decoded value of a column at the given position"
+        value = self.strings[self.code_at(position, column)]
+        if column == "graduation_status" and value is not None:
+            return GraduationStatus(value)
+        return value
+
+    def columns(self) -> dict[str, array]:
+        "Column arrays for a snapshot file, ordered by id and without stale positions"
+        snapshot = self.compacted() if self.changes else self
+        return {"ids": snapshot.ids, **snapshot._columns}
+
+    def append(self, row) -> int:
+        """
+        附加一筆資料 (MedicalPersonnel 或具有相同欄位的物件)，回傳其位置
+
+        已有相同 id 的資料時須先 discard。
+        """
+        position = self._base + len(self._tail_ids)
+        self._tail_ids.append(row.id)
+        for column in self.COLUMNS:
+            value = getattr(row, column)
+            if isinstance(value, GraduationStatus):
+                value = value.value
+            self._tail_columns[column].append(self.strings.intern(value))
+        self._tail[row.id] = position
+        return position
+
+    def discard(self, pk: int) -> int | None:
+        "Drop a row from the snapshot, returning its former position"
+        position = self._tail.pop(pk, None)
+        if position is None:
+            position = self.position(pk)
+            if position is not None:
+                self.dead.add(position)
+        return position
+
+    def compacted(self) -> "PersonnelSnapshot":
+        """
+        Copy the current rows, ordered by id, into a new snapshot without stale
+        positions or strings that are no longer used
+        """
+        positions = sorted(self.positions(), key=self.id_at)
+        strings = StringTable()
+        codes = {}
+        columns = {}
+        for column in self.COLUMNS:
+            values = array("I")
+            for position in positions:
+                code = self.code_at(position, column)
+                new_code = codes.get(code)
+                if new_code is None:
+                    new_code = codes[code] = strings.intern(self.strings[code])
+                values.append(new_code)
+            columns[column] = values
+        ids = array("I", map(self.id_at, positions))
+        return PersonnelSnapshot(strings, ids, columns)
+
+    def counts(self, column: str) -> Counter:
+        """
+        計算欄位各值的筆數 (不含 None)，直接以代碼計數後才解碼
+        """
+        counts = Counter(self._columns[column])
+        counts.subtract(self._columns[column][position] for position in self.dead)
+        counts.update(self.code_at(position, column) for position in self._tail.values())
+        return Counter({self.strings[code]: count for code, count in counts.items() if code and count > 0})
+
+    def group_counts(self, *columns: str):
+        """
+        依多個欄位分組計數，回傳 (值..., 筆數) tuple
+        """
+        arrays = [self._columns[column] for column in columns]
+        counts = Counter(zip(*arrays))
+        counts.subtract(tuple(codes[position] for codes in arrays) for position in self.dead)
+        counts.update(
+            tuple(self.code_at(position, column) for column in columns)
+            for position in self._tail.values()
+        )
+        for key, count in counts.items():
+            if count > 0:
+                yield (*(self.strings[code] for code in key), count)
+
+    def _position(self, pk: int) -> int:
+        position = self.position(pk)
+        if position is None:
+            raise KeyError(pk)
+        return position
+
+    def __getitem__(self, pk: int) -> PersonnelRow:
+        return PersonnelRow(self, self._position(pk))
+
+    def __contains__(self, pk) -> bool:
+        return isinstance(pk, int) and self.position(pk) is not None
+
+    def __iter__(self):
+        return map(self.id_at, self.positions())
+
+    def __len__(self) -> int:
+        return self._base - len(self.dead) + len(self._tail)
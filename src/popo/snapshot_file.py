@@ -0,0 +1,146 @@
+"""
+Dataset Snapshot File
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+MAGIC = b"POPOSNAP"
+FORMAT_VERSION = 3
+
+# 每個區段對齊的位元組數，讓 mmap 後的 memoryview 能直接轉型為數值陣列
+ALIGNMENT = 8
+
+_LENGTH = struct.Struct("<I")
+
+
+class SnapshotFileError(Exception):
+    """
+    快照檔案不存在、格式不符或已損毀
+    """
+
+
+@dataclass
+class SnapshotFile:
+    """
+    以唯讀 mmap 開啟的快照檔案
+
+    sections 的 memoryview 直接指向 mmap，同一個檔案的分頁由所有 worker 共用。
+    """
+    version: int
+    created_at: datetime
+    meta: dict
+    sections: dict[str, memoryview] = field(repr=False)
+    stat: os.stat_result = field(repr=False)
+
+
+def write_snapshot(path: str, version: int, meta: dict, sections: dict[str, memoryview | bytes]):
+    """
+    寫入快照檔案
+
+    先寫入同目錄的暫存檔再以 os.replace 取代，讀取中的 worker 仍持有舊檔案，
+    不會讀到寫入一半的內容。
+
+    Args:
+        path: 快照檔案路徑
+        version: 資料版本，讀取端依此判斷是否需要切換
+        meta: 其他描述資料 (需可序列化為 JSON)
+        sections: 區段名稱與內容 (array 或 bytes)，數值陣列以 typecode 記錄型別
+    """
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        view = memoryview(data)
+        offset += -offset % ALIGNMENT
+        layout[name] = [offset, view.nbytes, view.format]
+        offset += view.nbytes
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "meta": meta,
+        "sections": layout,
+    }).encode()
+    data_start = len(MAGIC) + _LENGTH.size + len(header)
+    data_start += -data_start % ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(_LENGTH.pack(len(header)))
+            f.write(header)
+            for name, data in sections.items():
+                f.seek(data_start + layout[name][0])
+                f.write(memoryview(data).cast("B"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_header(f) -> tuple[dict, int]:
+    prefix = f.read(len(MAGIC) + _LENGTH.size)
+    if len(prefix) < len(MAGIC) + _LENGTH.size or prefix[:len(MAGIC)] != MAGIC:
+        raise SnapshotFileError("Not a snapshot file")
+    (length,) = _LENGTH.unpack(prefix[len(MAGIC):])
+    try:
+        header = json.loads(f.read(length))
+    except ValueError as e:
+        raise SnapshotFileError("Corrupt snapshot header") from e
+    if header.get("format") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+        raise SnapshotFileError("Unsupported snapshot format")
+    data_start = len(MAGIC) + _LENGTH.size + length
+    return header, data_start + (-data_start % ALIGNMENT)
+
+
+def read_version(path: str) -> int | None:
+    """
+    只讀取檔頭的資料版本，檔案不存在或無法讀取時回傳 None
+    """
+    try:
+        with open(path, "rb") as f:
+            return _read_header(f)[0]["version"]
+    except (OSError, SnapshotFileError):
+        return None
+
+
+def open_snapshot(path: str) -> SnapshotFile:
+    """
+    以唯讀 mmap 開啟快照檔案
+    """
+    try:
+        with open(path, "rb") as f:
+            header, data_start = _read_header(f)
+            stat = os.fstat(f.fileno())
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError as e:
+        raise SnapshotFileError(str(e)) from e
+
+    view = memoryview(buffer)
+    sections = {}
+    for name, (offset, length, typecode) in header["sections"].items():
+        start = data_start + offset
+        if start + length > len(buffer):
+            raise SnapshotFileError(f"Truncated snapshot section: {name}")
+        sections[name] = view[start:start + length].cast(typecode)
+
+    return SnapshotFile(
+        version=header["version"],
+        created_at=datetime.fromisoformat(header["created_at"]),
+        meta=header["meta"],
+        sections=sections,
+        stat=stat,
+    )
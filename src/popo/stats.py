@@ -0,0 +1,111 @@
+"""
+Medical Personnel Statistics
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.database.models.medical_personnel import MedicalPersonnel
+
+
+@dataclass
+class _Aggregate:
+    total_count: int = 0
+    city: Counter = field(default_factory=Counter)
+    university: Counter = field(default_factory=Counter)
+    department: Counter = field(default_factory=Counter)
+
+    def update(self, city: str, department: str | None, university: str | None, count: int):
+        self.total_count += count
+        for counter, value in (
+            (self.city, city),
+            (self.department, department),
+            (self.university, university),
+        ):
+            if not value:
+                continue
+            counter[value] += count
+            if counter[value] <= 0:
+                del counter[value]
+
+
+class StatsCube:
+    """
+    預先計算的統計資料
+
+    每筆資料會累加到 (全部)、(城市)、(科別)、(城市, 科別) 四個 cell，
+    因此以城市與科別篩選的統計都能直接取用，新增或停用資料時也只需更新這四個 cell。
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._cells: dict[tuple[str | None, str | None], _Aggregate] = {}
+
+    def build(self, rows):
+        "Build the cube from (city, department, university, count) tuples"
+        self._cells = {}
+        for city, department, university, count in rows:
+            self._update(city, department, university, count)
+        self.ready = True
+
+    async def load(self, db: AsyncSession):
+        "Build the cube with a single GROUP BY over medical_personnel"
+        columns = (
+            MedicalPersonnel.city,
+            MedicalPersonnel.department,
+            MedicalPersonnel.university,
+        )
+        result = await db.execute(
+            select(*columns, func.count(1))
+            .where(MedicalPersonnel.is_active.is_(True))
+            .group_by(*columns)
+        )
+        self.build(result.all())
+
+    def clear(self):
+        "Drop the cube so it is loaded again on next use"
+        self._cells = {}
+        self.ready = False
+
+    def add(self, row: MedicalPersonnel):
+        "Account for an inserted row"
+        self._update(row.city, row.department, row.university, 1)
+
+    def remove(self, row: MedicalPersonnel):
+        "Account for a deleted or deactivated row"
+        self._update(row.city, row.department, row.university, -1)
+
+    def _update(self, city: str, department: str | None, university: str | None, count: int):
+        department_key = department or None
+        for key in {
+            (None, None),
+            (city, None),
+            (None, department_key),
+            (city, department_key),
+        }:
+            aggregate = self._cells.get(key)
+            if aggregate is None:
+                aggregate = self._cells[key] = _Aggregate()
+            aggregate.update(city, department, university, count)
+            if aggregate.total_count <= 0:
+                del self._cells[key]
+
+    def count(self, city: str | None = None, department: str | None = None) -> int:
+        "Number of rows matching the given city and department"
+        aggregate = self._cells.get((city or None, department or None))
+        return aggregate.total_count if aggregate else 0
+
+    def get(self, city: str | None = None, department: str | None = None) -> dict:
+        """
+        取得統計資料，可依城市與科別篩選
+        """
+        aggregate = self._cells.get((city or None, department or None), _Aggregate())
+        return {
+            "total_count": aggregate.total_count,
+            "city_distribution": dict(aggregate.city),
+            "university_distribution": dict(aggregate.university),
+            "department_distribution": dict(aggregate.department),
+        }
+
+
+stats_cube = StatsCube()
@@ -0,0 +1,58 @@
+"""
+Test Configuration
+"""
+import os
+
+# 測試不連線到實際的資料庫與 LINE，Settings 在 import src 之前就需要這些值
+os.environ.update(
+    ENVIRONMENT="test",
+    LINE_MESSAGE_CHANNEL_SECRET="test-secret",
+    LINE_MESSAGE_CHANNEL_TOKEN="test-token",
+    DB_HOST="",
+    DB_PORT="",
+    DB_USER="",
+    DB_PASSWORD="",
+    DB_NAME="",
+    DB_URL="sqlite+aiosqlite://",
+    DATASET_SNAPSHOT_PATH="",
+    DATASET_REFRESH_INTERVAL="0",
+    SEARCH_INDEX_ENABLED="true",
+    SEARCH_STATE_BACKEND="memory",
+    LOG_FILE="",
+)
+
+import pytest  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from src.database.connection import get_db  # noqa: E402
+from src.popo.facets import facet_cache  # noqa: E402
+from src.popo.hospitals import hospital_directory  # noqa: E402
+from src.popo.index import search_index  # noqa: E402
+from src.popo.router import router  # noqa: E402
+from src.popo.services import search_cache, count_cache  # noqa: E402
+from src.popo.stats import stats_cube  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def reset_dataset():
+    "Start every test without an index, aggregates or cached searches"
+    search_index.__init__()
+    stats_cube.clear()
+    facet_cache.clear()
+    hospital_directory.clear()
+    search_cache.clear()
+    count_cache.clear()
+    yield
+
+
+@pytest.fixture
+def client():
+    "popo API without a database; tests build search_index first"
+    async def no_db():
+        yield None
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/popo")
+    app.dependency_overrides[get_db] = no_db
+    with TestClient(app) as test_client:
+        yield test_client
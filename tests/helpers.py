@@ -0,0 +1,48 @@
+"""
+Test Helpers
+"""
+import random
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.database.models.base import Base
+from src.database.models.medical_personnel import MedicalPersonnel, GraduationStatus
+from src.database.models.personnel_change import PersonnelChange  # noqa: F401
+
+CITIES = ("台北", "新北", "台中", "高雄")
+HOSPITALS = ("台大醫院", "三軍總醫院", "長庚紀念醫院", "馬偕紀念醫院", "台北榮民總醫院")
+DEPARTMENTS = ("小兒科", "內科", "外科", "牙科", None)
+SURNAMES = "王陳林張李"
+GIVEN = "大明小華美玲志強"
+
+
+def personnel(count: int, seed: int = 1) -> list[dict]:
+    "Deterministic medical_personnel rows"
+    rng = random.Random(seed)
+    return [
+        {
+            "city": rng.choice(CITIES),
+            "hospital": rng.choice(HOSPITALS),
+            "department": rng.choice(DEPARTMENTS),
+            "name": rng.choice(SURNAMES) + "".join(rng.sample(GIVEN, 2)),
+            "education": "台灣大學醫學系",
+            "university": "台灣大學",
+            "graduation_status": GraduationStatus.GRADUATED,
+        }
+        for _ in range(count)
+    ]
+
+
+async def create_database(rows: list[dict] = ()):
+    """
+    建立 in-memory SQLite 資料庫並寫入資料，回傳 (engine, session factory)
+
+    需在使用資料庫的同一個 event loop 中呼叫。
+    """
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    async with sessions() as db:
+        db.add_all(MedicalPersonnel(**row) for row in rows)
+        await db.commit()
+    return engine, sessions
@@ -0,0 +1,70 @@
+import asyncio
+from sqlalchemy import update
+from src.database.models.medical_personnel import MedicalPersonnel
+from src.popo.hospitals import hospital_directory
+from src.popo.index import search_index
+from src.popo.router import BATCH_LOOKUP_LIMIT
+from src.popo.services import batch_lookup, reload_dataset
+from .helpers import create_database, personnel
+from .test_index import _row
+
+ROWS = personnel(80)
+NAMES = [ROWS[0]["name"], ROWS[1]["name"], ROWS[7]["name"], "不存在"]
+IDS = [1, 3, 9, 30, 500]
+SCOPES = [
+    {},
+    {"city": "台北"},
+    {"hospital": "三總"},
+    {"hospital": "台大", "city": "高雄"},
+    {"hospital": "紀念醫院"},
+]
+
+
+def _summary(result):
+    name_matches, id_matches = result
+    return (
+        {name: [row.id for row in rows] for name, rows in name_matches.items()},
+        {pk: row.id for pk, row in id_matches.items()},
+    )
+
+
+def test_index_and_sql_lookups_agree():
+    async def scenario():
+        _, sessions = await create_database(ROWS)
+        async with sessions() as db:
+            await db.execute(update(MedicalPersonnel).where(MedicalPersonnel.id == 3).values(is_active=False))
+            await db.commit()
+            sql = [_summary(await batch_lookup(db, NAMES, IDS, **scope)) for scope in SCOPES]
+            await reload_dataset(db)
+            indexed = [_summary(await batch_lookup(db, NAMES, IDS, **scope)) for scope in SCOPES]
+        return sql, indexed
+
+    sql, indexed = asyncio.run(scenario())
+    assert sql == indexed
+    names, ids = sql[0]
+    assert "不存在" not in names
+    assert names[ROWS[0]["name"]] == [pk for pk, row in enumerate(ROWS, 1) if row["name"] == ROWS[0]["name"]]
+    assert ids == {1: 1, 9: 9, 30: 30}
+    assert all(
+        ROWS[pk - 1]["hospital"] == "三軍總醫院"
+        for pk in [*sql[2][1], *(pk for rows in sql[2][0].values() for pk in rows)]
+    )
+
+
+def test_batch_lookup_route(client):
+    search_index.build([_row(1, "王大明", hospital="臺北榮民總醫院"), _row(2, "陳小華")])
+    hospital_directory.build(search_index.rows.counts("hospital").items())
+    response = client.post(
+        "/api/popo/personnel/batch-lookup",
+        json={"names": ["王大明", "林美玲"], "ids": [2, 7], "hospital": "北榮"},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert [(entry["name"], [row["id"] for row in entry["matches"]]) for entry in body["names"]] == [
+        ("王大明", [1]),
+        ("林美玲", []),
+    ]
+    assert body["ids"] == [{"id": 2, "match": None}, {"id": 7, "match": None}]
+
+    too_many = {"names": ["王"] * BATCH_LOOKUP_LIMIT, "ids": [1]}
+    assert client.post("/api/popo/personnel/batch-lookup", json=too_many).status_code == 422
@@ -0,0 +1,65 @@
+import pytest
+from src.infra import circuit_breaker
+from src.infra.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_threshold(clock):
+    breaker = CircuitBreaker("test", threshold=2, cooldown=10)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.rejected == 1
+
+
+def test_success_resets_failures(clock):
+    breaker = CircuitBreaker("test", threshold=2, cooldown=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_allows_a_single_probe(clock):
+    breaker = CircuitBreaker("test", threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_call() is False
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test", threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock[0] += 10
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock[0] += 5
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_released_probe_lets_another_through(clock):
+    breaker = CircuitBreaker("test", threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock[0] += 10
+    breaker.before_call()
+    breaker.release()
+    assert breaker.before_call() is True
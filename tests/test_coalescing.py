@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from src.popo import services
+from src.popo.schemas import SearchType, SearchCriteria
+from src.popo.services import search_doctor, search_flight
+from .helpers import create_database, personnel
+
+CRITERIA = SearchCriteria(SearchType.NAME, "王", None)
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    "Record every fetch that reaches the database, each held open briefly"
+    calls = []
+    search = services._search
+
+    async def slow_search(*args):
+        calls.append(args)
+        await asyncio.sleep(0.05)
+        return await search(*args)
+
+    monkeypatch.setattr(services, "_search", slow_search)
+    return calls
+
+
+def test_identical_searches_share_one_fetch(fetches):
+    async def scenario():
+        _, sessions = await create_database(personnel(50))
+        async with sessions() as db:
+            coalesced = search_flight.coalesced
+            results = await asyncio.gather(*(search_doctor(CRITERIA, db) for _ in range(8)))
+            return results, search_flight.coalesced - coalesced
+
+    results, coalesced = asyncio.run(scenario())
+    assert len(fetches) == 1
+    assert coalesced == 7
+    assert all(result is results[0] for result in results)
+    assert results[0][1]["total_count"] > 0
+
+
+def test_cancelled_caller_does_not_fail_the_others(fetches):
+    async def scenario():
+        _, sessions = await create_database(personnel(50))
+        async with sessions() as db:
+            leader = asyncio.create_task(search_doctor(CRITERIA, db))
+            await asyncio.sleep(0.01)
+            followers = [asyncio.create_task(search_doctor(CRITERIA, db)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            results = await asyncio.gather(*followers)
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return results
+
+    results = asyncio.run(scenario())
+    # 原本的查詢被取消後，等待中的呼叫只會再查詢一次
+    assert len(fetches) == 2
+    assert all(result is results[0] for result in results)
+    assert search_flight.stats()["inflight"] == 0
+
+
+def test_cancelled_follower_leaves_the_fetch_running(fetches):
+    async def scenario():
+        _, sessions = await create_database(personnel(50))
+        async with sessions() as db:
+            leader = asyncio.create_task(search_doctor(CRITERIA, db))
+            await asyncio.sleep(0.01)
+            follower = asyncio.create_task(search_doctor(CRITERIA, db))
+            await asyncio.sleep(0.01)
+            follower.cancel()
+            return await leader, follower
+
+    (doctors, stats), follower = asyncio.run(scenario())
+    assert follower.cancelled()
+    assert len(fetches) == 1
+    assert stats["total_count"] > 0
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import asyncpg
+from src.config import settings
+from src.database.models.medical_personnel import MedicalPersonnel
+from src.popo import services
+from src.popo.dataset import dataset_version
+from src.popo.schemas import SearchType, SearchCriteria
+from src.popo.services import PAGE_SIZE, count_cache, search_doctor
+from .helpers import create_database, personnel
+
+ROWS = personnel(60)
+
+
+async def _counting(rows=ROWS):
+    "Database whose executed count queries are recorded"
+    engine, sessions = await create_database(rows)
+    counts = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, *args):
+        if statement.lstrip().lower().startswith("select count"):
+            counts.append(statement)
+
+    return sessions, counts
+
+
+def test_counts_are_cached_until_the_data_changes():
+    criteria = SearchCriteria(SearchType.NAME, "王", None)
+
+    async def scenario():
+        sessions, counts = await _counting()
+        async with sessions() as db:
+            _, first = await search_doctor(criteria, db)
+            _, second = await search_doctor(criteria, db, offset=PAGE_SIZE)
+            cached = len(counts)
+            dataset_version.bump()
+            await search_doctor(criteria, db, offset=PAGE_SIZE)
+        return first, second, cached, len(counts)
+
+    first, second, cached, recounted = asyncio.run(scenario())
+    assert first["total_count"] == second["total_count"] == sum(row["name"].startswith("王") for row in ROWS)
+    assert cached == 1
+    assert recounted == 2
+
+
+def test_empty_term_is_counted_from_the_stats_cube():
+    async def scenario():
+        sessions, counts = await _counting()
+        async with sessions() as db:
+            _, stats = await search_doctor(SearchCriteria(SearchType.NAME, "", "台北"), db)
+        return stats, counts
+
+    stats, counts = asyncio.run(scenario())
+    assert stats["total_count"] == sum(row["city"] == "台北" for row in ROWS)
+    assert not stats["approximate"]
+    assert counts == []
+
+
+def test_estimated_totals_are_carried_by_the_cursor(monkeypatch):
+    async def estimate(query, db):
+        return 5000, True
+
+    monkeypatch.setattr(settings, "SEARCH_COUNT_MODE", "estimate")
+    monkeypatch.setattr(services, "_estimate_count", estimate)
+    criteria = SearchCriteria(SearchType.HOSPITAL, "醫院", None)
+
+    async def scenario():
+        sessions, counts = await _counting()
+        async with sessions() as db:
+            pages = []
+            _, stats = await search_doctor(criteria, db)
+            pages.append(stats)
+            while stats["next_cursor"]:
+                _, stats = await search_doctor(criteria, db, cursor=stats["next_cursor"])
+                pages.append(stats)
+        return pages, counts
+
+    pages, counts = asyncio.run(scenario())
+    assert counts == []
+    assert all(stats["approximate"] and stats["total_count"] == 5000 for stats in pages)
+    # 估計值大於實際筆數，最後一頁仍依實際取得的資料結束
+    matched = sum("醫院" in row["hospital"] for row in ROWS)
+    assert len(pages) == (matched + PAGE_SIZE - 1) // PAGE_SIZE
+    assert not pages[-1]["has_more"]
+
+
+def test_estimate_falls_back_to_an_exact_count(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_COUNT_MODE", "estimate")
+
+    async def scenario():
+        sessions, counts = await _counting()
+        async with sessions() as db:
+            _, stats = await search_doctor(SearchCriteria(SearchType.NAME, "王", None), db)
+        return stats, counts
+
+    stats, counts = asyncio.run(scenario())
+    assert not stats["approximate"]
+    assert len(counts) == 1
+
+
+def test_estimate_count_reads_the_postgres_plan(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_COUNT_ESTIMATE_THRESHOLD", 1000)
+    statements = []
+
+    class Connection:
+        def __init__(self, rows):
+            self.rows = rows
+
+        async def exec_driver_sql(self, statement):
+            statements.append(statement)
+            return SimpleNamespace(scalar=lambda: json.dumps([{"Plan": {"Plan Rows": self.rows}}]))
+
+    def database(rows):
+        async def connection():
+            return Connection(rows)
+        return SimpleNamespace(bind=SimpleNamespace(dialect=asyncpg.dialect()), connection=connection)
+
+    query = select(MedicalPersonnel).where(MedicalPersonnel.name.ilike("%王%"))
+    assert asyncio.run(services._estimate_count(query, database(12000))) == (12000, True)
+    assert asyncio.run(services._estimate_count(query, database(999))) is None
+    assert statements[0].startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "'%王%'" in statements[0]
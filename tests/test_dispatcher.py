@@ -0,0 +1,96 @@
+import asyncio
+from contextlib import nullcontext
+from types import SimpleNamespace
+import pytest
+from src.linebot import dispatcher
+from src.linebot.dispatcher import EventDispatcher
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.handled = []
+
+    async def handle(self, event, line_bot_api, db):
+        await asyncio.sleep(event.delay)
+        self.handled.append(event.webhook_event_id)
+
+
+def _event(event_id, user_id="U1", delay=0.0, redelivery=False):
+    return SimpleNamespace(
+        webhook_event_id=event_id,
+        delivery_context=SimpleNamespace(is_redelivery=redelivery),
+        source=SimpleNamespace(user_id=user_id),
+        delay=delay,
+    )
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    recording = RecordingHandler()
+
+    async def get_line_bot_api():
+        return None
+
+    monkeypatch.setattr(dispatcher, "get_handler", lambda event: recording)
+    monkeypatch.setattr(dispatcher, "get_line_bot_api", get_line_bot_api)
+    monkeypatch.setattr(dispatcher, "AsyncSessionLocal", nullcontext)
+    return recording
+
+
+def _run(events, workers=4, queue_size=100):
+    async def scenario():
+        event_dispatcher = EventDispatcher(workers, queue_size, 100, 60)
+        event_dispatcher.start()
+        for event in events:
+            assert event_dispatcher.enqueue(event)
+        await event_dispatcher.stop()
+        return event_dispatcher
+    return asyncio.run(scenario())
+
+
+def test_events_of_a_user_are_handled_in_order(handler):
+    events = [_event(f"A{i}", "UA", delay=0.01 * (5 - i)) for i in range(5)]
+    events += [_event(f"B{i}", "UB", delay=0.001) for i in range(5)]
+    result = _run(events)
+    assert [event_id for event_id in handler.handled if event_id.startswith("A")] == [f"A{i}" for i in range(5)]
+    assert sorted(handler.handled) == sorted(event.webhook_event_id for event in events)
+    assert result.processed == 10
+
+
+def test_redelivered_duplicates_are_dropped(handler):
+    result = _run([
+        _event("E1"),
+        _event("E1", redelivery=True),
+        _event("E2", redelivery=True),
+    ])
+    assert handler.handled == ["E1", "E2"]
+    assert result.duplicates == 1
+
+
+def test_handler_errors_are_counted(handler, monkeypatch):
+    async def fail(event, line_bot_api, db):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(handler, "handle", fail)
+    result = _run([_event("E1"), _event("E2")])
+    assert result.failed == 2
+    assert result.processed == 2
+
+
+def test_full_queue_drops_without_waiting(handler):
+    async def scenario():
+        event_dispatcher = EventDispatcher(1, 1, 100, 60)
+        event_dispatcher.start()
+        accepted = [event_dispatcher.enqueue(_event(f"E{i}")) for i in range(3)]
+        await asyncio.sleep(0.01)
+        # 被捨棄的事件重送後再次分派，已處理的事件仍視為重複
+        redelivered = [event_dispatcher.enqueue(_event(f"E{i}", redelivery=True)) for i in range(2)]
+        await event_dispatcher.stop()
+        return event_dispatcher, accepted, redelivered
+
+    event_dispatcher, accepted, redelivered = asyncio.run(scenario())
+    assert accepted == [True, False, False]
+    assert redelivered == [True, True]
+    assert handler.handled == ["E0", "E1"]
+    assert event_dispatcher.dropped == 2
+    assert event_dispatcher.duplicates == 1
@@ -0,0 +1,84 @@
+import asyncio
+import csv
+import io
+import json
+from sqlalchemy import update
+from starlette.requests import Request
+from src.database.models.medical_personnel import MedicalPersonnel
+from src.database.models.personnel_change import PersonnelChange, ChangeOperation
+from src.popo import export
+from src.popo.router import export_personnel
+from .helpers import create_database, personnel
+
+ROWS = personnel(35)
+FILTERS = {"city": None, "hospital": None, "department": None, "university": None, "name": None}
+
+
+def _request(etag: str | None = None) -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+async def _export(db, request, export_format="ndjson", **filters):
+    response = await export_personnel(request, db, export_format, **{**FILTERS, **filters})
+    body = b""
+    if response.status_code == 200:
+        body = b"".join([chunk async for chunk in response.body_iterator])
+    return response, body.decode()
+
+
+def test_export_streams_every_active_row_in_batches(monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 4)
+
+    async def scenario():
+        _, sessions = await create_database(ROWS)
+        monkeypatch.setattr(export, "AsyncSessionLocal", sessions)
+        async with sessions() as db:
+            await db.execute(update(MedicalPersonnel).where(MedicalPersonnel.id == 2).values(is_active=False))
+            await db.commit()
+            ndjson = await _export(db, _request())
+            table = await _export(db, _request(), "csv", city="台北")
+        return ndjson, table
+
+    (response, ndjson), (csv_response, table) = asyncio.run(scenario())
+    records = [json.loads(line) for line in ndjson.splitlines()]
+    assert response.media_type == "application/x-ndjson"
+    assert [record["id"] for record in records] == [pk for pk in range(1, 36) if pk != 2]
+    assert records[0] == {
+        "id": 1,
+        **{column: ROWS[0][column] for column in export.EXPORT_COLUMNS[1:-1]},
+        "graduation_status": "畢業",
+    }
+
+    lines = list(csv.reader(io.StringIO(table)))
+    assert lines[0] == list(export.EXPORT_COLUMNS)
+    assert [int(line[0]) for line in lines[1:]] == [
+        pk for pk, row in enumerate(ROWS, 1) if row["city"] == "台北" and pk != 2
+    ]
+    assert csv_response.headers["content-disposition"] == 'attachment; filename="personnel.csv"'
+
+
+def test_export_etag_follows_the_change_feed(monkeypatch):
+    async def scenario():
+        _, sessions = await create_database(ROWS)
+        monkeypatch.setattr(export, "AsyncSessionLocal", sessions)
+        async with sessions() as db:
+            first, _ = await _export(db, _request())
+            etag = first.headers["etag"]
+            cached, body = await _export(db, _request(etag))
+            other_format, _ = await _export(db, _request(etag), "csv")
+            filtered, _ = await _export(db, _request(etag), hospital="台大")
+
+            db.add(PersonnelChange(personnel_id=1, operation=ChangeOperation.UPDATE))
+            await db.commit()
+            changed, changed_body = await _export(db, _request(etag))
+        return etag, cached, body, other_format, filtered, changed, changed_body
+
+    etag, cached, body, other_format, filtered, changed, changed_body = asyncio.run(scenario())
+    assert etag.startswith('"0-')
+    assert (cached.status_code, body) == (304, "")
+    assert cached.headers["etag"] == etag
+    assert other_format.status_code == filtered.status_code == 200
+    assert changed.status_code == 200
+    assert changed.headers["etag"].startswith('"1-')
+    assert len(changed_body.splitlines()) == len(ROWS)
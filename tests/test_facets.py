@@ -0,0 +1,50 @@
+from email.utils import format_datetime
+from datetime import timedelta
+import pytest
+from src.popo.index import search_index
+from src.popo.dataset import dataset_version
+from src.popo.facets import facet_cache
+from .test_index import _row
+
+
+@pytest.fixture(autouse=True)
+def dataset():
+    search_index.build([_row(1, "王大明", city="台北"), _row(2, "陳小華", city="高雄"), _row(3, "林美玲", city="台北")])
+
+
+def test_counts_and_etag(client):
+    response = client.get("/api/popo/personnel/cities")
+    assert response.status_code == 200
+    assert response.json() == [{"value": "台北", "count": 2}, {"value": "高雄", "count": 1}]
+    etag = response.headers["etag"]
+
+    assert client.get("/api/popo/personnel/cities", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/popo/personnel/cities", headers={"If-None-Match": f'W/{etag}, "x"'}).status_code == 304
+    assert client.get("/api/popo/personnel/cities", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_modified_since(client):
+    response = client.get("/api/popo/personnel/departments")
+    last_modified = response.headers["last-modified"]
+    assert client.get(
+        "/api/popo/personnel/departments", headers={"If-Modified-Since": last_modified}
+    ).status_code == 304
+
+    earlier = format_datetime(dataset_version.updated_at - timedelta(hours=1), usegmt=True)
+    assert client.get(
+        "/api/popo/personnel/departments", headers={"If-Modified-Since": earlier}
+    ).status_code == 200
+
+
+def test_changes_produce_a_new_etag(client):
+    etag = client.get("/api/popo/personnel/cities").headers["etag"]
+    old = search_index.rows[2]
+    new = _row(2, "陳小華", city="台北")
+    facet_cache.apply(old, new)
+    search_index.add(new)
+    dataset_version.bump({2})
+
+    response = client.get("/api/popo/personnel/cities", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json() == [{"value": "台北", "count": 3}]
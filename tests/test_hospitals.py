@@ -0,0 +1,90 @@
+import random
+from types import SimpleNamespace
+from src.popo.hospitals import HospitalDirectory
+
+COUNTS = {
+    "台大醫院": 30,
+    "台北榮民總醫院": 20,
+    "台中榮民總醫院": 12,
+    "三軍總醫院": 25,
+    "林口長庚紀念醫院": 18,
+    "高雄長庚紀念醫院": 9,
+    "馬偕紀念醫院": 15,
+    "臺北市立聯合醫院": 4,
+}
+
+
+def _directory(counts=COUNTS) -> HospitalDirectory:
+    directory = HospitalDirectory()
+    directory.build(counts.items())
+    return directory
+
+
+def _walk(node, prefix=""):
+    yield prefix, node.top, node.hospitals
+    for char, child in node.children.items():
+        yield from _walk(child, prefix + char)
+
+
+def test_suggest_orders_by_count():
+    directory = _directory()
+    assert directory.suggest("台") == [
+        {"hospital": "台大醫院", "count": 30},
+        {"hospital": "台北榮民總醫院", "count": 20},
+        {"hospital": "台中榮民總醫院", "count": 12},
+        {"hospital": "臺北市立聯合醫院", "count": 4},
+    ]
+    assert directory.suggest("長庚", limit=1) == [{"hospital": "林口長庚紀念醫院", "count": 18}]
+    assert directory.suggest("北榮") == [{"hospital": "台北榮民總醫院", "count": 20}]
+    assert directory.suggest("") == []
+    assert directory.suggest("成大") == []
+
+
+def test_resolve_names_and_aliases():
+    directory = _directory()
+    assert directory.resolve("三總") == ["三軍總醫院"]
+    assert directory.resolve("北市聯醫") == ["臺北市立聯合醫院"]
+    assert sorted(directory.resolve("長庚")) == ["林口長庚紀念醫院", "高雄長庚紀念醫院"]
+    assert directory.resolve("台北市立聯合醫院") == ["臺北市立聯合醫院"]
+    assert directory.resolve("不存在醫院") == []
+
+
+def test_apply_updates_the_trie_in_place():
+    directory = _directory()
+    directory.suggest("台")
+    root = directory._root
+    row = SimpleNamespace
+    for _ in range(11):
+        directory.apply(None, row(hospital="台中榮民總醫院"))
+    directory.apply(None, row(hospital="台南醫院"))
+    for _ in range(4):
+        directory.apply(row(hospital="臺北市立聯合醫院"), None)
+
+    assert directory._root is root
+    assert [s["hospital"] for s in directory.suggest("台")] == ["台大醫院", "台中榮民總醫院", "台北榮民總醫院", "台南醫院"]
+    assert directory.suggest("台中") == [{"hospital": "台中榮民總醫院", "count": 23}]
+    assert directory.resolve("北市聯醫") == []
+    assert directory.suggest("臺北市") == []
+    assert directory.resolve("台南醫院") == ["台南醫院"]
+
+
+def test_apply_matches_a_rebuild():
+    rng = random.Random(7)
+    names = list(COUNTS) + ["台南醫院", "中國醫藥大學附設醫院", "高醫附醫", "亞東醫院"]
+    directory = _directory()
+    directory.suggest("台")
+    row = SimpleNamespace
+    for _ in range(3000):
+        old = rng.choice(names + [None])
+        if old is not None and not directory._counts[old]:
+            old = None
+        new = rng.choice(names + [None])
+        directory.apply(old and row(hospital=old), new and row(hospital=new))
+
+    rebuilt = _directory(dict(directory._counts))
+    rebuilt.suggest("台")
+    assert sorted(_walk(directory._root)) == sorted(_walk(rebuilt._root))
+    assert directory._values == rebuilt._values
+    assert {k: sorted(v) for k, v in directory._aliases.items()} == {
+        k: sorted(v) for k, v in rebuilt._aliases.items()
+    }
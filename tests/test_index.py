@@ -0,0 +1,146 @@
+import random
+from types import SimpleNamespace
+from src.database.models.medical_personnel import GraduationStatus
+from src.popo.index import SearchIndex, sort_key
+from src.popo.schemas import SearchType, SearchCriteria, MatchRank
+
+COLUMNS = ("id", "city", "hospital", "department", "name", "education", "university", "graduation_status")
+
+
+def _row(pk, name, hospital="台大醫院", city="台北", department="內科"):
+    return SimpleNamespace(
+        id=pk, city=city, hospital=hospital, department=department, name=name,
+        education="台灣大學醫學系", university="台灣大學", graduation_status=GraduationStatus.GRADUATED,
+    )
+
+
+def _index(*rows) -> SearchIndex:
+    index = SearchIndex()
+    index.build(rows)
+    return index
+
+
+def _search(index, term, search_type=SearchType.NAME, city=None, limit=10, **kwargs):
+    rows, total = index.search(SearchCriteria(search_type, term, city), limit=limit, **kwargs)
+    return [row.id for row in rows], total
+
+
+def test_ranks_exact_then_prefix_then_substring():
+    index = _index(_row(1, "林王明"), _row(2, "王明華"), _row(3, "王明"))
+    assert _search(index, "王明") == ([3, 2, 1], 3)
+
+
+def test_city_filter_and_offset():
+    index = _index(*(_row(pk, f"王{pk:02d}", city="台北" if pk % 2 else "高雄") for pk in range(1, 21)))
+    ids, total = _search(index, "王", city="高雄", limit=3, offset=3)
+    assert total == 10
+    assert ids == [8, 10, 12]
+
+
+def test_after_seeks_past_the_sort_key():
+    index = _index(*(_row(pk, f"王{pk:02d}") for pk in range(1, 11)))
+    criteria = SearchCriteria(SearchType.NAME, "王", None)
+    first, _ = index.search(criteria, limit=4)
+    after = sort_key(criteria, first[-1])
+    rest, _ = index.search(criteria, limit=10, after=after)
+    assert [row.id for row in first + rest] == list(range(1, 11))
+
+
+def test_variant_characters_match():
+    index = _index(_row(1, "王大明", hospital="臺北榮民總醫院"))
+    assert _search(index, "台北榮總", SearchType.HOSPITAL) == ([], 0)
+    assert _search(index, "台北榮民", SearchType.HOSPITAL) == ([1], 1)
+    assert _search(index, "王 大明") == ([1], 1)
+
+
+def test_fuzzy_fallback_within_one_edit():
+    index = _index(_row(1, "王大明"), _row(2, "陳小華"))
+    criteria = SearchCriteria(SearchType.NAME, "王大名", None)
+    rows, total = index.search(criteria, limit=10)
+    assert [row.id for row in rows] == [1]
+    assert total == 1
+    assert sort_key(criteria, rows[0])[0] == MatchRank.FUZZY
+
+
+def test_fuzzy_needs_a_minimum_length():
+    index = _index(_row(1, "王明"))
+    assert _search(index, "王名") == ([], 0)
+
+
+def test_substring_match_wins_over_fuzzy():
+    index = _index(_row(1, "王大明"), _row(2, "王大"))
+    assert _search(index, "王大") == ([2, 1], 2)
+
+
+def test_add_and_remove():
+    index = _index(_row(1, "王大明"))
+    index.add(_row(1, "陳大明"))
+    index.add(_row(2, "王小明"))
+    assert _search(index, "王") == ([2], 1)
+    index.remove(2)
+    assert _search(index, "明") == ([1], 1)
+
+
+def test_snapshot_file_round_trip(tmp_path):
+    rows = [_row(pk, name, hospital) for pk, name, hospital in (
+        (1, "王大明", "台大醫院"), (2, "陳小華", "三軍總醫院"), (5, "林美玲", "台大醫院"),
+    )]
+    index = _index(*rows)
+    index.remove(2)
+    path = str(tmp_path / "dataset.snapshot")
+    index.dump(path, version=7)
+
+    loaded = SearchIndex()
+    assert loaded.load_file(path) == 7
+    assert sorted(loaded.rows) == [1, 5]
+    row = loaded.rows[5]
+    assert [getattr(row, column) for column in COLUMNS] == [getattr(rows[2], column) for column in COLUMNS]
+    assert _search(loaded, "台大", SearchType.HOSPITAL) == ([5, 1], 2)
+    assert _search(loaded, "陳") == ([], 0)
+    # 索引直接使用檔案中的陣列
+    assert all(isinstance(field.grams, memoryview) for field in loaded._fields.values())
+    assert loaded.fuzzy_match("name", "王大名") == {1}
+    assert loaded.filter_city({1, 2, 5}, "台北") == {1, 5}
+
+    # 由 mmap 載入的快照之後仍可套用異動
+    loaded.add(_row(6, "王美玲"))
+    loaded.remove(1)
+    assert _search(loaded, "玲") == ([5, 6], 2)
+
+
+def test_changes_match_a_rebuild():
+    rng = random.Random(3)
+    names = ("王大明", "王小明", "陳美玲", "林志強", "臺大華")
+    hospitals = ("台大醫院", "臺大醫院", "三軍總醫院", "長庚紀念醫院")
+
+    def row(pk):
+        return _row(pk, rng.choice(names) + str(pk % 3), rng.choice(hospitals), rng.choice(("台北", "高雄")))
+
+    current = {pk: row(pk) for pk in range(1, 41)}
+    index = _index(*current.values())
+    for _ in range(300):
+        pk = rng.randint(1, 60)
+        if rng.random() < 0.6:
+            current[pk] = row(pk)
+            index.add(current[pk])
+        else:
+            current.pop(pk, None)
+            index.remove(pk)
+
+    rebuilt = _index(*current.values())
+    assert sorted(index.rows) == sorted(current)
+    for term, search_type in (("王", SearchType.NAME), ("台大", SearchType.HOSPITAL), ("王大名0", SearchType.NAME)):
+        for city in (None, "高雄"):
+            assert _search(index, term, search_type, city, limit=100) == _search(rebuilt, term, search_type, city, limit=100)
+    assert index.match_values("hospital", ["臺大醫院"]) == rebuilt.match_values("hospital", ["台大醫院"])
+    assert index.rows.counts("city") == rebuilt.rows.counts("city")
+
+
+def test_rebuild_drops_unused_strings():
+    index = _index(*(_row(pk, f"王{pk}") for pk in range(1, 21)))
+    for pk in range(1, 21):
+        index.add(_row(pk, f"陳{pk}"))
+    assert index.rows.changes < 20
+    assert index.rows.strings.find("王1") == 0
+    assert _search(index, "王") == ([], 0)
+    assert _search(index, "陳1", limit=3) == ([1, 10, 11], 11)
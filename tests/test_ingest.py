@@ -0,0 +1,162 @@
+import csv
+import io
+from sqlalchemy import create_engine, select
+from src.database.models.base import Base
+from src.database.models.medical_personnel import MedicalPersonnel, GraduationStatus
+from src.database.models.personnel_change import PersonnelChange, ChangeOperation
+from src.ingest.loader import load_records, COLUMNS, LIFECYCLE_COLUMNS
+from src.ingest.parser import normalize_record, parse_file
+from .helpers import personnel
+
+
+def test_normalize_record():
+    record = normalize_record(
+        {
+            "city": " 臺北市 ",
+            "hospital": "台大醫院",
+            "department": "",
+            "name": "王大明",
+            "education": "中國醫藥大學醫學系(在學)",
+        }
+    )
+    assert record == {
+        "city": "台北",
+        "hospital": "台大醫院",
+        "department": None,
+        "name": "王大明",
+        "education": "中國醫藥大學醫學系(在學)",
+        "university": "中國醫藥大學",
+        "graduation_status": GraduationStatus.STUDYING,
+    }
+    assert normalize_record({"city": "台北", "hospital": "台大醫院", "name": " "}) is None
+
+
+def test_parse_csv(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(
+        "﻿縣市,醫院,科別,姓名,學歷,備註\n"
+        "新北市,亞東醫院,外科,陳志強,台灣大學醫學系,x\n"
+        ",亞東醫院,外科,缺縣市,台灣大學醫學系,x\n",
+        encoding="utf-8",
+    )
+    records = list(parse_file(path))
+    assert [(r["city"], r["name"], r["university"]) for r in records] == [
+        ("新北", "陳志強", "台灣大學")
+    ]
+
+
+def test_parse_html_without_closing_tags(tmp_path, monkeypatch):
+    # 最後一格沒有結束標籤，只會在 parser.close() 時送出
+    path = tmp_path / "list.html"
+    path.write_text(
+        "<table><tr><th>姓名<th>縣市<th>醫院"
+        "<tr><td>王大明<td>台北<td>台大醫院"
+        "<tr><td>李小華<td>高雄<td>長庚紀念醫院",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr("src.ingest.parser.READ_CHUNK_SIZE", 16)
+    records = list(parse_file(path))
+    assert [(r["name"], r["hospital"]) for r in records] == [
+        ("王大明", "台大醫院"),
+        ("李小華", "長庚紀念醫院"),
+    ]
+
+
+def test_load_records_replaces_the_table():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    assert load_records(personnel(30), engine, batch_size=7) == 30
+    assert load_records(personnel(12, seed=2), engine, batch_size=7) == 12
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(MedicalPersonnel.name, MedicalPersonnel.is_active)).all()
+        changes = conn.execute(select(PersonnelChange.operation)).scalars().all()
+    assert sorted(name for name, _ in rows) == sorted(r["name"] for r in personnel(12, seed=2))
+    assert all(active for _, active in rows)
+    assert changes == [ChangeOperation.RELOAD, ChangeOperation.RELOAD]
+
+
+class _Cursor:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.log.append((sql, params))
+
+    def copy_expert(self, sql, buffer):
+        self.log.append((sql, list(csv.reader(io.StringIO(buffer.read())))))
+
+    def fetchone(self):
+        return ("medical_personnel_id_seq",)
+
+
+class _Connection:
+    def __init__(self):
+        self.log = []
+        self.committed = False
+
+    def cursor(self):
+        return _Cursor(self.log)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Dialect:
+    name = "postgresql"
+
+
+class _Engine:
+    "只記錄 SQL 的 PostgreSQL engine，檢查 COPY 的語法與欄位順序"
+    dialect = _Dialect()
+
+    def __init__(self):
+        self.connection = _Connection()
+
+    def raw_connection(self):
+        return self.connection
+
+
+def test_load_records_postgres_dry_run():
+    engine = _Engine()
+    records = personnel(5)
+    records[0]["department"] = None
+    assert load_records(records, engine, batch_size=3) == 5
+    assert engine.connection.committed
+
+    log = engine.connection.log
+    statements = [sql for sql, _ in log]
+    copies = [rows for sql, rows in log if sql.startswith("COPY")]
+    assert statements[:2] == [
+        "DROP TABLE IF EXISTS medical_personnel_staging",
+        "CREATE TABLE medical_personnel_staging (LIKE medical_personnel INCLUDING ALL)",
+    ]
+    assert statements[2] == (
+        f"COPY medical_personnel_staging ({', '.join(COLUMNS + LIFECYCLE_COLUMNS)}) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    assert [len(rows) for rows in copies] == [3, 2]
+    first = dict(zip(COLUMNS + LIFECYCLE_COLUMNS, copies[0][0]))
+    # 空字串在 CSV 格式的 COPY 中為 NULL，Enum 以成員名稱寫入
+    assert first["department"] == ""
+    assert first["graduation_status"] == "GRADUATED"
+    assert first["is_active"] == "True"
+    assert statements[-5:-1] == [
+        "ALTER TABLE medical_personnel RENAME TO medical_personnel_old",
+        "ALTER TABLE medical_personnel_staging RENAME TO medical_personnel",
+        "ALTER SEQUENCE medical_personnel_id_seq OWNED BY medical_personnel.id",
+        "DROP TABLE medical_personnel_old",
+    ]
+    assert log[-1][1][0] == ChangeOperation.RELOAD.name
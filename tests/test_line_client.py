@@ -0,0 +1,26 @@
+import asyncio
+import ssl
+from src.config import settings
+from src.linebot.dependencies import LineBotApiWrapper
+
+
+def test_session_keeps_the_sdk_configuration():
+    async def scenario():
+        wrapper = LineBotApiWrapper()
+        wrapper.configuration.verify_ssl = False
+        wrapper.configuration.proxy = "http://proxy.local:3128"
+        wrapper.configuration.proxy_headers = {"Proxy-Authorization": "Basic abc"}
+        await wrapper.get_api()
+        rest_client = wrapper.async_api_client.rest_client
+        connector = rest_client.pool_manager.connector
+        try:
+            return connector.limit, connector._ssl, rest_client.proxy, rest_client.proxy_headers
+        finally:
+            await wrapper.close()
+
+    limit, context, proxy, proxy_headers = asyncio.run(scenario())
+    assert limit == settings.LINE_API_POOL_SIZE
+    assert context.verify_mode == ssl.CERT_NONE
+    assert not context.check_hostname
+    assert proxy == "http://proxy.local:3128"
+    assert proxy_headers == {"Proxy-Authorization": "Basic abc"}
@@ -0,0 +1,72 @@
+import json
+import logging
+import queue
+import sys
+from src.infra.logger import DroppingQueueHandler, JsonFormatter
+from src.infra.metrics import registry
+
+
+def _record(msg, *args, exc_info=None):
+    return logging.LogRecord("popo", logging.INFO, __file__, 1, msg, args or None, exc_info)
+
+
+def _drain(log_queue):
+    records = []
+    while not log_queue.empty():
+        records.append(log_queue.get_nowait())
+    return records
+
+
+def test_full_queue_drops_records_and_reports_them_later():
+    log_queue = queue.Queue(2)
+    handler = DroppingQueueHandler(log_queue)
+    for i in range(5):
+        handler.handle(_record("message %d", i))
+
+    assert handler.dropped == 3
+    assert [record.getMessage() for record in _drain(log_queue)] == ["message 0", "message 1"]
+
+    handler.handle(_record("after"))
+    messages = [record.getMessage() for record in _drain(log_queue)]
+    assert messages == ["Dropped 3 log records while the log queue was full", "after"]
+    assert handler.dropped == 3
+
+    # 補記的紀錄放不下時留待下一次
+    for i in range(3):
+        handler.handle(_record("again %d", i))
+    _drain(log_queue)
+    handler.handle(_record("last"))
+    assert [record.getMessage() for record in _drain(log_queue)] == [
+        "Dropped 1 log records while the log queue was full", "last",
+    ]
+    assert handler.dropped == 4
+
+
+def test_prepare_merges_args_and_formats_exceptions():
+    handler = DroppingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        original = _record("user %s", "U1", exc_info=sys.exc_info())
+
+    prepared = handler.prepare(original)
+    assert (prepared.msg, prepared.args, prepared.exc_info) == ("user U1", None, None)
+    assert "ValueError: boom" in prepared.exc_text
+    assert original.args == ("U1",)
+
+    data = json.loads(JsonFormatter().format(prepared))
+    assert (data["level"], data["logger"], data["message"]) == ("INFO", "popo", "user U1")
+    assert "ValueError: boom" in data["exc_info"]
+
+
+def test_dropped_records_are_exported_as_a_metric():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    root = logging.getLogger()
+    before = sum(h.dropped for h in root.handlers if isinstance(h, DroppingQueueHandler))
+    root.addHandler(handler)
+    try:
+        for i in range(3):
+            handler.handle(_record("message %d", i))
+        assert f"log_records_dropped_total {before + 2}" in registry.render().splitlines()
+    finally:
+        root.removeHandler(handler)
@@ -0,0 +1,61 @@
+import pytest
+from src.infra.metrics import MetricsRegistry, _Metric
+
+
+def test_render_counters_gauges_and_callbacks():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("method",))
+    requests.inc("GET")
+    requests.inc("GET", amount=2)
+    requests.inc('P"O\\ST')
+    depth = registry.gauge("queue_depth", "Queued items")
+    depth.set(3)
+    depth.dec()
+    registry.callback("cache_size", "Cached entries", lambda: {("search",): 5, ("count",): None}, labelnames=("cache",))
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{method="GET"} 3',
+        'requests_total{method="P\\"O\\\\ST"} 1',
+        "# HELP queue_depth Queued items",
+        "# TYPE queue_depth gauge",
+        "queue_depth 2",
+        "# HELP cache_size Cached entries",
+        "# TYPE cache_size gauge",
+        'cache_size{cache="search"} 5',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 0.5, 1))
+    for value in (0.05, 0.1, 0.3, 2):
+        latency.observe(value, "search")
+
+    assert latency.render()[2:] == [
+        'latency_seconds_bucket{stage="search",le="0.1"} 2',
+        'latency_seconds_bucket{stage="search",le="0.5"} 3',
+        'latency_seconds_bucket{stage="search",le="1"} 3',
+        'latency_seconds_bucket{stage="search",le="+Inf"} 4',
+        'latency_seconds_sum{stage="search"} 2.45',
+        'latency_seconds_count{stage="search"} 4',
+    ]
+
+
+def test_timer_observes_elapsed_time():
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Stages", ("stage",))
+    with latency.time("parse"):
+        pass
+    assert 'stage_seconds_count{stage="parse"} 1' in registry.render()
+
+
+def test_registering_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    assert registry.counter("events_total", "Events") is registry.counter("events_total", "Events")
+
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        _Metric("broken", "No samples")
@@ -0,0 +1,34 @@
+from src.popo.pagination import encode_cursor, decode_cursor
+from src.popo.schemas import SearchType, SearchCriteria, SearchCursor
+
+
+def _cursor(**overrides) -> SearchCursor:
+    fields = {
+        "criteria": SearchCriteria(SearchType.HOSPITAL, "台大醫院", "台北"),
+        "last_key": (0, "王大明"),
+        "last_id": 42,
+        "total_count": 123,
+        "page": 2,
+    }
+    return SearchCursor(**{**fields, **overrides})
+
+
+def test_round_trip():
+    cursor = _cursor()
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+
+
+def test_round_trip_approximate():
+    cursor = _cursor(approximate=True)
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+
+
+def test_tampered_cursor_is_rejected():
+    token = encode_cursor(_cursor())
+    tampered = token[:-2] + ("A" if token[-2] != "A" else "B") + token[-1]
+    assert decode_cursor(tampered) is None
+
+
+def test_garbage_is_rejected():
+    assert decode_cursor("not-a-cursor") is None
+    assert decode_cursor("") is None
@@ -0,0 +1,33 @@
+from src.popo.index import search_index
+from .test_index import _row
+
+
+def test_index_pages_are_ordered_by_id(client):
+    search_index.build(
+        [_row(pk, f"王{pk}", city="台北" if pk % 3 else "高雄") for pk in range(40, 0, -1)]
+    )
+    response = client.get("/api/popo/personnel", params={"skip": 5, "limit": 10, "city": "台北"})
+    expected = [pk for pk in range(1, 41) if pk % 3][5:15]
+    assert [row["id"] for row in response.json()] == expected
+
+    response = client.get("/api/popo/personnel", params={"skip": 30, "limit": 10, "city": "台北"})
+    assert [row["id"] for row in response.json()] == [pk for pk in range(1, 41) if pk % 3][30:]
+
+
+def test_unfiltered_pages_follow_changes(client, tmp_path):
+    search_index.build([_row(pk, f"王{pk}", city="台北" if pk % 2 else "高雄") for pk in range(1, 21)])
+    path = str(tmp_path / "dataset.snapshot")
+    search_index.dump(path, version=1)
+    search_index.load_file(path)
+
+    search_index.remove(3)
+    search_index.add(_row(25, "陳25", city="高雄"))
+    search_index.add(_row(4, "王4", city="台北"))
+    live = sorted({*range(1, 21), 25} - {3})
+
+    response = client.get("/api/popo/personnel", params={"skip": 2, "limit": 5})
+    assert [row["id"] for row in response.json()] == live[2:7]
+    response = client.get("/api/popo/personnel", params={"skip": 8, "limit": 5, "city": "高雄"})
+    assert [row["id"] for row in response.json()] == [20, 25]
+    response = client.get("/api/popo/personnel", params={"city": "台北", "limit": 3})
+    assert [row["id"] for row in response.json()] == [1, 4, 5]
@@ -0,0 +1,50 @@
+import asyncio
+from src.database.models.personnel_change import PersonnelChange, ChangeOperation
+from src.popo.dataset import dataset_version
+from src.popo.facets import facet_cache
+from src.popo.index import search_index
+from src.popo.refresh import ChangeFeedListener
+from src.popo.services import search_cache
+from src.popo.stats import stats_cube
+from .helpers import create_database, personnel
+
+
+async def _reload(listener: ChangeFeedListener, sessions) -> int:
+    async with sessions() as db:
+        await listener.prime(db)
+        db.add(PersonnelChange(operation=ChangeOperation.RELOAD))
+        await db.commit()
+        return await listener.poll(db)
+
+
+def test_reload_without_the_index_only_invalidates():
+    async def scenario():
+        _, sessions = await create_database(personnel(50))
+        async with sessions() as db:
+            await facet_cache.get("cities", db)
+        stats_cube.build([("台北", "內科", "台灣大學", 1)])
+        search_cache.set(("name", "王", None, 0), ([], {}))
+        version = dataset_version.version
+
+        listener = ChangeFeedListener(1, use_index=False)
+        assert await _reload(listener, sessions) == 1
+        assert listener.last_change_id == 1
+        return version
+
+    version = asyncio.run(scenario())
+    assert not search_index.ready
+    assert len(search_index.rows) == 0
+    assert not stats_cube.ready
+    assert not facet_cache._facets
+    assert search_cache.get(("name", "王", None, 0)) is None
+    assert dataset_version.version == version + 1
+
+
+def test_reload_with_the_index_rebuilds_it():
+    async def scenario():
+        _, sessions = await create_database(personnel(50))
+        await _reload(ChangeFeedListener(1), sessions)
+
+    asyncio.run(scenario())
+    assert search_index.ready
+    assert len(search_index.rows) == 50
@@ -0,0 +1,39 @@
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.database.models.base import Base
+from src.database.models.medical_personnel import MedicalPersonnel
+from src.popo.export import export_etag
+from .helpers import create_database
+
+
+def test_rows_inserted_outside_the_orm_are_active():
+    async def scenario():
+        _, sessions = await create_database()
+        async with sessions() as db:
+            await db.execute(
+                text(
+                    "INSERT INTO medical_personnel (city, hospital, name, graduation_status) "
+                    "VALUES ('台北', '台大醫院', '王大明', 'GRADUATED')"
+                )
+            )
+            await db.commit()
+            return (await db.execute(text("SELECT is_active FROM medical_personnel"))).scalar()
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_export_etag_without_the_changes_table():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[MedicalPersonnel.__table__])
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessions() as db:
+            etag = await export_etag(db, "csv", {})
+            # 失敗的查詢不影響同一個 session 之後的查詢
+            count = (await db.execute(text("SELECT count(1) FROM medical_personnel"))).scalar()
+        return etag, count
+
+    assert asyncio.run(scenario()) == (None, 0)
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from src.linebot.services import parse_search_criteria
+from src.popo.schemas import SearchType, SearchCriteria
+from src.popo.services import reload_dataset
+from .helpers import create_database, personnel
+from .test_services import all_pages
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("台北王大明", SearchCriteria(SearchType.NAME, "王大明", "台北")),
+    ("臺北＠醫院　臺北榮總", SearchCriteria(SearchType.HOSPITAL, "臺北榮總", "台北")),
+    ("＠科別 小兒科", SearchCriteria(SearchType.DEPARTMENT, "小兒科", None)),
+    ("臺中@科別 內科", SearchCriteria(SearchType.DEPARTMENT, "內科", "台中")),
+    (" 臺大明 ", SearchCriteria(SearchType.NAME, "臺大明", None)),
+])
+def test_prefixes_are_folded_but_the_term_is_kept(message, expected):
+    assert parse_search_criteria(message) == expected
+
+
+def test_variant_terms_find_rows_with_and_without_the_index():
+    rows = personnel(20, seed=5)
+    rows[3].update(name="臺大明", hospital="臺北榮民總醫院", city="台北")
+
+    async def scenario():
+        _, sessions = await create_database(rows)
+        criteria = parse_search_criteria("臺北@醫院 臺北榮民")
+        async with sessions() as db:
+            sql = await all_pages(criteria, db)
+            await reload_dataset(db)
+            indexed = await all_pages(criteria, db)
+            folded = await all_pages(parse_search_criteria("台北@醫院 台北榮民"), db)
+        return sql, indexed, folded
+
+    sql, indexed, folded = asyncio.run(scenario())
+    # 資料庫以原本的寫法比對，索引則將 臺/台 視為相同
+    assert sql == ([4], 1)
+    assert 4 in indexed[0]
+    assert indexed == folded
@@ -0,0 +1,150 @@
+import asyncio
+from sqlalchemy import update
+from src.database.models.medical_personnel import MedicalPersonnel
+from src.popo.facets import facet_cache
+from src.popo.hospitals import hospital_directory
+from src.popo.index import search_index
+from src.popo.schemas import SearchType, SearchCriteria
+from src.popo import services
+from src.popo.dataset import dataset_version
+from src.popo.services import PAGE_SIZE, reload_dataset, apply_changes, search_doctor, search_cache
+from src.popo.stats import stats_cube
+from .helpers import create_database, personnel
+
+QUERIES = [
+    SearchCriteria(SearchType.NAME, "王", None),
+    SearchCriteria(SearchType.NAME, "大明", "台北"),
+    SearchCriteria(SearchType.HOSPITAL, "台大", None),
+    SearchCriteria(SearchType.HOSPITAL, "三總", "高雄"),
+    SearchCriteria(SearchType.DEPARTMENT, "科", "台中"),
+]
+
+
+async def all_pages(criteria: SearchCriteria, db) -> tuple[list[int], int]:
+    "Walk every page with the next-page cursors, returning the ids and the total"
+    doctors, stats = await search_doctor(criteria, db)
+    ids = [doctor.id for doctor in doctors]
+    while stats["next_cursor"]:
+        doctors, stats = await search_doctor(criteria, db, cursor=stats["next_cursor"])
+        ids.extend(doctor.id for doctor in doctors)
+    return ids, stats["total_count"]
+
+
+async def _state(db) -> dict:
+    return {
+        "searches": [await all_pages(criteria, db) for criteria in QUERIES],
+        "stats": [stats_cube.get(), stats_cube.get("台北"), stats_cube.get("高雄", "內科")],
+        "facets": [(await facet_cache.get(name, db)).body for name in facet_cache.FACETS],
+        "hospitals": hospital_directory.suggest("台"),
+    }
+
+
+def test_incremental_changes_match_a_full_reload():
+    async def scenario():
+        _, sessions = await create_database(personnel(200))
+        async with sessions() as db:
+            await reload_dataset(db)
+            await _state(db)
+
+            await db.execute(
+                update(MedicalPersonnel).where(MedicalPersonnel.id == 3)
+                .values(hospital="新光醫院", city="高雄", department="內科")
+            )
+            await db.execute(
+                update(MedicalPersonnel).where(MedicalPersonnel.id.in_([5, 8])).values(is_active=False)
+            )
+            added = MedicalPersonnel(**{**personnel(1, seed=9)[0], "name": "王新人", "city": "台北"})
+            db.add(added)
+            await db.commit()
+
+            await apply_changes(db, {3, 5, 8, added.id})
+            incremental = await _state(db)
+            await reload_dataset(db)
+            full = await _state(db)
+
+        assert incremental == full
+        assert 5 not in search_index.rows
+        assert search_index.rows[added.id].name == "王新人"
+
+    asyncio.run(scenario())
+
+
+def test_sql_and_index_pages_agree():
+    async def scenario():
+        _, sessions = await create_database(personnel(300))
+        async with sessions() as db:
+            sql = [await all_pages(criteria, db) for criteria in QUERIES]
+            await reload_dataset(db)
+            indexed = [await all_pages(criteria, db) for criteria in QUERIES]
+
+        for (sql_ids, sql_total), (index_ids, index_total) in zip(sql, indexed):
+            assert sql_ids == index_ids
+            assert sql_total == index_total == len(index_ids)
+            assert len(set(index_ids)) == len(index_ids)
+        assert sum(total for _, total in indexed) > 100
+
+    asyncio.run(scenario())
+
+
+def test_sql_cursor_follows_the_database_ranking():
+    # "王大明 " 在資料庫中為開頭相符，正規化後則為完全相符，且正好是第一頁的最後一筆
+    rows = personnel(PAGE_SIZE - 1 + 5, seed=3)
+    for row in rows[:PAGE_SIZE - 1]:
+        row["name"] = "王大明"
+    rows[PAGE_SIZE - 1]["name"] = "王大明 "
+    for row in rows[PAGE_SIZE:]:
+        row["name"] = "王大明甲"
+    for row in rows:
+        row["city"] = "台北"
+
+    async def scenario():
+        _, sessions = await create_database(rows)
+        async with sessions() as db:
+            return await all_pages(SearchCriteria(SearchType.NAME, "王大明", "台北"), db)
+
+    ids, total = asyncio.run(scenario())
+    assert total == len(rows)
+    assert sorted(ids) == list(range(1, len(rows) + 1))
+
+
+def test_sql_results_are_cached_per_raw_term():
+    rows = personnel(3, seed=4)
+    for row, name in zip(rows, ("台大明", "台小華", "臺美玲")):
+        row["name"] = name
+
+    async def scenario():
+        _, sessions = await create_database(rows)
+        async with sessions() as db:
+            return [
+                await all_pages(SearchCriteria(SearchType.NAME, term, None), db)
+                for term in ("台", "臺", "台")
+            ]
+
+    assert asyncio.run(scenario()) == [([1, 2], 2), ([3], 1), ([1, 2], 2)]
+
+
+def test_results_fetched_across_a_data_change_are_not_cached(monkeypatch):
+    calls = []
+    search = services._search
+
+    async def racing_search(*args):
+        result = await search(*args)
+        if not calls:
+            # 查詢進行中資料被更新
+            dataset_version.bump({1})
+        calls.append(args)
+        return result
+
+    monkeypatch.setattr(services, "_search", racing_search)
+    criteria = SearchCriteria(SearchType.NAME, "王", None)
+
+    async def scenario():
+        _, sessions = await create_database(personnel(30))
+        async with sessions() as db:
+            await search_doctor(criteria, db)
+            await search_doctor(criteria, db)
+            await search_doctor(criteria, db)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert len(search_cache) == 1
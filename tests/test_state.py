@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import pytest
+from src.linebot.state import MemorySearchStateStore, SQLiteSearchStateStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySearchStateStore(60, 2)
+    return SQLiteSearchStateStore(60, 2, str(tmp_path / "state.db"))
+
+
+def test_round_trip(store):
+    async def scenario():
+        await store.set("U1", {"search_term": "王", "city": None})
+        return await store.get("U1"), await store.get("U2")
+
+    assert asyncio.run(scenario()) == ({"search_term": "王", "city": None}, {})
+
+
+def test_expired_states_are_gone(store):
+    store.ttl = 0
+
+    async def scenario():
+        await store.set("U1", {"search_term": "王"})
+        return await store.get("U1")
+
+    assert asyncio.run(scenario()) == {}
+
+
+def test_sqlite_runs_off_the_event_loop(tmp_path, monkeypatch):
+    store = SQLiteSearchStateStore(60, 10, str(tmp_path / "state.db"))
+    threads = []
+    original = store._set
+
+    def record(*args):
+        threads.append(threading.get_ident())
+        return original(*args)
+
+    monkeypatch.setattr(store, "_set", record)
+
+    async def scenario():
+        await store.set("U1", {"search_term": "王"})
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert threads and threads[0] != loop_thread
+
+
+def test_sqlite_prune_keeps_the_newest_states(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLiteSearchStateStore, "PRUNE_INTERVAL", 5)
+    path = str(tmp_path / "state.db")
+    store = SQLiteSearchStateStore(60, 3, path)
+
+    async def scenario():
+        for i in range(5):
+            await store.set(f"U{i}", {"page": i})
+        # 更新既有的使用者不增加筆數
+        await store.set("U4", {"page": 5})
+        return [await store.get(f"U{i}") for i in range(5)]
+
+    assert asyncio.run(scenario()) == [{}, {}, {"page": 2}, {"page": 3}, {"page": 5}]
+    count_sql = "SELECT (SELECT count FROM search_state_count), (SELECT count(1) FROM search_state)"
+    assert store._conn.execute(count_sql).fetchone() == (3, 3)
+
+    # 另一個 worker 開啟同一個檔案時沿用已記錄的筆數
+    other = SQLiteSearchStateStore(60, 3, path)
+    assert other._conn.execute(count_sql).fetchone() == (3, 3)
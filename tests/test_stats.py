@@ -0,0 +1,90 @@
+import asyncio
+from collections import Counter
+from sqlalchemy import update
+from src.database.models.medical_personnel import MedicalPersonnel
+from src.popo.router import get_stats
+from src.popo.services import reload_dataset, apply_changes
+from src.popo.stats import StatsCube, stats_cube
+from .helpers import CITIES, DEPARTMENTS, create_database, personnel
+from .test_index import _row
+
+ROWS = personnel(120)
+
+
+def _expected(rows, city=None, department=None) -> dict:
+    rows = [
+        row for row in rows
+        if (not city or row["city"] == city) and (not department or row["department"] == department)
+    ]
+
+    def distribution(column):
+        return dict(Counter(row[column] for row in rows if row[column]))
+
+    return {
+        "total_count": len(rows),
+        "city_distribution": distribution("city"),
+        "university_distribution": distribution("university"),
+        "department_distribution": distribution("department"),
+    }
+
+
+def test_stats_endpoint_loads_the_cube_once():
+    async def scenario():
+        _, sessions = await create_database(ROWS)
+        async with sessions() as db:
+            results = [
+                await get_stats(db, city, department)
+                for city in (None, "台北")
+                for department in (None, "內科")
+            ]
+        # 之後的請求不需要資料庫
+        results.append(await get_stats(None, "高雄", "牙科"))
+        return results
+
+    results = asyncio.run(scenario())
+    assert results == [
+        _expected(ROWS, city, department)
+        for city in (None, "台北")
+        for department in (None, "內科")
+    ] + [_expected(ROWS, "高雄", "牙科")]
+
+
+def test_stats_route(client):
+    stats_cube.build([("台北", "內科", "台灣大學", 2), ("高雄", None, "成功大學", 1)])
+    response = client.get("/api/popo/personnel/stats", params={"city": "台北"})
+    assert response.json() == {
+        "total_count": 2,
+        "city_distribution": {"台北": 2},
+        "university_distribution": {"台灣大學": 2},
+        "department_distribution": {"內科": 2},
+    }
+    stats_cube.remove(_row(1, "王大明", city="台北", department="內科"))
+    stats_cube.remove(_row(2, "王小明", city="台北", department="內科"))
+    assert client.get("/api/popo/personnel/stats", params={"city": "台北"}).json()["total_count"] == 0
+    assert stats_cube.count() == 1
+    assert stats_cube._cells.keys() == {(None, None), ("高雄", None)}
+
+
+def test_cube_after_apply_changes_matches_a_fresh_load():
+    async def scenario():
+        _, sessions = await create_database(ROWS)
+        async with sessions() as db:
+            await reload_dataset(db)
+            await db.execute(
+                update(MedicalPersonnel).where(MedicalPersonnel.id.in_([1, 2, 3]))
+                .values(city="台中", department="外科", university="成功大學")
+            )
+            await db.execute(
+                update(MedicalPersonnel).where(MedicalPersonnel.id.in_([4, 5])).values(is_active=False)
+            )
+            await db.commit()
+            await apply_changes(db, {1, 2, 3, 4, 5})
+
+            fresh = StatsCube()
+            await fresh.load(db)
+        return fresh
+
+    fresh = asyncio.run(scenario())
+    for city in (None, *CITIES):
+        for department in (None, *DEPARTMENTS):
+            assert stats_cube.get(city, department) == fresh.get(city, department), (city, department)
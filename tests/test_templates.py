@@ -0,0 +1,42 @@
+from linebot.v3.messaging import FlexCarousel
+from src.linebot.message_templates.doctor_template import (
+    bubble_cache, create_doctor_bubble, create_flex_message, get_doctor_bubble,
+)
+from src.linebot.message_templates.help_template import create_help_message
+from src.popo.dataset import dataset_version
+from .test_index import _row
+
+
+def test_bubbles_are_built_once_per_doctor():
+    bubble_cache.clear()
+    doctor = _row(1, "王大明")
+    bubble = get_doctor_bubble(doctor)
+    assert get_doctor_bubble(_row(1, "王大明")) is bubble
+    assert bubble_cache.stats()["misses"] == 1
+
+    doctors = [doctor, _row(2, "陳小華", hospital=None)]
+    message = create_flex_message(doctors)
+    expected = FlexCarousel.from_dict(
+        {"type": "carousel", "contents": [create_doctor_bubble(row) for row in doctors]}
+    )
+    assert message.contents.to_dict() == expected.to_dict()
+    assert message.alt_text == "找到 2 筆相關資料"
+
+
+def test_changes_drop_only_the_affected_bubbles():
+    bubble_cache.clear()
+    first, second = get_doctor_bubble(_row(1, "王大明")), get_doctor_bubble(_row(2, "陳小華"))
+
+    dataset_version.bump({1})
+    renamed = get_doctor_bubble(_row(1, "王小明"))
+    assert renamed is not first
+    assert renamed.header.contents[0].text == "王小明"
+    assert get_doctor_bubble(_row(2, "陳小華")) is second
+
+    dataset_version.bump()
+    assert get_doctor_bubble(_row(2, "陳小華")) is not second
+
+
+def test_empty_results_and_help_message():
+    assert create_flex_message([]).alt_text == "找不到相關資料"
+    assert create_help_message() is create_help_message()